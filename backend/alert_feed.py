@@ -0,0 +1,484 @@
+import asyncio
+import os
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure, PyMongoError
+from cache import response_cache
+from dates import DATE_FIELD, TIMESTAMP_FIELD
+from facets import facet_pipeline, read_facets
+from gazette_text import gazette_ids_matching
+from locks import try_lock
+
+# "alert_feed" is a denormalized copy of `alerts` where each alert embeds the
+# handful of gazette fields the list views show. List endpoints read it with a
+# single indexed find() instead of running $lookup over the alerts table.
+FEED_COLLECTION = "alert_feed"
+STATE_COLLECTION = "sync_state"
+STATE_ID = "alert_feed"
+
+FEED_GAZETTE_FIELDS = [
+    "gazette_id",
+    "ministry",
+    "subject",
+    "publish_date",
+    "pdf_url",
+    DATE_FIELD,
+    TIMESTAMP_FIELD,
+]
+
+# The $lookup fallback's equivalent of what the feed embeds
+FEED_GAZETTE_PROJECTION = {"_id": 0, **{field: 1 for field in FEED_GAZETTE_FIELDS}}
+
+FEED_ENABLED = os.getenv("ALERT_FEED", "1") != "0"
+# How often the fallback poller looks for new/changed alerts when change
+# streams are unavailable (standalone mongod)
+FEED_POLL_SECONDS = float(os.getenv("ALERT_FEED_POLL_SECONDS", "30"))
+# Pause before restarting the sync after a failure
+FEED_RETRY_SECONDS = float(os.getenv("ALERT_FEED_RETRY_SECONDS", "5"))
+# Only the worker holding this lock builds the feed and keeps it in sync;
+# the others serve it once it is built (see locks.py)
+FEED_LOCK_PATH = os.getenv(
+    "ALERT_FEED_LOCK_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "alert_feed.lock")
+)
+
+# Server error codes: change streams on a standalone server, and a resume
+# token the oplog no longer covers (ChangeStreamHistoryLost) or can't use
+CHANGE_STREAM_UNSUPPORTED = 40573
+RESUME_FAILURES = {260, 280, 286}
+
+_state = {"ready": False, "mode": None, "synced_until": None, "error": None, "lock": None}
+
+
+def feed_ready():
+    """True once the feed has been built and can serve list queries."""
+    return FEED_ENABLED and _state["ready"]
+
+
+def gazette_lookup_stages(preserve_missing=True, projection=None):
+    """The $lookup + $unwind used to join gazettes onto alerts.
+
+    With a `projection` the join runs as a sub-pipeline so excluded gazette
+    fields (pdf_text) are never pulled into the joined documents.
+    """
+    if projection:
+        lookup = {
+            "from": "gazettes",
+            "let": {"gazette_id": "$gazette_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$gazette_id", "$$gazette_id"]}}},
+                {"$project": projection}
+            ],
+            "as": "gazette_details"
+        }
+    else:
+        lookup = {
+            "from": "gazettes",
+            "localField": "gazette_id",
+            "foreignField": "gazette_id",
+            "as": "gazette_details"
+        }
+    return [
+        {"$lookup": lookup},
+        {
+            "$unwind": {
+                "path": "$gazette_details",
+                "preserveNullAndEmptyArrays": preserve_missing
+            }
+        }
+    ]
+
+
+def feed_gazette_fields(gazette):
+    return {k: gazette[k] for k in FEED_GAZETTE_FIELDS if k in gazette}
+
+
+def feed_doc(alert, gazette):
+    doc = dict(alert)
+    if gazette:
+        doc["gazette_details"] = feed_gazette_fields(gazette)
+    else:
+        doc.pop("gazette_details", None)
+    return doc
+
+
+async def alert_search_condition(db, regex_query, body=False):
+    """The $or used to search alerts joined with their gazette.
+
+    With `body`, gazette text is searched too. pdf_text is neither in the
+    feed nor carried through the lean $lookup, so the body match is resolved
+    against the stored text first (inline or in gazette_texts, capped at
+    BODY_MATCH_LIMIT gazettes) and applied as a gazette_id filter. Ranked
+    searches match bodies through the text indexes instead.
+    """
+    conditions = [
+        {"summary": regex_query},
+        {"reason": regex_query},
+        {"gazette_details.ministry": regex_query},
+        {"gazette_details.subject": regex_query},
+    ]
+    if body:
+        conditions.append({"gazette_id": {"$in": await gazette_ids_matching(db, regex_query)}})
+    return {"$or": conditions}
+
+
+def alerts_cursor(db, alert_match, joined_conditions=None, sort_order=-1,
+                  limit=100, require_gazette=False, projection=None,
+                  gazette_projection=None, batch_size=None):
+    """Cursor over alerts with their gazette details, newest/oldest by
+    alerted_at.
+
+    `alert_match` only references alert fields; `joined_conditions` may also
+    reference `gazette_details.*`. `projection` shapes the returned documents
+    and `gazette_projection` the joined gazette; None for the latter means
+    whole gazettes, which only the $lookup join can provide. Otherwise the
+    query is served from the feed once it is ready.
+    """
+    collection, stages = _match_stages(alert_match, joined_conditions, require_gazette, gazette_projection)
+    if collection == FEED_COLLECTION:
+        cursor = db[FEED_COLLECTION].find(stages[0]["$match"], projection).sort("alerted_at", sort_order)
+        if limit:
+            cursor.limit(limit)
+        if batch_size:
+            cursor.batch_size(batch_size)
+        return cursor
+
+    pipeline = [*stages, *_page_stages(sort_order, limit, projection)]
+    options = {"batchSize": batch_size} if batch_size else {}
+    return db.alerts.aggregate(pipeline, **options)
+
+
+def _match_stages(alert_match, joined_conditions, require_gazette, gazette_projection):
+    """(collection, stages) selecting the matching alerts with their gazette
+    fields: one $match on the feed when it can serve the query, otherwise
+    the $lookup join on alerts."""
+    joined_conditions = list(joined_conditions or [])
+    if require_gazette:
+        joined_conditions.append({"gazette_details.gazette_id": {"$exists": True}})
+
+    if feed_ready() and gazette_projection is not None:
+        query = dict(alert_match)
+        if joined_conditions:
+            query.setdefault("$and", []).extend(joined_conditions)
+        return FEED_COLLECTION, [{"$match": query}]
+
+    if gazette_projection is not None:
+        # Queries the feed could serve get the same gazette_details either way
+        gazette_projection = FEED_GAZETTE_PROJECTION
+    stages = [
+        {"$match": alert_match},
+        *gazette_lookup_stages(not require_gazette, gazette_projection)
+    ]
+    if joined_conditions:
+        stages.append({"$match": {"$and": joined_conditions}})
+    return "alerts", stages
+
+
+def _page_stages(sort_order, limit, projection):
+    stages = [{"$sort": {"alerted_at": sort_order}}]
+    if limit:
+        stages.append({"$limit": limit})
+    if projection:
+        stages.append({"$project": projection})
+    return stages
+
+
+async def find_alerts(db, alert_match, joined_conditions=None, sort_order=-1,
+                      limit=100, require_gazette=False, projection=None,
+                      gazette_projection=None):
+    """alerts_cursor() read into a list of at most `limit` alerts."""
+    cursor = alerts_cursor(
+        db, alert_match, joined_conditions, sort_order, limit,
+        require_gazette, projection, gazette_projection
+    )
+    return await cursor.to_list(length=limit)
+
+
+async def find_alerts_with_facets(db, facets, alert_match, joined_conditions=None, sort_order=-1,
+                                  limit=100, require_gazette=False, projection=None,
+                                  gazette_projection=None):
+    """find_alerts() plus facet counts over every matching alert, from one
+    aggregation. Returns (alerts, facets).
+
+    Whole gazettes (gazette_projection None) could push the single $facet
+    result past the 16MB document limit, so in that case the page is read
+    separately and the aggregation only counts.
+    """
+    collection, stages = _match_stages(alert_match, joined_conditions, require_gazette, gazette_projection)
+    hits = _page_stages(sort_order, limit, projection) if gazette_projection is not None else None
+    pipeline = [*stages, facet_pipeline(hits, "alerts", facets)]
+    alerts, counts = read_facets(await db[collection].aggregate(pipeline).to_list(length=1))
+    if gazette_projection is None:
+        alerts = await find_alerts(
+            db, alert_match, joined_conditions, sort_order, limit,
+            require_gazette, projection, gazette_projection
+        )
+    return alerts, counts
+
+
+# ── Keeping the feed in sync ────────────────────────────────────────────────
+
+async def sync_alert(db, alert_id):
+    """Re-copy one alert (and its gazette fields) into the feed."""
+    alert = await db.alerts.find_one({"_id": alert_id})
+    if not alert:
+        await db[FEED_COLLECTION].delete_one({"_id": alert_id})
+        return
+    gazette = None
+    if alert.get("gazette_id") is not None:
+        gazette = await db.gazettes.find_one(
+            {"gazette_id": alert["gazette_id"]},
+            {k: 1 for k in FEED_GAZETTE_FIELDS}
+        )
+    await db[FEED_COLLECTION].replace_one({"_id": alert_id}, feed_doc(alert, gazette), upsert=True)
+
+
+async def apply_alert_update(db, alert_id, fields):
+    """Mirror a $set applied to an alert onto its feed entry."""
+    if FEED_ENABLED:
+        await db[FEED_COLLECTION].update_one({"_id": alert_id}, {"$set": fields})
+
+
+async def apply_alert_updates(db, updates):
+    """Mirror a batch of {alert_id: fields} $sets onto the feed in one
+    bulk_write."""
+    if FEED_ENABLED and updates:
+        ops = [UpdateOne({"_id": alert_id}, {"$set": fields}) for alert_id, fields in updates.items()]
+        await db[FEED_COLLECTION].bulk_write(ops, ordered=False)
+
+
+async def sync_gazette(db, gazette_id):
+    """Refresh the embedded gazette fields on every feed entry that uses it."""
+    gazette = await db.gazettes.find_one(
+        {"gazette_id": gazette_id},
+        {k: 1 for k in FEED_GAZETTE_FIELDS}
+    )
+    if gazette:
+        update = {"$set": {"gazette_details": feed_gazette_fields(gazette)}}
+    else:
+        update = {"$unset": {"gazette_details": ""}}
+    await db[FEED_COLLECTION].update_many({"gazette_id": gazette_id}, update)
+
+
+async def ensure_feed_indexes(db):
+    # The registry imports this module's settings, so import it lazily
+    from indexes import ensure_indexes
+    await ensure_indexes(db, [FEED_COLLECTION])
+
+
+async def rebuild_feed(db):
+    """Rebuild the whole feed from alerts + gazettes in one server-side pass.
+
+    $out swaps the new collection in atomically and keeps existing indexes, so
+    readers never see a half-built feed.
+    """
+    started = datetime.utcnow()
+    gazette_subset = {k: f"$gazette_details.{k}" for k in FEED_GAZETTE_FIELDS}
+    pipeline = [
+        *gazette_lookup_stages(True, {k: 1 for k in FEED_GAZETTE_FIELDS}),
+        {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$$ROOT", {"gazette_details": gazette_subset}]}}},
+        {"$out": FEED_COLLECTION},
+    ]
+    await db.alerts.aggregate(pipeline).to_list(length=None)
+    # Alerts without a gazette end up with an empty object; drop it so the
+    # feed matches what the join returns
+    await db[FEED_COLLECTION].update_many({"gazette_details": {}}, {"$unset": {"gazette_details": ""}})
+    await ensure_feed_indexes(db)
+    await db[STATE_COLLECTION].update_one(
+        {"_id": STATE_ID},
+        {"$set": {"built_at": started, "synced_until": started}},
+        upsert=True
+    )
+    return await db[FEED_COLLECTION].estimated_document_count()
+
+
+async def _apply_change(db, change):
+    coll = change["ns"]["coll"]
+    if coll == "alerts":
+        await sync_alert(db, change["documentKey"]["_id"])
+    elif coll == "gazettes" and change.get("fullDocument"):
+        await sync_gazette(db, change["fullDocument"].get("gazette_id"))
+    response_cache.invalidate("alerts")
+
+
+async def _save_position(db, **fields):
+    await db[STATE_COLLECTION].update_one({"_id": STATE_ID}, {"$set": fields}, upsert=True)
+
+
+async def _catch_up(db):
+    """Sync every alert created or updated since synced_until, and every
+    gazette inserted or stamped with updated_at since then. Covers what was
+    written while nothing was following the collections."""
+    state = await db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+    since = state.get("synced_until") or datetime.utcnow()
+    now = datetime.utcnow()
+    synced = 0
+    alerts = db.alerts.find(
+        {"$or": [{"alerted_at": {"$gte": since}}, {"updated_at": {"$gte": since}}]}, {"_id": 1}
+    )
+    async for alert in alerts:
+        await sync_alert(db, alert["_id"])
+        synced += 1
+    # Gazettes carry no reliable edit stamp; new ones are found by their
+    # ObjectId's creation time, edited ones only when the writer set updated_at
+    gazettes = db.gazettes.find(
+        {"$or": [{"_id": {"$gte": ObjectId.from_datetime(since)}}, {"updated_at": {"$gte": since}}]},
+        {"gazette_id": 1}
+    )
+    async for gazette in gazettes:
+        if gazette.get("gazette_id") is not None:
+            await sync_gazette(db, gazette["gazette_id"])
+            synced += 1
+    if synced:
+        response_cache.invalidate("alerts")
+    await _save_position(db, synced_until=now)
+    _state["synced_until"] = now
+    return synced
+
+
+async def _watch_changes(db):
+    """Follow the change stream, resuming from the saved token. Without one
+    the stream is opened first and the gap since synced_until is caught up
+    afterwards, so nothing written in between is missed (changes seen twice
+    are re-synced harmlessly)."""
+    state = await db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+    token = state.get("resume_token")
+    pipeline = [{"$match": {"ns.coll": {"$in": ["alerts", "gazettes"]}}}]
+    async with db.watch(pipeline, full_document="updateLookup", resume_after=token) as stream:
+        if token is None:
+            await _catch_up(db)
+        _state.update(ready=True, mode="change_stream", error=None)
+        print(f"Alert feed: following change stream{' (resumed)' if token else ''}")
+        async for change in stream:
+            await _apply_change(db, change)
+            now = datetime.utcnow()
+            await _save_position(db, resume_token=stream.resume_token, synced_until=now)
+            _state["synced_until"] = now
+
+
+async def _poll_changes(db):
+    """Fallback for standalone servers: catch up every FEED_POLL_SECONDS.
+    Gazette edits are only seen when the writer stamps updated_at; the mode
+    is reported by feed_status()."""
+    print(f"Alert feed: polling every {FEED_POLL_SECONDS:g}s")
+    while True:
+        await _catch_up(db)
+        _state.update(ready=True, mode="polling", error=None)
+        await asyncio.sleep(FEED_POLL_SECONDS)
+
+
+def change_streams_unsupported(error):
+    return isinstance(error, OperationFailure) and (
+        error.code == CHANGE_STREAM_UNSUPPORTED or "replica set" in str(error)
+    )
+
+
+async def feed_built(db):
+    state = await db[STATE_COLLECTION].find_one({"_id": STATE_ID})
+    return bool(state and state.get("built_at"))
+
+
+async def use_existing_feed(db):
+    """For scripts: read from the feed if it has been built, without
+    starting the sync loop. Returns whether the feed is in use."""
+    _state["ready"] = FEED_ENABLED and await feed_built(db)
+    return _state["ready"]
+
+
+def feed_status():
+    """For GET /admin/feed: whether the feed is serving, how it is kept in
+    sync and when it last caught up."""
+    status = {
+        "enabled": FEED_ENABLED,
+        "ready": feed_ready(),
+        "mode": _state.get("mode"),
+        "synced_until": _state.get("synced_until"),
+        "error": _state.get("error"),
+        "writer": _state.get("lock") is not None,
+    }
+    if status["mode"] == "polling":
+        status["degraded"] = "gazette edits reach the feed only when updated_at is set; rebuild to pick up others"
+    return status
+
+
+async def _follow_changes(db):
+    """Keep the feed in sync for as long as the app runs. A failure marks the
+    feed not ready (list endpoints go back to $lookup) until a retry has
+    caught up again."""
+    use_stream = True
+    while True:
+        try:
+            if use_stream:
+                await _watch_changes(db)
+            else:
+                await _poll_changes(db)
+        except OperationFailure as e:
+            if use_stream and change_streams_unsupported(e):
+                # Change streams need a replica set
+                use_stream = False
+                continue
+            if e.code in RESUME_FAILURES:
+                # The saved token is too old or invalid: start over from synced_until
+                print(f"Alert feed: cannot resume change stream ({e}); catching up")
+                await db[STATE_COLLECTION].update_one({"_id": STATE_ID}, {"$unset": {"resume_token": ""}})
+                continue
+            _sync_failed(e)
+        except PyMongoError as e:
+            _sync_failed(e)
+        await asyncio.sleep(FEED_RETRY_SECONDS)
+
+
+def _sync_failed(error):
+    print(f"Alert feed: sync failed, serving $lookup until it recovers: {error}")
+    _state.update(ready=False, error=str(error))
+
+
+async def _build_feed(db):
+    """Build the feed if it has never been built; whether it is usable."""
+    try:
+        if not await feed_built(db):
+            print("Alert feed: building for the first time...")
+            count = await rebuild_feed(db)
+            print(f"Alert feed: built with {count} alerts")
+        else:
+            await ensure_feed_indexes(db)
+        return True
+    except PyMongoError as e:
+        print(f"Alert feed unavailable, falling back to $lookup: {e}")
+        _state.update(ready=False, error=str(e))
+        return False
+
+
+async def _await_writer(db):
+    """In the other workers: serve the feed once the writer has built it."""
+    try:
+        built = await feed_built(db)
+    except PyMongoError as e:
+        _state.update(ready=False, error=str(e))
+        return
+    _state.update(ready=built, mode="reader", error=None)
+
+
+async def run_alert_feed(db):
+    """Startup task: in one worker, build the feed if it has never been built
+    and keep it in sync; in the others, wait for it to be built. List
+    endpoints use the $lookup join until the feed is ready."""
+    if not FEED_ENABLED:
+        return
+    try:
+        while True:
+            _state["lock"] = await asyncio.to_thread(try_lock, FEED_LOCK_PATH)
+            if _state["lock"] is not None:
+                break
+            # Another worker writes the feed and the resume token; retry the
+            # lock every pass in case it exits
+            await _await_writer(db)
+            await asyncio.sleep(FEED_POLL_SECONDS)
+
+        while not await _build_feed(db):
+            await asyncio.sleep(FEED_RETRY_SECONDS)
+        await _follow_changes(db)
+    finally:
+        # Cancelled at shutdown or died on something unexpected: the feed
+        # is no longer being kept current
+        _state["ready"] = False
@@ -0,0 +1,180 @@
+import asyncio
+import os
+from datetime import datetime
+from pymongo.errors import PyMongoError
+from alert_feed import change_streams_unsupported
+from serialization import encode
+
+# One shared watcher feeds every /alerts/stream client, so N open tabs cost a
+# single change stream (or a single poll loop) instead of N polls.
+STREAM_POLL_SECONDS = float(os.getenv("ALERT_STREAM_POLL_SECONDS", "5"))
+STREAM_HEARTBEAT_SECONDS = 15
+# Recount at most this often however many changes arrive (triage bursts)
+STREAM_MIN_REFRESH_SECONDS = 1
+SUBSCRIBER_QUEUE_SIZE = 100
+# A failed change stream is retried with exponential backoff, polling in the
+# meantime. A server without change streams (standalone) is only rechecked
+# every STREAM_RECHECK_SECONDS, in case it has become a replica set.
+STREAM_RETRY_SECONDS = float(os.getenv("ALERT_STREAM_RETRY_SECONDS", "1"))
+STREAM_RETRY_MAX_SECONDS = float(os.getenv("ALERT_STREAM_RETRY_MAX_SECONDS", "60"))
+STREAM_RECHECK_SECONDS = float(os.getenv("ALERT_STREAM_RECHECK_SECONDS", "300"))
+
+PENDING = {"slack_sent": False}
+ALERT_EVENT_FIELDS = ["summary", "priority", "gazette_id", "alerted_at"]
+
+
+def format_event(event, data):
+    """One Server-Sent Events frame."""
+    return f"event: {event}\ndata: {encode(data).decode()}\n\n"
+
+
+def _alert_event(alert):
+    data = {"id": str(alert["_id"])}
+    data.update({k: alert.get(k) for k in ALERT_EVENT_FIELDS})
+    return data
+
+
+class AlertBroadcaster:
+    def __init__(self):
+        self.db = None
+        self.count = None
+        self._subscribers = set()
+        self._dirty = asyncio.Event()
+        self._task = None
+        self._last_seen = None # newest alerted_at already announced (poll mode)
+        self._stream_open = False
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def request_refresh(self):
+        """Ask the watcher to recount soon, e.g. after /alerts/{id}/action."""
+        self._dirty.set()
+
+    def _publish(self, frame):
+        for queue in self._subscribers:
+            if queue.full():
+                # Slow client: drop its oldest frame rather than block everyone
+                queue.get_nowait()
+            queue.put_nowait(frame)
+
+    async def _refresh_count(self):
+        count = await self.db.alerts.count_documents(PENDING)
+        if count != self.count:
+            self.count = count
+            self._publish(format_event("count", {"count": count}))
+
+    async def _refresh_loop(self, poll):
+        while True:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=STREAM_POLL_SECONDS if poll else None)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+            try:
+                if poll:
+                    await self._poll_new_alerts()
+                await self._refresh_count()
+            except PyMongoError as e:
+                print(f"Alert stream: refresh failed: {e}")
+            await asyncio.sleep(STREAM_MIN_REFRESH_SECONDS)
+
+    async def _poll_new_alerts(self):
+        query = dict(PENDING)
+        if self._last_seen:
+            query["alerted_at"] = {"$gt": self._last_seen}
+        fresh = await self.db.alerts.find(query).sort("alerted_at", -1).limit(20).to_list(length=20)
+        if self._last_seen is None:
+            # First pass only establishes where "new" starts
+            self._last_seen = fresh[0]["alerted_at"] if fresh else datetime.utcnow()
+            return
+        for alert in reversed(fresh):
+            self._publish(format_event("alert", _alert_event(alert)))
+        if fresh:
+            self._last_seen = fresh[0]["alerted_at"]
+
+    async def _watch_changes(self):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        async with self.db.alerts.watch(pipeline) as stream:
+            print("Alert stream: following change stream")
+            self._stream_open = True
+            async for change in stream:
+                alert = change.get("fullDocument")
+                if change["operationType"] == "insert" and alert and alert.get("slack_sent") is False:
+                    self._publish(format_event("alert", _alert_event(alert)))
+                self._dirty.set()
+
+    def _switch_refresher(self, refresher, poll):
+        if refresher:
+            refresher.cancel()
+        return asyncio.create_task(self._refresh_loop(poll=poll))
+
+    async def _run(self):
+        delay = STREAM_RETRY_SECONDS
+        refresher = None
+        try:
+            while True:
+                refresher = self._switch_refresher(refresher, poll=False)
+                self._stream_open = False
+                try:
+                    await self._watch_changes()
+                    error = "stream closed"
+                except PyMongoError as e:
+                    error = e
+                # Poll until the change stream is retried
+                refresher = self._switch_refresher(refresher, poll=True)
+                if change_streams_unsupported(error):
+                    wait = STREAM_RECHECK_SECONDS
+                    print(f"Alert stream: change streams unsupported ({error}), polling every {STREAM_POLL_SECONDS:g}s")
+                else:
+                    if self._stream_open:
+                        # It ran for a while: start the backoff over
+                        delay = STREAM_RETRY_SECONDS
+                    wait = delay
+                    delay = min(delay * 2, STREAM_RETRY_MAX_SECONDS)
+                    print(f"Alert stream: change stream failed ({error}), polling; retrying in {wait:g}s")
+                await asyncio.sleep(wait)
+        finally:
+            if refresher:
+                refresher.cancel()
+
+    def _start(self):
+        self._dirty.set()
+        self._task = asyncio.create_task(self._run())
+
+    def _stop(self):
+        if self._task:
+            self._task.cancel()
+        self._task = None
+        self.count = None
+        self._last_seen = None
+
+    async def subscribe(self, db):
+        """Yield SSE frames for one client until it disconnects. The shared
+        watcher runs only while at least one client is connected."""
+        self.db = db
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if len(self._subscribers) == 1:
+            self._start()
+        try:
+            count = self.count
+            if count is None:
+                count = await db.alerts.count_documents(PENDING)
+                if self.count is None:
+                    self.count = count
+            yield format_event("count", {"count": count})
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment frame keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+        finally:
+            self._subscribers.discard(queue)
+            if not self._subscribers:
+                self._stop()
+
+
+alert_broadcaster = AlertBroadcaster()
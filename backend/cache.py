@@ -0,0 +1,121 @@
+import functools
+import os
+import time
+from collections import OrderedDict
+
+# Small in-process response cache for the dashboard's hot, slow-changing
+# endpoints. Each uvicorn worker has its own copy: writes invalidate the
+# worker that handled them and the others converge within the route's TTL.
+CACHE_ENABLED = os.getenv("RESPONSE_CACHE", "1") != "0"
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+
+
+class ResponseCache:
+    """Bounded LRU cache whose entries expire after a per-entry TTL and can
+    be invalidated by tag."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # key -> (expires_at, tags, value)
+        self._generations = {} # tag -> bumped on every invalidation
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._listeners = []
+
+    def on_invalidate(self, callback):
+        """Call `callback(tags)` on every invalidation, for in-memory state
+        derived from the same data (the dashboard snapshot)."""
+        self._listeners.append(callback)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def set(self, key, value, ttl, tags=()):
+        self._entries[key] = (time.monotonic() + ttl, tuple(tags), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def generation(self, tags):
+        return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of `tags`."""
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+        stale = [key for key, (_, entry_tags, _) in self._entries.items() if set(entry_tags) & set(tags)]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += 1
+        for callback in self._listeners:
+            callback(tags)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": CACHE_ENABLED,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache()
+
+
+def cache_key(route, params):
+    """Key from the route name and its query parameters, ignoring unset
+    ones and parameter order."""
+    normalized = tuple(sorted(
+        (name, str(value).strip()) for name, value in params.items()
+        if value is not None and str(value).strip() != ""
+    ))
+    return (route, normalized)
+
+
+def cached(route, ttl, tags=()):
+    """Cache a GET handler's return value for `ttl` seconds.
+
+    The handler must only take query parameters. Entries are dropped early
+    by response_cache.invalidate(<tag>) when the underlying data changes.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(**params):
+            if not CACHE_ENABLED:
+                return await handler(**params)
+
+            key = cache_key(route, params)
+            hit, value = response_cache.get(key)
+            if hit:
+                return value
+
+            # Don't store a result computed across an invalidation
+            generation = response_cache.generation(tags)
+            value = await handler(**params)
+            if response_cache.generation(tags) == generation:
+                response_cache.set(key, value, ttl, tags)
+            return value
+        return wrapper
+    return decorator
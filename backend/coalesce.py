@@ -0,0 +1,86 @@
+import asyncio
+import functools
+import os
+from cache import cache_key, response_cache
+from conditional import prepare
+from metrics import COALESCED_REQUESTS
+
+# Single-flight for the hot list and search routes. When a batch of alerts
+# lands, reviewers load the same page with the same parameters within the
+# same second; the first request (the leader) runs the handler and every
+# identical request that arrives while it is in flight waits for that one
+# result instead of sending its own query. The result is fingerprinted once
+# and shared by all of them; it is encoded once, when the first of them
+# needs a 200 body. Nothing is kept after the call
+# completes: that is the response cache's job, with its own TTLs.
+#
+# Like the response cache this is per worker, and keyed the same way: the
+# route plus its normalized query parameters. The key also carries the
+# route's cache tag generations, so a request arriving after a write never
+# joins a query that started before it.
+COALESCE_ENABLED = os.getenv("REQUEST_COALESCING", "1") != "0"
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {} # key -> task running the shared call
+        self.leaders = 0
+        self.collapsed = 0
+
+    async def do(self, key, fn):
+        """Await fn(), or the call already in flight under `key`."""
+        task = self._calls.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+            self.leaders += 1
+            COALESCED_REQUESTS.inc((key[0], "leader"))
+        else:
+            self.collapsed += 1
+            COALESCED_REQUESTS.inc((key[0], "collapsed"))
+        # A client that disconnects cancels only its own wait, not the
+        # query the other requests share
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception() # retrieved even if every waiter went away
+
+    def stats(self):
+        calls = self.leaders + self.collapsed
+        return {
+            "enabled": COALESCE_ENABLED,
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "collapse_ratio": round(self.collapsed / calls, 3) if calls else None,
+        }
+
+
+single_flight = SingleFlight()
+
+
+def coalesced(route, tags=()):
+    """Share one in-flight call of a GET handler between concurrent requests
+    with the same query parameters.
+
+    Goes directly under @conditional, which serves the shared result and
+    encodes it at most once (see conditional.Prepared). `tags` are the
+    response cache tags whose invalidation must start a fresh call.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(**params):
+            if not COALESCE_ENABLED:
+                return await handler(**params)
+
+            async def call():
+                return prepare(await handler(**params))
+
+            key = (*cache_key(route, params), response_cache.generation(tags))
+            return await single_flight.do(key, call)
+        return wrapper
+    return decorator
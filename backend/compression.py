@@ -0,0 +1,177 @@
+import os
+import zlib
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: without it clients just get gzip
+    brotli = None
+
+# Responses smaller than this are sent as-is; compressing them costs more
+# CPU than it saves on the wire
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Brotli quality 11 is far too slow for per-request use
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# Chunks at least this large are compressed in a worker thread
+THREAD_MIN_BYTES = 128 * 1024
+
+
+def _quality_values(header):
+    """{encoding: q} from an Accept-Encoding header, names lowercased."""
+    qualities = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name.strip():
+            qualities[name.strip().lower()] = q
+    return qualities
+
+
+def _accepts(qualities, encoding):
+    # An explicit entry, q=0 included, overrides the wildcard
+    return qualities.get(encoding, qualities.get("*", 0)) > 0
+
+
+def negotiate_encoding(header):
+    """Pick br, gzip or None (identity) for an Accept-Encoding header."""
+    qualities = _quality_values(header or "")
+    if brotli is not None and _accepts(qualities, "br"):
+        return "br"
+    if _accepts(qualities, "gzip"):
+        return "gzip"
+    return None
+
+
+# Sent as they are: already compressed, or event streams, which must reach
+# the client as each event is written
+EXCLUDED_CONTENT_TYPES = (
+    "text/event-stream", "application/gzip", "application/x-gzip", "application/zip",
+    "image/", "audio/", "video/", "font/woff",
+)
+
+
+class GzipCompressor:
+    def __init__(self, level=GZIP_LEVEL):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body, more_body):
+        # Flush each streamed chunk so clients can start parsing immediately
+        if more_body:
+            return self._compressor.compress(body) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return self._compressor.compress(body) + self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality=BROTLI_QUALITY):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, body, more_body):
+        data = self._compressor.process(body)
+        if more_body:
+            return data + self._compressor.flush()
+        return data + self._compressor.finish()
+
+
+COMPRESSORS = {"gzip": GzipCompressor, "br": BrotliCompressor}
+
+
+class Responder:
+    """Compresses one response with `encoding` (None: sends it as is).
+
+    http.response.start is held back until the first body chunk, which
+    shows whether the response is small enough to send uncompressed.
+    Streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size, encoding=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoding = encoding
+        self.compressor = COMPRESSORS[encoding]() if encoding else None
+        self.send = None
+        self.start = None # the held start message, until it is sent
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self._send)
+
+    async def _compress(self, body, more_body):
+        if len(body) >= THREAD_MIN_BYTES:
+            return await anyio.to_thread.run_sync(self.compressor.compress, body, more_body)
+        return self.compressor.compress(body, more_body)
+
+    async def _send(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+            self.passthrough = (
+                "content-encoding" in headers or message["status"] == 206
+                or media_type.startswith(EXCLUDED_CONTENT_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start = message
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            if self.start is not None and message["type"] == "http.response.pathsend":
+                # Files sent by path go out as they are
+                await self.send(self.start)
+                self.start = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is None:
+            # A later chunk of a streamed body
+            if self.compressor is not None:
+                message["body"] = await self._compress(body, more_body)
+            await self.send(message)
+            return
+
+        start, self.start = self.start, None
+        headers = MutableHeaders(raw=start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if self.compressor is not None and (more_body or len(body) >= self.minimum_size):
+            message["body"] = await self._compress(body, more_body)
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+        await self.send(start)
+        await self.send(message)
+
+
+class CompressionMiddleware:
+    """gzip / brotli response compression negotiated from Accept-Encoding.
+
+    Streamed bodies are compressed chunk by chunk and event streams are
+    left alone. Only Starlette's public header classes are used, so the
+    middleware doesn't depend on its GZip internals.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        await Responder(self.app, self.minimum_size, encoding)(scope, receive, send)
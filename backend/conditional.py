@@ -0,0 +1,196 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from serialization import encode_body, json_response
+
+# Conditional GET support. Routes that pass a `version` (versions.py) get
+# their validator from it before the handler runs, so a matching
+# If-None-Match is answered with 304 without running the query at all.
+#
+# Routes without one have their result fingerprinted instead: documents by
+# identity (id + updated_at), documents without updated_at (scraped
+# livelaw/ichr records, gazettes) by content. That still skips the encode on
+# a 304, but not the query.
+CACHE_PUBLIC = "public, max-age=30, must-revalidate"
+CACHE_DETAIL = "public, max-age=300, must-revalidate"
+CACHE_PRIVATE = "private, no-cache"
+# Responses marked {"partial": true} (a /search source timed out) are
+# served but never stored, so a retry gets fresh results
+CACHE_NO_STORE = "no-store"
+PARTIAL_KEY = "partial"
+# Diagnostics that must not change the validator
+VOLATILE_KEYS = {"timings_ms", "generated_at"}
+
+
+def _fingerprint(value):
+    if isinstance(value, dict):
+        if "id" in value and value.get("updated_at") is not None:
+            # A serialized document with a revision: identity and revision are
+            # enough, plus the embedded gazette, which is revised separately
+            return ("doc", value["id"], value["updated_at"], value.get("slack_sent"), value.get("_score"),
+                    _fingerprint(value.get("gazette_details")))
+        return tuple((k, _fingerprint(v)) for k, v in value.items() if k not in VOLATILE_KEYS)
+    if isinstance(value, (list, tuple)):
+        return tuple(_fingerprint(v) for v in value)
+    return value
+
+
+def _is_partial(value):
+    return isinstance(value, dict) and value.get(PARTIAL_KEY) is True
+
+
+def _last_modified(value, latest=None):
+    if isinstance(value, dict):
+        updated = value.get("updated_at")
+        if isinstance(updated, datetime) and (latest is None or updated > latest):
+            latest = updated
+        for v in value.values():
+            if isinstance(v, (dict, list)):
+                latest = _last_modified(v, latest)
+    elif isinstance(value, list):
+        for v in value:
+            latest = _last_modified(v, latest)
+    return latest
+
+
+def content_digest(value):
+    """A short hash of a document's content, for documents without updated_at."""
+    return hashlib.blake2b(repr(_fingerprint(value)).encode(), digest_size=12).hexdigest()
+
+
+def make_etag(*parts):
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def is_not_modified(request, etag, last_modified=None):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: ignore W/ prefixes on either side
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def _as_utc(dt):
+    # Mongo datetimes come back naive but are UTC
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def validator_headers(etag, last_modified=None, cache_control=CACHE_PUBLIC):
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def not_modified_response(etag, last_modified=None, cache_control=CACHE_PUBLIC):
+    return Response(status_code=304, headers=validator_headers(etag, last_modified, cache_control))
+
+
+class Prepared:
+    """A handler result with its validator inputs worked out once, so
+    requests sharing the result (coalesce.py) only add headers. The body is
+    encoded on first use, and only once: a waiter answered with 304 never
+    pays for it."""
+
+    __slots__ = ("result", "last_modified", "partial", "_fingerprint", "_encoding")
+
+    def __init__(self, result):
+        self.result = result
+        self.last_modified = _last_modified(result)
+        self.partial = _is_partial(result)
+        self._fingerprint = None
+        self._encoding = None
+
+    @property
+    def fingerprint(self):
+        # Only routes without a version need it
+        if self._fingerprint is None:
+            self._fingerprint = _fingerprint(self.result)
+        return self._fingerprint
+
+    async def body(self):
+        if self._encoding is None:
+            self._encoding = asyncio.ensure_future(encode_body(self.result))
+        # One waiter going away must not cancel the encode the others share
+        return await asyncio.shield(self._encoding)
+
+
+def prepare(result):
+    if isinstance(result, (Response, Prepared)):
+        return result
+    return Prepared(result)
+
+
+async def _partial_response(result):
+    headers = {"Cache-Control": CACHE_NO_STORE}
+    if isinstance(result, Prepared):
+        return Response(await result.body(), headers=headers, media_type="application/json")
+    return await json_response(result, headers=headers)
+
+
+def conditional(cache_control=CACHE_PUBLIC, version=None):
+    """Add ETag / Last-Modified / Cache-Control to a GET handler's response
+    and answer 304 when the client's copy is still current.
+
+    `version` is an async callable returning the state of the data the
+    route reads; when given, the ETag is derived from it and checked before
+    the handler runs."""
+    def decorator(handler):
+        signature = inspect.signature(handler)
+        wants_request = "request" in signature.parameters
+
+        @functools.wraps(handler)
+        async def wrapper(request: Request, **params):
+            etag = None
+            if version is not None:
+                try:
+                    etag = make_etag(request.url.path, request.url.query, await version())
+                except Exception as e:
+                    # Fall back to fingerprinting the result
+                    print(f"Conditional: could not read version for {request.url.path}: {e}")
+                if etag is not None and is_not_modified(request, etag):
+                    return not_modified_response(etag, cache_control=cache_control)
+
+            if wants_request:
+                params["request"] = request
+            result = await handler(**params)
+            if isinstance(result, Response):
+                return result
+
+            if isinstance(result, Prepared):
+                last_modified, partial = result.last_modified, result.partial
+            else:
+                last_modified, partial = _last_modified(result), _is_partial(result)
+            if partial:
+                return await _partial_response(result)
+            if etag is None:
+                fingerprint = result.fingerprint if isinstance(result, Prepared) else _fingerprint(result)
+                etag = make_etag(request.url.path, request.url.query, fingerprint)
+            if is_not_modified(request, etag, last_modified):
+                return not_modified_response(etag, last_modified, cache_control)
+            headers = validator_headers(etag, last_modified, cache_control)
+            if isinstance(result, Prepared):
+                return Response(await result.body(), headers=headers, media_type="application/json")
+            return await json_response(result, headers=headers)
+
+        parameters = [p for p in signature.parameters.values() if p.name != "request"]
+        parameters.append(inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import traceback
+from datetime import datetime
+from alert_feed import FEED_COLLECTION, FEED_GAZETTE_FIELDS, feed_ready, gazette_lookup_stages
+from cache import response_cache
+from facets import ALERT_TAGS
+from projection import list_projection
+
+# Everything the landing page shows, in one response served from memory:
+# the latest livelaw / ichr items, the newest processed alerts, and pending /
+# processed / per-tag counts. A background task rebuilds the snapshot every
+# DASHBOARD_REFRESH_SECONDS, and soon after any write that invalidates the
+# "alerts" cache tag, so page loads never run the alerts join.
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "30"))
+# Bursts of writes (bulk actions) collapse into one rebuild per interval
+DASHBOARD_MIN_REFRESH_SECONDS = float(os.getenv("DASHBOARD_MIN_REFRESH_SECONDS", "2"))
+LATEST_ITEMS = 3
+HIGHLIGHT_ITEMS = 6
+STALE_TAGS = {"alerts"}
+
+
+def _alerts_pipeline():
+    """One $facet over the alerts (or the feed, which embeds the gazette
+    fields) for the counts and the highlighted processed alerts."""
+    highlights = [
+        {"$match": {"slack_sent": True}},
+        {"$sort": {"alerted_at": -1}},
+        {"$limit": HIGHLIGHT_ITEMS},
+    ]
+    if not feed_ready():
+        # Joined after the limit, so only HIGHLIGHT_ITEMS gazettes are read
+        highlights += gazette_lookup_stages(projection={field: 1 for field in FEED_GAZETTE_FIELDS})
+    highlights.append({"$project": list_projection("alerts")})
+
+    tag_counts = {tag: {"$sum": {"$cond": [{"$eq": [f"${tag}", True]}, 1, 0]}} for tag in ALERT_TAGS}
+    return [
+        {"$match": {"slack_sent": {"$in": [True, False]}}},
+        {"$facet": {
+            "pending": [{"$match": {"slack_sent": False}}, {"$count": "n"}],
+            "processed": [
+                {"$match": {"slack_sent": True}},
+                {"$group": {"_id": None, "n": {"$sum": 1}, **tag_counts}},
+            ],
+            "highlights": highlights,
+        }},
+    ]
+
+
+async def build_snapshot(db):
+    # Imported here: the router imports this module
+    from routers.general import format_result
+
+    source = db[FEED_COLLECTION] if feed_ready() else db.alerts
+    livelaw = db.livelaw.find({}, list_projection("livelaw")).sort("published_at", -1).limit(LATEST_ITEMS)
+    ichr = db.ichr.find({}, list_projection("ichr")).sort("Date", -1).limit(LATEST_ITEMS)
+    livelaw, ichr, facets = await asyncio.gather(
+        livelaw.to_list(length=LATEST_ITEMS),
+        ichr.to_list(length=LATEST_ITEMS),
+        source.aggregate(_alerts_pipeline()).to_list(length=1),
+    )
+    facets = facets[0] if facets else {}
+    pending = facets.get("pending") or [{}]
+    processed = facets.get("processed") or [{}]
+    return {
+        "livelaw": [format_result(doc, "livelaw") for doc in livelaw],
+        "ichr": [format_result(doc, "ichr") for doc in ichr],
+        "gazettes": [format_result(doc, "gazette") for doc in facets.get("highlights", [])],
+        "counts": {
+            "pending": pending[0].get("n", 0),
+            "processed": processed[0].get("n", 0),
+            "tags": {tag: processed[0].get(tag, 0) for tag in ALERT_TAGS},
+        },
+        "generated_at": datetime.utcnow().isoformat(),
+    }
+
+
+class DashboardSnapshot:
+    def __init__(self):
+        self.value = None
+        self.builds = 0
+        self._dirty = asyncio.Event()
+        self._lock = asyncio.Lock()
+        response_cache.on_invalidate(self._on_invalidate)
+
+    def _on_invalidate(self, tags):
+        if STALE_TAGS & set(tags):
+            self._dirty.set()
+
+    async def refresh(self, db):
+        async with self._lock:
+            self.value = await build_snapshot(db)
+            self.builds += 1
+        return self.value
+
+    async def get(self, db):
+        """The current snapshot; built on the spot only before the
+        background task's first pass."""
+        if self.value is None:
+            async with self._lock:
+                if self.value is None:
+                    self.value = await build_snapshot(db)
+                    self.builds += 1
+        return self.value
+
+    async def run(self, db):
+        """Startup task: keep the snapshot fresh."""
+        while True:
+            try:
+                await self.refresh(db)
+            except Exception as e:
+                # Any failure (a bad document included) must not stop the
+                # refreshes; cancellation still ends the task
+                print(f"Dashboard: refresh failed: {e!r}")
+                traceback.print_exc()
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=DASHBOARD_REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.sleep(DASHBOARD_MIN_REFRESH_SECONDS)
+            self._dirty.clear()
+
+
+dashboard_snapshot = DashboardSnapshot()
@@ -1,6 +1,9 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference
 import os
 from dotenv import load_dotenv
+from metrics import mongo_listener
+from query_plans import command_capture
 
 load_dotenv()
 
@@ -9,8 +12,96 @@ if not MONGODB_URI:
     # Fallback for local development if .env is missing or not loaded correctly
     MONGODB_URI = "mongodb://127.0.0.1:27017/dashboard"
 
-client = AsyncIOMotorClient(MONGODB_URI)
-db = client.get_default_database()
+# Client options, each left to the driver default (or the URI) when unset:
+#   MONGO_MAX_POOL_SIZE / MONGO_MIN_POOL_SIZE   connections per server
+#   MONGO_MAX_IDLE_MS                           close pooled connections idle this long
+#   MONGO_COMPRESSORS                           e.g. "zstd,snappy,zlib"
+#   MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS
+#   MONGO_WAIT_QUEUE_TIMEOUT_MS                 how long a request waits for a free connection
+# MONGO_READ_PREFERENCE (e.g. "secondaryPreferred") applies to read_db only,
+# which the read-only routes use; writes and read-your-writes paths use db.
+CLIENT_OPTIONS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", int),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", int),
+    "maxIdleTimeMS": ("MONGO_MAX_IDLE_MS", int),
+    "compressors": ("MONGO_COMPRESSORS", str),
+    "serverSelectionTimeoutMS": ("MONGO_SERVER_SELECTION_TIMEOUT_MS", int),
+    "connectTimeoutMS": ("MONGO_CONNECT_TIMEOUT_MS", int),
+    "socketTimeoutMS": ("MONGO_SOCKET_TIMEOUT_MS", int),
+    "waitQueueTimeoutMS": ("MONGO_WAIT_QUEUE_TIMEOUT_MS", int),
+}
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+
+def client_options():
+    options = {}
+    for option, (env, cast) in CLIENT_OPTIONS.items():
+        value = os.getenv(env)
+        if value:
+            options[option] = cast(value)
+    return options
+
+
+_state = {"client": None, "db": None, "read_db": None}
+
+
+def connect():
+    """Create the client. Called from the app lifespan (or a script) once an
+    event loop is running, so importing this module opens no connections."""
+    if _state["client"] is not None:
+        return _state["client"]
+    if READ_PREFERENCE not in READ_PREFERENCES:
+        raise ValueError(f"MONGO_READ_PREFERENCE must be one of {', '.join(READ_PREFERENCES)}")
+    # mongo_listener feeds the mongo_* series on /metrics; command_capture
+    # records queries for explain (query_plans.py)
+    client = AsyncIOMotorClient(
+        MONGODB_URI, event_listeners=[mongo_listener, command_capture], **client_options()
+    )
+    database = client.get_default_database()
+    _state["client"] = client
+    _state["db"] = database
+    _state["read_db"] = client.get_database(database.name, read_preference=READ_PREFERENCES[READ_PREFERENCE])
+    return client
+
+
+def close():
+    client = _state["client"]
+    if client is not None:
+        client.close()
+    _state.update(client=None, db=None, read_db=None)
+
+
+class _Proxy:
+    """Stands in for the client or a database until connect() has run, so
+    routers can keep `from database import db` at import time."""
+
+    def __init__(self, key):
+        self._key = key
+
+    def _target(self):
+        target = _state[self._key]
+        if target is None:
+            raise RuntimeError("MongoDB client not connected; call database.connect() first")
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __getitem__(self, name):
+        return self._target()[name]
+
+
+client = _Proxy("client")
+db = _Proxy("db")
+read_db = _Proxy("read_db")
+
 
 async def verify_conn():
     try:
@@ -22,12 +113,5 @@ async def verify_conn():
     except Exception as e:
         print(f"\nMONGODB CONNECTION FAILED: {e}\n")
 
-import asyncio
-# Run verification in background if loop exists
-try:
-    asyncio.get_running_loop()
-    asyncio.create_task(verify_conn())
-except RuntimeError:
-    pass # No running loop, skip background verification
 async def get_database():
     return db
@@ -0,0 +1,124 @@
+import os
+from datetime import datetime
+
+# Every source stores its publication date as a string in its own format.
+# The migration in migrate_dates.py copies it into two normalized fields:
+#   _date       native BSON datetime, indexed and used by range filters
+#   _timestamp  epoch milliseconds, used for cross-source sorting in /search
+DATE_FIELD = "_date"
+TIMESTAMP_FIELD = "_timestamp"
+
+# collection -> (raw date field, strptime format; None means ISO 8601)
+SOURCE_DATE_FIELDS = {
+    "livelaw": ("published_at", None),
+    "ichr": ("Date", "%d.%m.%Y"),
+    "gazettes": ("publish_date", "%d/%m/%Y"),
+}
+
+# Documents written before the migration ran have no _date yet. While this is
+# on, range filters also match them through the old string-based predicates.
+LEGACY_DATE_FALLBACK = os.getenv("LEGACY_DATE_FALLBACK", "1") != "0"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def parse_source_date(collection, value):
+    """Parse a raw date value from `collection`, or None if it can't be read."""
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str):
+        return None
+    _, fmt = SOURCE_DATE_FIELDS[collection]
+    try:
+        if fmt is None:
+            # Remove Z if present for fromisoformat
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return datetime.strptime(value, fmt)
+    except ValueError:
+        return None
+
+
+def to_timestamp(collection, value):
+    """Epoch milliseconds for a raw date value, 0 when it can't be parsed."""
+    if isinstance(value, (int, float)):
+        return value
+    parsed = parse_source_date(collection, value)
+    return parsed.timestamp() * 1000 if parsed else 0
+
+
+def normalized_date_fields(collection, value):
+    """The fields the migration writes for a document's raw date value."""
+    parsed = parse_source_date(collection, value)
+    return {
+        # Keep the wall-clock date so day filters behave like the string ones
+        DATE_FIELD: parsed.replace(tzinfo=None) if parsed else None,
+        TIMESTAMP_FIELD: parsed.timestamp() * 1000 if parsed else 0,
+    }
+
+
+def _date_bounds(startDate, endDate):
+    start_dt = end_dt = None
+    if startDate:
+        try:
+            start_dt = datetime.fromisoformat(startDate)
+        except ValueError:
+            pass
+    if endDate:
+        try:
+            # Inclusive: up to the end of the day
+            end_dt = datetime.fromisoformat(endDate).replace(hour=23, minute=59, second=59)
+        except ValueError:
+            pass
+    return start_dt, end_dt
+
+
+def _legacy_date_filter(collection, startDate, endDate, start_dt, end_dt, prefix):
+    raw_field, fmt = SOURCE_DATE_FIELDS[collection]
+    if fmt is None:
+        # ISO strings compare lexicographically
+        date_filter = {}
+        if startDate:
+            date_filter["$gte"] = f"{startDate}T00:00:00"
+        if endDate:
+            date_filter["$lte"] = f"{endDate}T23:59:59"
+        return {prefix + raw_field: date_filter} if date_filter else None
+
+    parsed = {"$dateFromString": {
+        "dateString": "$" + prefix + raw_field,
+        "format": fmt,
+        "onError": _EPOCH,
+        "onNull": _EPOCH,
+    }}
+    conditions = []
+    if start_dt:
+        conditions.append({"$gte": [parsed, start_dt]})
+    if end_dt:
+        conditions.append({"$lte": [parsed, end_dt]})
+    return {"$expr": {"$and": conditions}} if conditions else None
+
+
+def build_date_range_filter(collection, startDate=None, endDate=None, prefix=""):
+    """Build a match condition for `startDate`..`endDate` (YYYY-MM-DD, both
+    inclusive) against `collection`'s normalized date field.
+
+    `prefix` addresses an embedded copy of the document, e.g.
+    "gazette_details." after a $lookup. Returns None when there is nothing
+    to filter on, so callers can skip the stage entirely.
+    """
+    start_dt, end_dt = _date_bounds(startDate, endDate)
+    date_range = {}
+    if start_dt:
+        date_range["$gte"] = start_dt
+    if end_dt:
+        date_range["$lte"] = end_dt
+    if not date_range:
+        return None
+
+    migrated = {prefix + DATE_FIELD: date_range}
+    if not LEGACY_DATE_FALLBACK:
+        return migrated
+
+    legacy = _legacy_date_filter(collection, startDate, endDate, start_dt, end_dt, prefix)
+    if not legacy:
+        return migrated
+    return {"$or": [migrated, {prefix + DATE_FIELD: {"$exists": False}, **legacy}]}
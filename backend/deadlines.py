@@ -0,0 +1,77 @@
+import asyncio
+import functools
+import os
+import pymongo
+from fastapi import HTTPException
+from pymongo.errors import PyMongoError
+
+# Time budgets for the read routes, so one slow query (a gazette body
+# $regex, a cold text index) can't hold a whole request.
+#
+# A budget is enforced twice. pymongo.timeout() gives every Mongo operation
+# inside it a deadline, sent to the server as maxTimeMS, so the server
+# abandons the query rather than finishing it for nobody. Motor runs each
+# operation in a thread with the caller's context, so this reaches every
+# query the block sends. asyncio.wait_for() bounds the await itself, which
+# also covers non-Mongo work such as the full-text index. The Mongo side
+# gets DEADLINE_GRACE_MS longer, so a request normally ends on the asyncio
+# timeout while the server stops shortly after.
+#
+#   SEARCH_DEADLINE_MS                    each /search source (default 4000)
+#   SEARCH_DEADLINE_MS_<SOURCE>           per-source override, e.g. _GAZETTE
+#   LIST_DEADLINE_MS                      /alerts/, /alerts/processed, /livelaw/, /ichr/ (default 10000)
+# 0 turns a budget off.
+SEARCH_DEADLINE_MS = int(os.getenv("SEARCH_DEADLINE_MS", "4000"))
+LIST_DEADLINE_MS = int(os.getenv("LIST_DEADLINE_MS", "10000"))
+DEADLINE_GRACE_MS = 250
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, name, budget_ms):
+        super().__init__(f"{name} exceeded its {budget_ms} ms budget")
+        self.name = name
+        self.budget_ms = budget_ms
+
+
+def search_deadline_ms(source):
+    return int(os.getenv(f"SEARCH_DEADLINE_MS_{source.upper()}", SEARCH_DEADLINE_MS))
+
+
+def is_timeout(error):
+    """Whether a Mongo error is a server-side maxTimeMS or client-side
+    timeout rather than a failure."""
+    return isinstance(error, PyMongoError) and error.timeout
+
+
+async def with_deadline(awaitable, budget_ms, name):
+    """Await `awaitable` within `budget_ms`, raising DeadlineExceeded when
+    either the asyncio or the Mongo side runs out."""
+    if not budget_ms:
+        return await awaitable
+    try:
+        with pymongo.timeout((budget_ms + DEADLINE_GRACE_MS) / 1000):
+            # wait_for runs the awaitable in a task that copies this
+            # context, pymongo's deadline included
+            return await asyncio.wait_for(awaitable, budget_ms / 1000)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(name, budget_ms) from None
+    except PyMongoError as e:
+        if is_timeout(e):
+            raise DeadlineExceeded(name, budget_ms) from e
+        raise
+
+
+def deadline(name, budget_ms=None):
+    """Bound a GET handler by LIST_DEADLINE_MS (or `budget_ms`); when it
+    runs out the request fails with 504 instead of waiting on Mongo."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(**params):
+            budget = LIST_DEADLINE_MS if budget_ms is None else budget_ms
+            try:
+                return await with_deadline(handler(**params), budget, name)
+            except DeadlineExceeded as e:
+                print(f"[WARN] {e}")
+                raise HTTPException(status_code=504, detail=f"Query took longer than {e.budget_ms} ms; narrow the filters")
+        return wrapper
+    return decorator
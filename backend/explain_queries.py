@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Check the query plans behind every list, detail and search endpoint.
+
+Each shape below is a request with representative parameters. It goes
+through the real app in-process, so the queries checked are exactly the ones
+the routers build. Every find / aggregate / count it issues is captured and
+re-run with explain("executionStats"). A shape fails when a query falls back to
+a collection scan, or examines more than --max-ratio documents (or keys) per
+document returned. Counts, and shapes that have to rank every match, are
+only checked for collection scans. Shapes that scan by design, like substring
+$regex search, are still reported but never fail. The exit status is 1 when anything fails.
+
+Run it against a database filled by seed_benchmark_data.py; on a nearly
+empty collection the planner's choices say little. The response cache is
+turned off so every request reaches Mongo. Needs httpx (pip install -r
+requirements-dev.txt).
+
+Usage:
+    python explain_queries.py
+    python explain_queries.py --uri mongodb://127.0.0.1:27017/dashboard_bench --max-ratio 20
+    python explain_queries.py --only livelaw,search --verbose
+"""
+import argparse
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BENCH_MONGODB_URI = os.getenv("BENCH_MONGODB_URI", "mongodb://127.0.0.1:27017/dashboard_bench")
+
+# name, path, params, expected cost. None: must use an index and stay under
+# --max-ratio. RANKED: examines every match to rank or sort them, so only a
+# collection scan fails. SCAN: substring $regex, scans by design; reported only.
+RANKED = "ranked"
+SCAN = "scan"
+SHAPES = [
+    ("livelaw", "/livelaw/", {}, None),
+    ("livelaw.oldest", "/livelaw/", {"sortBy": "oldest"}, None),
+    ("livelaw.dates", "/livelaw/", {"startDate": "2021-01-01", "endDate": "2021-03-31"}, None),
+    ("livelaw.count", "/livelaw/", {"count": "true", "startDate": "2021-01-01", "endDate": "2021-12-31"}, None),
+    ("livelaw.page2", "/livelaw/", {"cursor": "<next>"}, None),
+    ("livelaw.query", "/livelaw/", {"query": "tribunal"}, SCAN),
+    ("livelaw.author", "/livelaw/", {"author": "Sharma"}, SCAN),
+    ("livelaw.author.exact", "/livelaw/", {"author": "A. Sharma", "exact": "true"}, None),
+    ("livelaw.detail", "/livelaw/<livelaw>", {}, None),
+    ("ichr", "/ichr/", {}, None),
+    ("ichr.dates", "/ichr/", {"startDate": "2021-01-01", "endDate": "2021-03-31"}, None),
+    ("ichr.page2", "/ichr/", {"cursor": "<next>"}, None),
+    ("ichr.query", "/ichr/", {"query": "custody"}, SCAN),
+    ("ichr.place", "/ichr/", {"place": "Mumbai"}, SCAN),
+    ("ichr.place.exact", "/ichr/", {"place": "Mumbai", "exact": "true"}, None),
+    ("ichr.detail", "/ichr/<ichr>", {}, None),
+    ("alerts.count", "/alerts/count", {}, None),
+    ("alerts.pending", "/alerts/", {}, None),
+    ("alerts.processed", "/alerts/processed", {}, None),
+    ("alerts.processed.tags", "/alerts/processed", {"tags": "legislative_value"}, None),
+    ("alerts.processed.dates", "/alerts/processed", {"startDate": "2021-01-01", "endDate": "2021-06-30"}, None),
+    ("alerts.processed.query", "/alerts/processed", {"query": "finance"}, SCAN),
+    ("alerts.processed.facets", "/alerts/processed", {"facets": "ministry,tag,month"}, None),
+    ("alerts.detail", "/alerts/<alerts>", {"stream": "false"}, None),
+    ("all", "/all", {}, None),
+    ("search.text", "/search", {"query": "customs tariff", "mode": "text"}, RANKED),
+    ("search.text.dates", "/search", {"query": "pension", "mode": "text", "startDate": "2020-01-01", "endDate": "2020-12-31"}, RANKED),
+    ("search.text.newest", "/search", {"query": "insolvency", "mode": "text", "sortBy": "newest"}, RANKED),
+    ("search.text.facets", "/search", {"query": "customs", "mode": "text", "facets": "source,ministry,tag,month"}, RANKED),
+    ("search.regex", "/search", {"query": "tribunal"}, SCAN),
+]
+
+
+async def sample_ids(db):
+    """One real id per detail route."""
+    ids = {}
+    for name in ("livelaw", "ichr", "alerts"):
+        doc = await db[name].find_one({}, {"_id": 1})
+        ids[name] = str(doc["_id"]) if doc else None
+    return ids
+
+
+def resolve(path, params, ids, cursors):
+    for name, value in ids.items():
+        if f"<{name}>" in path:
+            if value is None:
+                return None, None
+            path = path.replace(f"<{name}>", value)
+    if params.get("cursor") == "<next>":
+        next_cursor = cursors.get(path)
+        if not next_cursor:
+            return None, None
+        params = {**params, "cursor": next_cursor}
+    return path, params
+
+
+def format_stages(summary):
+    return " > ".join(summary.get("stages", [])) or "-"
+
+
+async def explain_shapes(args, client, db):
+    import httpx
+    from alert_feed import use_existing_feed
+    from main import app
+    from query_plans import capture_commands, explain_commands, plan_problems
+
+    print(f"Database: {db.name}")
+    print(f"Alert feed: {'in use' if await use_existing_feed(db) else 'not built, using $lookup'}\n")
+    print(f"{'shape':<26}{'command':<10}{'collection':<14}{'docs':>9}{'keys':>9}{'ret':>8}")
+    ids = await sample_ids(db)
+    cursors = {}
+    failures = 0
+    shapes = [s for s in SHAPES if not args.only or s[0].split(".")[0] in args.only]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://explain") as http:
+        for name, path, params, expected in shapes:
+            path, params = resolve(path, params, ids, cursors)
+            if path is None:
+                print(f"{name:<26} skipped (no data)")
+                continue
+            # The transport runs the app in this task, so the capture sees
+            # every command the request sends
+            with capture_commands() as commands:
+                res = await http.get(path, params=params)
+            if res.status_code >= 400:
+                print(f"{name:<26} HTTP {res.status_code}: {res.text[:200]}")
+                failures += 1
+                continue
+            body = res.json()
+            if isinstance(body, dict) and body.get("nextCursor"):
+                cursors[path] = body["nextCursor"]
+
+            for summary in await explain_commands(client, commands):
+                problems = plan_problems(summary, args.max_ratio, allow_ratio=expected == RANKED)
+                status = "ok" if not problems else ("scan (expected)" if expected == SCAN else "FAIL")
+                if problems and expected != SCAN:
+                    failures += 1
+                print(
+                    f"{name:<26}{summary['command']:<10}{summary['collection']:<14}"
+                    f"{summary.get('docsExamined', '-'):>9}{summary.get('keysExamined', '-'):>9}"
+                    f"{summary.get('returned', '-'):>8}  {status}"
+                )
+                if problems or args.verbose:
+                    print(f"{'':<26}{format_stages(summary)}")
+                    for problem in problems:
+                        print(f"{'':<26}- {problem}")
+    return failures
+
+
+async def run(args):
+    # Before the app is imported: database.py reads MONGODB_URI at import
+    os.environ["MONGODB_URI"] = args.uri
+    os.environ["RESPONSE_CACHE"] = "0"
+    import database
+
+    # The transport doesn't run the app lifespan; connect without its
+    # startup tasks
+    database.connect()
+    try:
+        return await explain_shapes(args, database.client, database.db)
+    finally:
+        database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--uri", default=BENCH_MONGODB_URI, help="database to explain against")
+    parser.add_argument("--max-ratio", type=float, default=10, help="allowed examined/returned ratio")
+    parser.add_argument("--only", help="comma-separated route groups (livelaw, ichr, alerts, all, search)")
+    parser.add_argument("--verbose", action="store_true", help="print plan stages for every query")
+    args = parser.parse_args()
+    args.only = {g.strip() for g in args.only.split(",")} if args.only else None
+
+    failures = asyncio.run(run(args))
+    if failures:
+        print(f"\n{failures} query plan(s) over budget")
+        sys.exit(1)
+    print("\nAll query plans within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import csv
+import io
+import os
+from datetime import datetime
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from serialization import encode, serialize_doc
+
+# Bulk exports stream rows straight from a Mongo cursor: the driver fetches
+# EXPORT_BATCH_SIZE documents per round trip and each batch is written out
+# before the next one is requested, so memory stays flat however many rows
+# are exported.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+NDJSON = "ndjson"
+CSV = "csv"
+MEDIA_TYPES = {
+    NDJSON: "application/x-ndjson",
+    CSV: "text/csv; charset=utf-8",
+}
+
+# CSV columns when no `fields` are given (dot paths into the document)
+EXPORT_COLUMNS = {
+    "livelaw": ["id", "title", "author", "published_at", "summary", "relevance_reason", "confidence_score", "url"],
+    "ichr": ["id", "title", "Date", "Place", "summary", "url", "attachments"],
+    "alerts": [
+        "id", "alerted_at", "priority", "summary", "reason",
+        "legislative_value", "economic_impact", "political_relevance",
+        "gazette_id", "gazette_details.ministry", "gazette_details.subject",
+        "gazette_details.publish_date", "gazette_details.pdf_url",
+    ],
+}
+
+
+def check_format(fmt):
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(MEDIA_TYPES)}")
+    return fmt
+
+
+def _column_value(doc, path):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return ""
+        value = value.get(part)
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return encode(value).decode()
+    return value
+
+
+def _csv_chunk(rows, columns, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_column_value(row, c) for c in columns])
+    return buffer.getvalue().encode()
+
+
+async def _export_rows(rows, first_doc, fmt, columns, transform):
+    batch = [transform(first_doc)] if first_doc is not None else []
+    first = True
+    try:
+        async for doc in rows:
+            batch.append(transform(doc))
+            if len(batch) < EXPORT_BATCH_SIZE:
+                continue
+            yield _encode_batch(batch, fmt, columns, first)
+            batch = []
+            first = False
+        if batch or (first and fmt == CSV):
+            yield _encode_batch(batch, fmt, columns, first)
+    except Exception as e:
+        # The status line is already sent; stop early and log it
+        print(f"Export aborted: {e}")
+        raise
+
+
+def _encode_batch(batch, fmt, columns, first):
+    if fmt == CSV:
+        return _csv_chunk(batch, columns, header=first)
+    return b"".join(encode(row) + b"\n" for row in batch)
+
+
+async def export_response(cursor, source, fmt, fields=None, transform=serialize_doc):
+    """StreamingResponse of every document `cursor` yields, as NDJSON or CSV.
+
+    `fields` (comma-separated) picks the CSV columns; NDJSON rows are the
+    documents as the list endpoints would return them.
+    """
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else EXPORT_COLUMNS[source]
+    # Run the query before the response starts so a failing one is a 500
+    # rather than a truncated 200
+    rows = cursor.__aiter__()
+    try:
+        first_doc = await rows.__anext__()
+    except StopAsyncIteration:
+        first_doc = None
+    except Exception as e:
+        print(f"Export of {source} failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    filename = f"{source}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        _export_rows(rows, first_doc, fmt, columns, transform),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
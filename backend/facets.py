@@ -0,0 +1,130 @@
+import os
+from fastapi import HTTPException
+from cache import response_cache
+from dates import DATE_FIELD
+
+# Facet counts for /search and /alerts/processed. Requested with
+# facets=source,ministry,tag,month, they come from the same aggregation as
+# the page of hits: the indexed $match runs once and a $facet stage returns
+# both the hits and the per-value totals over every match, not just the
+# returned page.
+#   source   total matches per source (one "total" facet per source)
+#   ministry gazette ministry (processed alerts only)
+#   tag      legislative_value / economic_impact / political_relevance
+#   month    publication month, from the normalized _date
+FACETS = ["source", "ministry", "tag", "month"]
+ALERT_TAGS = ["legislative_value", "economic_impact", "political_relevance"]
+HITS = "hits"
+TOTAL = "total"
+# Largest number of buckets returned for a value facet
+MAX_BUCKETS = 50
+# Facets of a search with no filter at all count a whole collection; those
+# are computed once and reused for this many seconds (see unfiltered_facets)
+UNFILTERED_FACETS_TTL = float(os.getenv("UNFILTERED_FACETS_TTL", "60"))
+
+# Where each facet reads from in a source's documents
+FACET_FIELDS = {
+    "livelaw": {"month": DATE_FIELD},
+    "ichr": {"month": DATE_FIELD},
+    "alerts": {"month": f"gazette_details.{DATE_FIELD}", "ministry": "gazette_details.ministry", "tag": ALERT_TAGS},
+}
+
+
+def parse_facets(facets):
+    """The facet names requested in a comma-separated parameter."""
+    names = [f.strip() for f in facets.split(",") if f.strip()] if facets else []
+    unknown = [n for n in names if n not in FACETS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown facet(s): {', '.join(unknown)}. Use: {', '.join(FACETS)}"
+        )
+    return names
+
+
+def _bucket_stages(expression, sort=None):
+    return [
+        {"$group": {"_id": expression, "count": {"$sum": 1}}},
+        {"$match": {"_id": {"$ne": None}}},
+        {"$sort": sort or {"count": -1, "_id": 1}},
+        {"$limit": MAX_BUCKETS},
+    ]
+
+
+def facet_stages(source, names):
+    """$facet sub-pipelines for the requested facets that apply to `source`,
+    always including the total."""
+    fields = FACET_FIELDS[source]
+    stages = {TOTAL: [{"$count": "n"}]}
+    if "month" in names:
+        # Newest month first
+        stages["month"] = _bucket_stages(
+            {"$dateToString": {"format": "%Y-%m", "date": f"${fields['month']}"}},
+            sort={"_id": -1},
+        )
+    if "ministry" in names and "ministry" in fields:
+        stages["ministry"] = _bucket_stages(f"${fields['ministry']}")
+    if "tag" in names and "tag" in fields:
+        stages["tag"] = [{"$group": {
+            "_id": None,
+            **{tag: {"$sum": {"$cond": [{"$eq": [f"${tag}", True]}, 1, 0]}} for tag in fields["tag"]},
+        }}]
+    return stages
+
+
+def facet_pipeline(hit_stages, source, names):
+    """The $facet stage returning the page of hits next to the facets, or
+    only the facets when `hit_stages` is None."""
+    stages = facet_stages(source, names)
+    if hit_stages is not None:
+        stages[HITS] = hit_stages
+    return {"$facet": stages}
+
+
+def read_facets(result):
+    """(hits, facets) from the single document a facet_pipeline() returns.
+    Value facets become [{"value", "count"}] lists; tag counts a dict."""
+    result = result[0] if result else {}
+    total = result.get(TOTAL) or [{}]
+    facets = {TOTAL: total[0].get("n", 0)}
+    for name in ("month", "ministry"):
+        if name in result:
+            facets[name] = [{"value": b["_id"], "count": b["count"]} for b in result[name]]
+    if "tag" in result:
+        counts = result["tag"][0] if result["tag"] else {}
+        facets["tag"] = {tag: counts.get(tag, 0) for tag in ALERT_TAGS}
+    return result.get(HITS, []), facets
+
+
+def merge_facets(per_source, names):
+    """Combine per-source facets into one response block for /search."""
+    merged = {}
+    if "source" in names:
+        merged["source"] = {name: f[TOTAL] for name, f in per_source.items() if f}
+    if "month" in names:
+        months = {}
+        for f in per_source.values():
+            for bucket in (f or {}).get("month", []):
+                months[bucket["value"]] = months.get(bucket["value"], 0) + bucket["count"]
+        merged["month"] = [{"value": m, "count": months[m]} for m in sorted(months, reverse=True)]
+    for name in ("ministry", "tag"):
+        gazette = per_source.get("gazette") or {}
+        if name in names and name in gazette:
+            merged[name] = gazette[name]
+    return merged
+
+
+async def unfiltered_facets(source, names, count):
+    """Facets over every document of `source`, from await count(). A
+    /search?facets= without a query or dates would otherwise $facet the
+    whole collection on every request, so the counts are kept in the
+    response cache under the source's tag (its collection's cache tag)."""
+    key = ("unfiltered_facets", source, tuple(sorted(names)))
+    hit, value = response_cache.get(key)
+    if hit:
+        return value
+    tags = (source,)
+    generation = response_cache.generation(tags)
+    value = await count()
+    if response_cache.generation(tags) == generation:
+        response_cache.set(key, value, UNFILTERED_FACETS_TTL, tags)
+    return value
@@ -0,0 +1,384 @@
+import asyncio
+import html
+import os
+import re
+import sqlite3
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from gazette_text import LENGTH_FIELD, TEXT_FIELD, is_external, read_text_range
+from locks import try_lock
+
+# Full-text search over gazette bodies and alert summary / reason, from an
+# SQLite FTS5 index on local disk instead of a $regex over pdf_text.
+#
+# Every gazette (keyed by gazette_id) and every alert (keyed by _id) is one
+# row with a title column (gazette subject + ministry, alert summary) and a
+# body column (gazette text, alert reason). A query returns the matching
+# rows ranked by BM25, titles weighted over bodies, each with a short
+# highlighted snippet. The routers turn the hits into an indexed
+# _id / gazette_id $in filter.
+#
+# A startup task builds the index once (or reuses the file from the last
+# run), then every FULLTEXT_REFRESH_SECONDS adds gazettes inserted since the
+# last pass (by _id) and alerts created or updated since then. Deletes and
+# gazette edits are picked up by a full rebuild every FULLTEXT_REBUILD_SECONDS,
+# written to a fresh file and swapped in. Until the index is ready the
+# routers keep using $regex.
+#
+# With several uvicorn workers only one of them, the one holding an flock on
+# FULLTEXT_PATH.lock, builds and updates the file; the others only search
+# it, and take over the lock if that worker exits. A second writer could
+# update the old file while the first swaps a new one in, losing the update.
+FULLTEXT_ENABLED = os.getenv("FULLTEXT_INDEX", "1") != "0"
+FULLTEXT_PATH = os.getenv(
+    "FULLTEXT_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fulltext.sqlite3")
+)
+FULLTEXT_REFRESH_SECONDS = float(os.getenv("FULLTEXT_REFRESH_SECONDS", "30"))
+FULLTEXT_REBUILD_SECONDS = float(os.getenv("FULLTEXT_REBUILD_SECONDS", str(24 * 3600)))
+# Upper bound on hits a ranked query returns, best first. Filters that must
+# keep every match (/alerts/processed, its facets and export) pass limit=None.
+FULLTEXT_CANDIDATE_LIMIT = int(os.getenv("FULLTEXT_CANDIDATE_LIMIT", "1000"))
+FULLTEXT_BATCH_SIZE = 50 # gazettes per batch; texts can be megabytes
+# Next to the index: the builder lock, and a rebuild requested by another worker
+LOCK_SUFFIX = ".lock"
+REBUILD_SUFFIX = ".rebuild"
+
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+SNIPPET_TOKENS = 16
+ELLIPSIS = "…"
+# Snippets are HTML: the text is escaped and matches wrapped in <mark>.
+# FTS5 marks them with these first, since the text itself can contain markup.
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+GAZETTE = "gazette"
+ALERT = "alert"
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS docs ("
+    # gazette_id has no type so values keep the type they have in Mongo
+    " id INTEGER PRIMARY KEY, kind TEXT NOT NULL, ref TEXT NOT NULL, gazette_id,"
+    " UNIQUE (kind, ref))",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5("
+    " title, body, tokenize = 'porter unicode61 remove_diacritics 2')",
+    "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+# "quoted phrase" or a bare word
+QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def match_expression(query):
+    """The FTS5 MATCH expression for a search box query. Quoted phrases stay
+    phrases, every other word must appear, and a trailing * makes a word a
+    prefix. Everything is quoted, so FTS5 operators in the input are text."""
+    parts = []
+    for phrase, word in QUERY_TOKEN.findall(query or ""):
+        prefix = bool(word) and word.endswith("*")
+        text = (phrase or word).rstrip("*") if prefix else (phrase or word)
+        if text.strip():
+            parts.append('"' + text.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(parts)
+
+
+def _connect(path):
+    # Rollback journal rather than WAL: rebuilds replace the file, which must
+    # not leave a -wal from the old one next to it
+    conn = sqlite3.connect(path, timeout=30)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def _upsert(conn, kind, ref, gazette_id, title, body):
+    row = conn.execute("SELECT id FROM docs WHERE kind = ? AND ref = ?", (kind, ref)).fetchone()
+    if row:
+        conn.execute("DELETE FROM entries WHERE rowid = ?", (row[0],))
+        conn.execute("UPDATE docs SET gazette_id = ? WHERE id = ?", (gazette_id, row[0]))
+        rowid = row[0]
+    else:
+        rowid = conn.execute(
+            "INSERT INTO docs (kind, ref, gazette_id) VALUES (?, ?, ?)", (kind, ref, gazette_id)
+        ).lastrowid
+    conn.execute("INSERT INTO entries (rowid, title, body) VALUES (?, ?, ?)", (rowid, title, body))
+
+
+def _write(path, rows, state):
+    """Upsert (kind, ref, gazette_id, title, body) rows and save sync state,
+    in one transaction."""
+    conn = _connect(path)
+    try:
+        with conn:
+            for row in rows:
+                _upsert(conn, *row)
+            conn.executemany(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", state.items()
+            )
+    finally:
+        conn.close()
+
+
+def _read_state(path):
+    if not os.path.exists(path):
+        return {}
+    conn = _connect(path)
+    try:
+        return dict(conn.execute("SELECT key, value FROM sync_state").fetchall())
+    finally:
+        conn.close()
+
+
+def _placeholders(values):
+    return ", ".join("?" for _ in values)
+
+
+def _search(path, expression, kinds, limit, snippets=True, only=None):
+    """Matching rows, best ranked first. `limit` None returns every match;
+    `only` = (alert refs, gazette_ids) restricts them to those documents."""
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        if snippets:
+            sql = "SELECT d.kind, d.ref, d.gazette_id, bm25(entries, ?, ?) AS rank, snippet(entries, -1, ?, ?, ?, ?)"
+            params = [TITLE_WEIGHT, BODY_WEIGHT, _MARK_START, _MARK_END, ELLIPSIS, SNIPPET_TOKENS]
+        else:
+            sql = "SELECT d.kind, d.ref, d.gazette_id, bm25(entries, ?, ?) AS rank, NULL"
+            params = [TITLE_WEIGHT, BODY_WEIGHT]
+        sql += " FROM entries JOIN docs d ON d.id = entries.rowid WHERE entries MATCH ?"
+        params.append(expression)
+        if kinds:
+            sql += f" AND d.kind IN ({_placeholders(kinds)})"
+            params += list(kinds)
+        if only is not None:
+            refs, gazette_ids = only
+            sql += (
+                f" AND ((d.kind = '{ALERT}' AND d.ref IN ({_placeholders(refs)}))"
+                f" OR (d.kind = '{GAZETTE}' AND d.gazette_id IN ({_placeholders(gazette_ids)})))"
+            )
+            params += list(refs) + list(gazette_ids)
+        sql += " ORDER BY rank"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def _count(path):
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        return dict(conn.execute("SELECT kind, COUNT(*) FROM docs GROUP BY kind").fetchall())
+    finally:
+        conn.close()
+
+
+def _snippet_html(snippet):
+    return html.escape(snippet or "").replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+def _gazette_title(gazette):
+    return " ".join(v for v in (gazette.get("subject"), gazette.get("ministry")) if isinstance(v, str))
+
+
+def _alert_row(alert):
+    return (ALERT, str(alert["_id"]), alert.get("gazette_id"), alert.get("summary") or "", alert.get("reason") or "")
+
+
+class FullTextIndex:
+    def __init__(self, path=FULLTEXT_PATH):
+        self.path = path
+        self.ready = False
+        self.last_error = None
+        self._lock = asyncio.Lock()
+        self._builder = None # the open lock file while this worker is the builder
+
+    async def _gazette_rows(self, db, after=None):
+        """(rows, last _id) for gazettes newer than `after`, a batch at a time."""
+        query = {"gazette_id": {"$exists": True, "$ne": None}}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        fields = {"gazette_id": 1, "subject": 1, "ministry": 1, TEXT_FIELD: 1, "text_external": 1, LENGTH_FIELD: 1}
+        cursor = db.gazettes.find(query, fields).sort("_id", 1).batch_size(FULLTEXT_BATCH_SIZE)
+        batch = []
+        async for gazette in cursor:
+            if is_external(gazette):
+                body = await read_text_range(db, gazette, 0, gazette.get(LENGTH_FIELD) or 0)
+            else:
+                body = gazette.get(TEXT_FIELD) if isinstance(gazette.get(TEXT_FIELD), str) else ""
+            batch.append((GAZETTE, str(gazette["gazette_id"]), gazette["gazette_id"], _gazette_title(gazette), body))
+            if len(batch) >= FULLTEXT_BATCH_SIZE:
+                yield batch, gazette["_id"]
+                batch = []
+        if batch:
+            yield batch, gazette["_id"]
+
+    async def _sync(self, db, path, state):
+        """Index gazettes and alerts changed since `state`; returns the new
+        state. Batches are committed as they go, with the position reached."""
+        started = datetime.utcnow()
+        last_gazette = ObjectId(state["gazette_id"]) if state.get("gazette_id") else None
+        async for rows, last_gazette in self._gazette_rows(db, last_gazette):
+            await asyncio.to_thread(_write, path, rows, {"gazette_id": str(last_gazette)})
+
+        alert_query = {}
+        if state.get("alerts_since"):
+            since = datetime.fromisoformat(state["alerts_since"])
+            alert_query = {"$or": [{"alerted_at": {"$gte": since}}, {"updated_at": {"$gte": since}}]}
+        rows = []
+        cursor = db.alerts.find(alert_query, {"gazette_id": 1, "summary": 1, "reason": 1})
+        async for alert in cursor:
+            rows.append(_alert_row(alert))
+            if len(rows) >= FULLTEXT_BATCH_SIZE * 20:
+                await asyncio.to_thread(_write, path, rows, {})
+                rows = []
+        new_state = {"alerts_since": started.isoformat()}
+        if last_gazette is not None:
+            new_state["gazette_id"] = str(last_gazette)
+        await asyncio.to_thread(_write, path, rows, new_state)
+        return new_state
+
+    async def build(self, db):
+        """Build a fresh index file and swap it in. Searches in progress
+        keep reading the file they opened."""
+        building = f"{self.path}.{os.getpid()}.building"
+        async with self._lock:
+            if os.path.exists(self.path + REBUILD_SUFFIX):
+                os.remove(self.path + REBUILD_SUFFIX)
+            for suffix in ("", "-journal"):
+                if os.path.exists(building + suffix):
+                    os.remove(building + suffix)
+            await self._sync(db, building, {})
+            await asyncio.to_thread(_write, building, [], {"built_at": datetime.utcnow().isoformat()})
+            os.replace(building, self.path)
+            self.ready = True
+        print(f"Full-text: indexed {', '.join(f'{kind}={n}' for kind, n in (await self.counts()).items())}")
+
+    async def rebuild(self, db):
+        """Rebuild now in the builder worker; elsewhere leave a marker the
+        builder picks up on its next pass. Returns whether it was built."""
+        if self._builder is None:
+            await asyncio.to_thread(open(self.path + REBUILD_SUFFIX, "a").close)
+            return False
+        await self.build(db)
+        return True
+
+    async def update(self, db):
+        """Index what changed since the last build or update."""
+        async with self._lock:
+            await self._sync(db, self.path, await asyncio.to_thread(_read_state, self.path))
+
+    async def search(self, query, kinds=None, limit=FULLTEXT_CANDIDATE_LIMIT, snippets=True):
+        """Hits for `query`, best first: [{"kind", "ref", "gazette_id",
+        "score", "snippet"}]. score is the negated BM25 rank, so higher is
+        better as with textScore; snippet is escaped HTML with <mark>.
+
+        `limit` None returns every match, for filters that must not drop
+        any (lists sorted by date, facet totals, exports); those skip the
+        snippets and get them for the returned page from snippets_for().
+        """
+        expression = match_expression(query)
+        if not expression:
+            return []
+        rows = await asyncio.to_thread(_search, self.path, expression, kinds, limit, snippets)
+        return _hits(rows)
+
+    async def snippets_for(self, query, docs):
+        """Hits with snippets for just these alerts and their gazettes."""
+        expression = match_expression(query)
+        if not expression or not docs:
+            return []
+        refs = [str(doc["_id"]) for doc in docs if doc.get("_id") is not None]
+        gazette_ids = [doc["gazette_id"] for doc in docs if doc.get("gazette_id") is not None]
+        rows = await asyncio.to_thread(
+            _search, self.path, expression, None, None, True, (refs, gazette_ids)
+        )
+        return _hits(rows)
+
+    async def counts(self):
+        if not os.path.exists(self.path):
+            return {}
+        return await asyncio.to_thread(_count, self.path)
+
+    async def stats(self):
+        return {"enabled": FULLTEXT_ENABLED, "ready": self.ready, "path": self.path,
+                "builder": self._builder is not None, "error": self.last_error, **(await self.counts())}
+
+    async def _built_at(self, loop):
+        """The loop time the current file was built at, or None."""
+        state = await asyncio.to_thread(_read_state, self.path)
+        if not state.get("built_at"):
+            return None
+        age = (datetime.utcnow() - datetime.fromisoformat(state["built_at"])).total_seconds()
+        return loop.time() - age
+
+    async def run(self, db):
+        """Startup task: build (unless a built file is already there), then
+        keep the index current, or in the other workers wait for it."""
+        if not FULLTEXT_ENABLED:
+            return
+        loop = asyncio.get_running_loop()
+        rebuilt_at = None
+        while True:
+            try:
+                if self._builder is None:
+                    self._builder = await asyncio.to_thread(try_lock, self.path + LOCK_SUFFIX)
+                    # Reuse the index from the last run (or the last builder);
+                    # its age counts towards the rebuild
+                    rebuilt_at = await self._built_at(loop)
+                    self.ready = rebuilt_at is not None
+                if self._builder is not None:
+                    if (rebuilt_at is None or loop.time() - rebuilt_at >= FULLTEXT_REBUILD_SECONDS
+                            or os.path.exists(self.path + REBUILD_SUFFIX)):
+                        await self.build(db)
+                        rebuilt_at = loop.time()
+                    else:
+                        await self.update(db)
+                # Otherwise another worker keeps the file current and this one
+                # only searches it, retrying the lock every pass
+                self.last_error = None
+            except (PyMongoError, sqlite3.Error, OSError) as e:
+                self.last_error = str(e)
+                print(f"Full-text: refresh failed: {e}")
+            await asyncio.sleep(FULLTEXT_REFRESH_SECONDS)
+
+
+def _hits(rows):
+    return [
+        {"kind": kind, "ref": ref, "gazette_id": gazette_id, "score": -rank, "snippet": _snippet_html(snippet)}
+        for kind, ref, gazette_id, rank, snippet in rows
+    ]
+
+
+def hits_condition(hits):
+    """The $or over alerts (or the feed) that the hits stand for: the alerts
+    that matched and every alert of a gazette that matched."""
+    alert_ids = [ObjectId(h["ref"]) for h in hits if h["kind"] == ALERT and ObjectId.is_valid(h["ref"])]
+    gazette_ids = [h["gazette_id"] for h in hits if h["kind"] == GAZETTE]
+    return {"$or": [{"_id": {"$in": alert_ids}}, {"gazette_id": {"$in": gazette_ids}}]}
+
+
+def best_hits(hits):
+    """(by alert _id, by gazette_id) lookups of the hits."""
+    alerts = {h["ref"]: h for h in hits if h["kind"] == ALERT}
+    gazettes = {h["gazette_id"]: h for h in hits if h["kind"] == GAZETTE}
+    return alerts, gazettes
+
+
+def apply_hits(docs, hits, score_field=None):
+    """Give each alert the snippet (and, with `score_field`, the score) of
+    the better of its own hit and its gazette's."""
+    alerts, gazettes = best_hits(hits)
+    for doc in docs:
+        candidates = [h for h in (alerts.get(str(doc.get("_id"))), gazettes.get(doc.get("gazette_id"))) if h]
+        if not candidates:
+            continue
+        best = max(candidates, key=lambda h: h["score"])
+        doc["snippet"] = best["snippet"]
+        if score_field:
+            doc[score_field] = best["score"]
+    return docs
+
+
+fulltext_index = FullTextIndex()
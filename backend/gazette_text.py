@@ -0,0 +1,199 @@
+import os
+from fastapi.responses import StreamingResponse
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import CollectionInvalid
+from serialization import encode, serialize_doc
+
+# Gazette detail with a large pdf_text is streamed: the document is fetched
+# without its text, and the text is read from Mongo in slices and written out
+# slice by slice, so a worker never holds the whole text or its JSON at once.
+TEXT_FIELD = "pdf_text"
+# Texts shorter than this go out as a normal response
+STREAM_MIN_CHARS = int(os.getenv("GAZETTE_STREAM_MIN_CHARS", str(256 * 1024)))
+TEXT_CHUNK_CHARS = int(os.getenv("GAZETTE_TEXT_CHUNK_CHARS", str(128 * 1024)))
+
+# Largest slice GET /alerts/{id}/text returns at once
+MAX_RANGE_CHARS = int(os.getenv("GAZETTE_TEXT_MAX_RANGE_CHARS", str(256 * 1024)))
+# Most gazettes a body $regex (body=true searches) may return. The regex
+# can't use an index and scans every text, so it stops after this many.
+BODY_MATCH_LIMIT = int(os.getenv("GAZETTE_BODY_MATCH_LIMIT", "200"))
+
+_TEXT_LENGTH = "_text_length"
+
+# External storage (migrate_gazette_text.py). The text moves out of the
+# gazette into TEXT_COLLECTION, a collection created with its own block
+# compressor, as chunks of STORE_CHUNK_CHARS code points keyed by the
+# gazette's gazette_id:
+#   {gazette_id, seq, start, end, text}
+# Each chunk's text runs STORE_OVERLAP_CHARS past `end`, so a body $regex
+# over the chunks still matches phrases that straddle a boundary; readers
+# only use text[:end - start]. The gazette keeps text_external=True and
+# text_length, so the documents $lookup and find_one read stay small.
+TEXT_COLLECTION = "gazette_texts"
+TEXT_COMPRESSOR = os.getenv("GAZETTE_TEXT_COMPRESSOR", "zstd")
+STORE_CHUNK_CHARS = int(os.getenv("GAZETTE_TEXT_STORE_CHUNK_CHARS", str(64 * 1024)))
+STORE_OVERLAP_CHARS = 512
+EXTERNAL_FIELD = "text_external"
+LENGTH_FIELD = "text_length"
+
+
+async def ensure_text_collection(db):
+    """Create TEXT_COLLECTION with TEXT_COMPRESSOR before anything (an index
+    build, the migration) creates it implicitly with the server default."""
+    if TEXT_COLLECTION in await db.list_collection_names(filter={"name": TEXT_COLLECTION}):
+        return False
+    try:
+        await db.create_collection(
+            TEXT_COLLECTION,
+            storageEngine={"wiredTiger": {"configString": f"block_compressor={TEXT_COMPRESSOR}"}},
+        )
+    except CollectionInvalid:
+        return False # created concurrently
+    print(f"Gazette text: created '{TEXT_COLLECTION}' ({TEXT_COMPRESSOR})")
+    return True
+
+
+def is_external(gazette):
+    return bool(gazette and gazette.get(EXTERNAL_FIELD))
+
+
+def text_chunks(gazette_id, text):
+    """The TEXT_COLLECTION documents holding `text`."""
+    return [
+        {
+            "gazette_id": gazette_id,
+            "seq": seq,
+            "start": start,
+            "end": min(start + STORE_CHUNK_CHARS, len(text)),
+            "text": text[start:start + STORE_CHUNK_CHARS + STORE_OVERLAP_CHARS],
+        }
+        for seq, start in enumerate(range(0, len(text), STORE_CHUNK_CHARS))
+    ]
+
+
+async def externalize_text(db, gazette):
+    """Move one gazette's pdf_text into TEXT_COLLECTION. The chunks are
+    written before pdf_text is unset, so an interrupted run leaves the
+    gazette readable and is simply redone."""
+    text = gazette.get(TEXT_FIELD)
+    gazette_id = gazette.get("gazette_id")
+    if not isinstance(text, str) or not gazette_id:
+        return False
+    chunks = text_chunks(gazette_id, text)
+    await db[TEXT_COLLECTION].delete_many({"gazette_id": gazette_id})
+    if chunks:
+        await db[TEXT_COLLECTION].insert_many(chunks, ordered=True)
+    await db.gazettes.update_one(
+        {"_id": gazette["_id"]},
+        {"$set": {EXTERNAL_FIELD: True, LENGTH_FIELD: len(text)}, "$unset": {TEXT_FIELD: ""}},
+    )
+    return True
+
+
+async def find_gazette_without_text(db, gazette_oid):
+    """The gazette minus pdf_text, plus the text's length in code points
+    (None when the gazette has no text, inline or external)."""
+    pipeline = [
+        {"$match": {"_id": gazette_oid}},
+        {"$addFields": {_TEXT_LENGTH: {"$cond": [
+            {"$eq": [{"$type": "$" + TEXT_FIELD}, "string"]},
+            {"$strLenCP": "$" + TEXT_FIELD},
+            {"$cond": [{"$eq": ["$" + EXTERNAL_FIELD, True]}, "$" + LENGTH_FIELD, None]}
+        ]}}},
+        {"$project": {TEXT_FIELD: 0}},
+    ]
+    docs = await db.gazettes.aggregate(pipeline).to_list(length=1)
+    if not docs:
+        return None, None
+    gazette = docs[0]
+    return gazette, gazette.pop(_TEXT_LENGTH, None)
+
+
+async def _external_range(db, gazette_id, offset, length):
+    """Code points [offset, offset + length) from the stored chunks: the
+    chunk holding `offset` and those after it, up to the end of the range."""
+    chunks = db[TEXT_COLLECTION]
+    first = await chunks.find_one(
+        {"gazette_id": gazette_id, "start": {"$lte": offset}}, {"start": 1},
+        sort=[("start", DESCENDING)],
+    )
+    if not first:
+        return ""
+    cursor = chunks.find(
+        {"gazette_id": gazette_id, "start": {"$gte": first["start"], "$lt": offset + length}},
+        {"_id": 0, "start": 1, "end": 1, "text": 1},
+    ).sort("start", ASCENDING)
+    parts = []
+    async for chunk in cursor:
+        owned = chunk["text"][:chunk["end"] - chunk["start"]]
+        lo = max(offset - chunk["start"], 0)
+        hi = offset + length - chunk["start"]
+        parts.append(owned[lo:hi])
+    return "".join(parts)
+
+
+async def read_text_range(db, gazette, offset, length):
+    """Code points [offset, offset + length) of a gazette's text, wherever
+    it is stored, for ranged /text requests. `gazette` needs _id,
+    gazette_id and text_external."""
+    if length <= 0:
+        return ""
+    if is_external(gazette):
+        return await _external_range(db, gazette["gazette_id"], offset, length)
+    docs = await db.gazettes.aggregate([
+        {"$match": {"_id": gazette["_id"]}},
+        {"$project": {"_id": 0, "text": {"$substrCP": ["$" + TEXT_FIELD, offset, length]}}},
+    ]).to_list(length=1)
+    return (docs[0].get("text") or "") if docs else ""
+
+
+async def iter_text_chunks(db, gazette, length, chunk_chars=TEXT_CHUNK_CHARS):
+    """Yield the text in slices of `chunk_chars` code points, each read
+    from Mongo on its own (a $substrCP range for inline text), so the whole
+    text is never one Python string. `length` is the text's length in code
+    points, from find_gazette_without_text."""
+    for start in range(0, length or 0, chunk_chars):
+        chunk = await read_text_range(db, gazette, start, chunk_chars)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def gazette_ids_matching(db, regex_query, limit=BODY_MATCH_LIMIT):
+    """Up to `limit` gazette_ids whose body text matches, inline or external."""
+    inline = await db.gazettes.find(
+        {TEXT_FIELD: regex_query, "gazette_id": {"$ne": None}}, {"_id": 0, "gazette_id": 1}
+    ).limit(limit).to_list(length=limit)
+    ids = {doc["gazette_id"] for doc in inline}
+    if len(ids) < limit:
+        # A gazette's chunks can all match; read a few extra to make up for it
+        external = await db[TEXT_COLLECTION].find(
+            {"text": regex_query}, {"_id": 0, "gazette_id": 1}
+        ).limit(2 * limit).to_list(length=2 * limit)
+        for doc in external:
+            if len(ids) >= limit:
+                break
+            ids.add(doc["gazette_id"])
+    return list(ids)
+
+
+async def _stream_detail(alert, gazette, chunks):
+    # Everything but the text is encoded up front; the object is then
+    # reopened so pdf_text can be appended as the gazette's last key.
+    head = encode({"alert": serialize_doc(alert), "gazette": serialize_doc(gazette)})
+    yield head[:-2] + b',"' + TEXT_FIELD.encode() + b'":"'
+    async for chunk in chunks:
+        # Encoding a slice yields a quoted JSON string; drop the quotes
+        yield encode(chunk)[1:-1]
+    yield b'"}}'
+
+
+def should_stream(text_length):
+    return text_length is not None and text_length >= STREAM_MIN_CHARS
+
+
+def stream_detail_response(db, alert, gazette, text_length, headers=None):
+    """Stream {"alert": ..., "gazette": {..., "pdf_text": ...}} with the same
+    body a buffered response would have."""
+    chunks = iter_text_chunks(db, gazette, text_length)
+    return StreamingResponse(_stream_detail(alert, gazette, chunks), headers=headers, media_type="application/json")
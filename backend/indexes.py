@@ -0,0 +1,149 @@
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+from alert_feed import FEED_COLLECTION
+from dates import DATE_FIELD, SOURCE_DATE_FIELDS
+from gazette_text import TEXT_COLLECTION, ensure_text_collection
+from text_search import TEXT_INDEX_NAME, TEXT_INDEXES
+
+# Every index the backend's queries rely on, per collection. ensure_indexes()
+# builds whichever are missing at startup; index_report() backs
+# GET /admin/indexes so drift between this list and the server is visible.
+#
+# An index counts as present when one with the same key pattern exists,
+# whatever its name, so indexes made by hand are not rebuilt.
+
+
+def _index(keys, name, **options):
+    return {"keys": keys, "name": name, **options}
+
+
+def _text_index(weights):
+    return _index(
+        [(field, "text") for field in weights],
+        TEXT_INDEX_NAME,
+        weights=weights,
+        default_language="english",
+    )
+
+
+INDEXES = {
+    "alerts": [
+        # /alerts, /alerts/count and /alerts/processed: filter + newest first
+        _index([("slack_sent", ASCENDING), ("alerted_at", DESCENDING)], "slack_sent_alerted_at"),
+        # Feed poller: alerts created or updated since the last pass
+        _index([("alerted_at", DESCENDING)], "alerted_at"),
+        _index([("updated_at", DESCENDING)], "updated_at"),
+        _index([("gazette_id", ASCENDING)], "gazette_id"),
+    ],
+    "gazettes": [
+        # $lookup from alerts and the feed's gazette sync
+        _index([("gazette_id", ASCENDING)], "gazette_id"),
+    ],
+    TEXT_COLLECTION: [
+        # Ranged reads: the chunk holding an offset, then the ones after it
+        _index([("gazette_id", ASCENDING), ("start", ASCENDING)], "gazette_id_start", unique=True),
+    ],
+    "livelaw": [
+        # Keyset pagination sorts on (published_at, _id) in either direction
+        _index([("published_at", DESCENDING), ("_id", DESCENDING)], "published_at_id"),
+        # exact=true author filter, in page order
+        _index([("author", ASCENDING), ("published_at", DESCENDING), ("_id", DESCENDING)], "author_published_at_id"),
+    ],
+    "ichr": [
+        _index([("Date", DESCENDING), ("_id", DESCENDING)], "date_id"),
+        # exact=true place filter; older documents use lowercase "place"
+        _index([("Place", ASCENDING), ("Date", DESCENDING), ("_id", DESCENDING)], "place_date_id"),
+        _index([("place", ASCENDING), ("Date", DESCENDING), ("_id", DESCENDING)], "place_lower_date_id"),
+    ],
+    FEED_COLLECTION: [
+        _index([("slack_sent", ASCENDING), ("alerted_at", DESCENDING)], "slack_sent_alerted_at"),
+        _index([("gazette_id", ASCENDING)], "gazette_id"),
+        _index([("gazette_details." + DATE_FIELD, ASCENDING)], "gazette_date"),
+    ],
+}
+
+# Normalized dates for range filters, and the weighted text indexes
+for _collection in SOURCE_DATE_FIELDS:
+    INDEXES[_collection].append(_index([(DATE_FIELD, ASCENDING)], "date"))
+for _collection, _weights in TEXT_INDEXES.items():
+    INDEXES[_collection].append(_text_index(_weights))
+
+
+def _is_text(keys):
+    return any(direction == "text" for _, direction in keys)
+
+
+def _matches(spec_keys, existing_keys):
+    # The server stores text indexes as _fts/_ftsx, and a collection can
+    # have only one, so any text index satisfies a text spec
+    if _is_text(spec_keys):
+        return _is_text(existing_keys)
+    return [tuple(k) for k in spec_keys] == [(field, direction) for field, direction in existing_keys]
+
+
+async def _index_sizes(collection):
+    try:
+        stats = await collection.aggregate([{"$collStats": {"storageStats": {}}}]).to_list(length=1)
+        return stats[0]["storageStats"].get("indexSizes", {}) if stats else {}
+    except (PyMongoError, KeyError, NotImplementedError):
+        return {}
+
+
+async def _diff(collection, specs):
+    existing = await collection.index_information()
+    missing = []
+    matched = set()
+    for spec in specs:
+        name = next((n for n, info in existing.items() if _matches(spec["keys"], info["key"])), None)
+        if name is None:
+            missing.append(spec)
+        else:
+            matched.add(name)
+    extra = {n: info for n, info in existing.items() if n not in matched and n != "_id_"}
+    return existing, missing, extra
+
+
+async def ensure_indexes(db, collections=None):
+    """Create the declared indexes that don't exist yet. Safe to run
+    repeatedly; returns the names it created."""
+    created = []
+    names = collections or INDEXES
+    if TEXT_COLLECTION in names:
+        # An index build would otherwise create it uncompressed
+        try:
+            await ensure_text_collection(db)
+        except PyMongoError as e:
+            print(f"Indexes: could not create '{TEXT_COLLECTION}': {e}")
+    for name in names:
+        collection = db[name]
+        try:
+            _, missing, _ = await _diff(collection, INDEXES[name])
+        except PyMongoError as e:
+            print(f"Indexes: could not inspect '{name}': {e}")
+            continue
+        for spec in missing:
+            options = {k: v for k, v in spec.items() if k != "keys"}
+            try:
+                await collection.create_index(spec["keys"], background=True, **options)
+                created.append(f"{name}.{spec['name']}")
+            except PyMongoError as e:
+                print(f"Indexes: could not create {name}.{spec['name']}: {e}")
+    if created:
+        print(f"Indexes: created {', '.join(created)}")
+    return created
+
+
+async def index_report(db):
+    """Per collection: declared indexes that are missing, indexes that exist
+    but aren't declared, and the size of every existing index."""
+    report = {}
+    for name, specs in INDEXES.items():
+        collection = db[name]
+        existing, missing, extra = await _diff(collection, specs)
+        sizes = await _index_sizes(collection)
+        report[name] = {
+            "missing": [{"name": s["name"], "key": s["keys"]} for s in missing],
+            "extra": [{"name": n, "key": info["key"], "size_bytes": sizes.get(n)} for n, info in extra.items()],
+            "present": [{"name": n, "size_bytes": sizes.get(n)} for n in existing if n not in extra],
+        }
+    return report
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""Replay a fixed mix of dashboard requests at fixed concurrency and report
+p50/p95/p99 latency, throughput and payload size per route.
+
+Point it at a server running on data from seed_benchmark_data.py. Runs are
+reproducible for a given --seed: every worker draws routes and query terms
+from its own seeded RNG. Results can be saved with --out and compared with a
+previous run with --baseline. The exit status is 1 when any route's p95
+regressed by more than --threshold. Needs httpx (pip install -r requirements-dev.txt).
+
+Usage:
+    python load_test.py --duration 60 --concurrency 16 --out bench.json
+    python load_test.py --requests 5000 --baseline bench.json --threshold 1.2
+    python load_test.py --routes search,livelaw --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlencode
+import httpx
+from seed_benchmark_data import AUTHORS, MINISTRIES, PLACES, WORDS
+
+# route name -> relative weight in the default mix (roughly what the
+# dashboard's pages request)
+DEFAULT_MIX = {
+    "search": 25,
+    "livelaw": 20,
+    "ichr": 15,
+    "alerts_processed": 15,
+    "livelaw_detail": 10,
+    "ichr_detail": 5,
+    "alert_detail": 10,
+}
+
+# Detail routes pick ids from these list calls before the run starts
+ID_SAMPLE_SIZE = 200
+
+
+def _date_range(rng):
+    year = rng.randint(2019, 2024)
+    month = rng.randint(1, 12)
+    return {"startDate": f"{year}-{month:02d}-01", "endDate": f"{year}-{month:02d}-28"}
+
+
+def build_request(route, rng, ids):
+    """(path, query params) for one request of `route`."""
+    if route == "search":
+        params = {"query": " ".join(rng.sample(WORDS, rng.choice([1, 1, 2]))), "limit": 20}
+        if rng.random() < 0.3:
+            params.update(_date_range(rng))
+        return "/search", params
+    if route == "livelaw":
+        params = {"limit": 20, "offset": rng.choice([0, 0, 0, 20, 40])}
+        if rng.random() < 0.3:
+            params["query"] = rng.choice(WORDS)
+        if rng.random() < 0.2:
+            params["author"] = rng.choice(AUTHORS)
+        if rng.random() < 0.2:
+            params.update(_date_range(rng))
+        return "/livelaw/", params
+    if route == "ichr":
+        params = {"limit": 20, "offset": rng.choice([0, 0, 0, 20])}
+        if rng.random() < 0.3:
+            params["query"] = rng.choice(WORDS)
+        if rng.random() < 0.2:
+            params["place"] = rng.choice(PLACES)
+        return "/ichr/", params
+    if route == "alerts_processed":
+        params = {}
+        if rng.random() < 0.4:
+            params["query"] = rng.choice([rng.choice(WORDS), rng.choice(MINISTRIES)])
+        if rng.random() < 0.3:
+            params["tags"] = rng.choice(["legislative_value", "economic_impact", "political_relevance"])
+        if rng.random() < 0.2:
+            params.update(_date_range(rng))
+        return "/alerts/processed", params
+    if route == "livelaw_detail":
+        return f"/livelaw/{rng.choice(ids['livelaw'])}", {}
+    if route == "ichr_detail":
+        return f"/ichr/{rng.choice(ids['ichr'])}", {}
+    if route == "alert_detail":
+        return f"/alerts/{rng.choice(ids['alerts'])}", {}
+    raise ValueError(f"unknown route {route}")
+
+
+async def sample_ids(client, routes):
+    """Ids for the detail routes in the mix, read through the API itself."""
+    ids = {}
+    for name, path in (("livelaw", "/livelaw/"), ("ichr", "/ichr/")):
+        if f"{name}_detail" in routes:
+            res = await client.get(path, params={"limit": ID_SAMPLE_SIZE, "fields": "_id", "count": "false"})
+            res.raise_for_status()
+            ids[name] = [d["id"] for d in res.json()["documents"]]
+    if "alert_detail" in routes:
+        res = await client.get("/alerts/processed", params={"fields": "_id"})
+        res.raise_for_status()
+        ids["alerts"] = [d["id"] for d in res.json()][:ID_SAMPLE_SIZE]
+    return ids
+
+
+async def worker(client, rng, routes, weights, ids, deadline, budget, samples):
+    while time.monotonic() < deadline:
+        if budget is not None:
+            if budget["left"] <= 0:
+                return
+            budget["left"] -= 1
+        route = rng.choices(routes, weights)[0]
+        path, params = build_request(route, rng, ids)
+        started = time.perf_counter()
+        try:
+            res = await client.get(path + ("?" + urlencode(params) if params else ""))
+            status, body, wire = res.status_code, len(res.content), res.num_bytes_downloaded
+        except httpx.HTTPError:
+            status, body, wire = 0, 0, 0
+        samples.append((route, status, (time.perf_counter() - started) * 1000, body, wire))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(samples, elapsed):
+    report = {}
+    for route in sorted({s[0] for s in samples}):
+        rows = [s for s in samples if s[0] == route]
+        ok = sorted(s[2] for s in rows if 200 <= s[1] < 400)
+        report[route] = {
+            "requests": len(rows),
+            "errors": sum(1 for s in rows if not 200 <= s[1] < 400),
+            "rps": round(len(rows) / elapsed, 2),
+            "p50_ms": _round(percentile(ok, 50)),
+            "p95_ms": _round(percentile(ok, 95)),
+            "p99_ms": _round(percentile(ok, 99)),
+            "avg_bytes": int(sum(s[3] for s in rows) / len(rows)),
+            "avg_wire_bytes": int(sum(s[4] for s in rows) / len(rows)),
+        }
+    all_ok = sorted(s[2] for s in samples if 200 <= s[1] < 400)
+    report["_total"] = {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not 200 <= s[1] < 400),
+        "rps": round(len(samples) / elapsed, 2),
+        "p50_ms": _round(percentile(all_ok, 50)),
+        "p95_ms": _round(percentile(all_ok, 95)),
+        "p99_ms": _round(percentile(all_ok, 99)),
+    }
+    return report
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+def print_report(report):
+    header = f"{'route':<18}{'reqs':>7}{'err':>5}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'bytes':>10}{'wire':>10}"
+    print(header)
+    print("-" * len(header))
+    for route, r in report.items():
+        print(
+            f"{route:<18}{r['requests']:>7}{r['errors']:>5}{r['rps']:>8}"
+            f"{_fmt(r['p50_ms']):>9}{_fmt(r['p95_ms']):>9}{_fmt(r['p99_ms']):>9}"
+            f"{r.get('avg_bytes', ''):>10}{r.get('avg_wire_bytes', ''):>10}"
+        )
+
+
+def _fmt(ms):
+    return "-" if ms is None else f"{ms:.1f}"
+
+
+def compare(report, baseline, threshold):
+    """Routes whose p95 grew by more than `threshold`x over the baseline."""
+    regressions = []
+    for route, r in report.items():
+        before = baseline.get(route, {}).get("p95_ms")
+        if before and r["p95_ms"] and r["p95_ms"] > before * threshold:
+            regressions.append(f"{route}: p95 {before:.1f} -> {r['p95_ms']:.1f} ms")
+    return regressions
+
+
+async def run(args):
+    mix = {name: DEFAULT_MIX[name] for name in args.routes} if args.routes else dict(DEFAULT_MIX)
+    routes, weights = list(mix), list(mix.values())
+    headers = {"Accept-Encoding": args.accept_encoding}
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, limits=limits, timeout=args.timeout) as client:
+        ids = await sample_ids(client, routes)
+        if args.warmup:
+            warm = []
+            await asyncio.gather(*(
+                worker(client, random.Random(args.seed - i - 1), routes, weights, ids,
+                       time.monotonic() + args.warmup, None, warm)
+                for i in range(args.concurrency)
+            ))
+
+        samples = []
+        budget = {"left": args.requests} if args.requests else None
+        deadline = time.monotonic() + (args.duration if not args.requests else float("inf"))
+        started = time.monotonic()
+        await asyncio.gather(*(
+            worker(client, random.Random(args.seed + i), routes, weights, ids, deadline, budget, samples)
+            for i in range(args.concurrency)
+        ))
+        elapsed = time.monotonic() - started
+    return summarize(samples, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="seconds (ignored with --requests)")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of unrecorded traffic first")
+    parser.add_argument("--routes", help=f"comma-separated subset of: {', '.join(DEFAULT_MIX)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--accept-encoding", default="gzip")
+    parser.add_argument("--out", help="write the report as JSON")
+    parser.add_argument("--baseline", help="JSON report to compare p95s against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="allowed p95 growth factor")
+    args = parser.parse_args()
+
+    if args.routes:
+        args.routes = [r.strip() for r in args.routes.split(",") if r.strip()]
+        unknown = set(args.routes) - set(DEFAULT_MIX)
+        if unknown:
+            parser.error(f"unknown route(s): {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo p95 regressions beyond {args.threshold}x")
+
+
+if __name__ == "__main__":
+    main()
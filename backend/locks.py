@@ -0,0 +1,19 @@
+import fcntl
+
+# Electing one uvicorn worker for work that must have a single writer (the
+# full-text index file, the alert feed sync). The worker holding an flock on
+# a file next to the app does the work; the lock goes with the process, so
+# another worker takes over when it exits. flock only coordinates workers on
+# one host.
+
+
+def try_lock(path):
+    """An exclusive lock on `path`, held for as long as the returned file
+    stays open, or None when another process holds it."""
+    f = open(path, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
@@ -1,8 +1,42 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from serialization import ORJSONResponse
+from compression import CompressionMiddleware
+from metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from query_plans import ExplainMiddleware
+from fastapi.responses import Response
 # Import routers will be added here later
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    import database
+    from indexes import ensure_indexes
+    from alert_feed import run_alert_feed
+    from dashboard import dashboard_snapshot
+    from suggest import suggest_index
+    from fulltext import fulltext_index
+    # Each uvicorn worker connects here, once its app is actually starting
+    database.connect()
+    await database.verify_conn()
+    # Index builds can take a while on large collections; don't block startup
+    tasks = [
+        asyncio.create_task(ensure_indexes(database.db)),
+        asyncio.create_task(run_alert_feed(database.db)),
+        asyncio.create_task(dashboard_snapshot.run(database.db)),
+        asyncio.create_task(suggest_index.run(database.read_db)),
+        asyncio.create_task(fulltext_index.run(database.read_db)),
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        database.close()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Configure CORS
 origins = [
@@ -19,20 +53,27 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-@app.on_event("startup")
-async def startup_db_client():
-    from database import verify_conn
-    await verify_conn()
+# Innermost: X-Query-Plans must be added before compression sends headers
+app.add_middleware(ExplainMiddleware)
+# Added after CORS so it wraps CORS and compresses everything it sends
+app.add_middleware(CompressionMiddleware)
+# Outermost, so latency covers everything and sizes are what went on the wire
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 async def root():
     return {"message": "FastAPI Backend is running"}
 
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text exposition format
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
 # Include Routers
-from routers import livelaw, ichr, general, alerts
+from routers import livelaw, ichr, general, alerts, admin
 
 app.include_router(livelaw.router)
 app.include_router(ichr.router)
 app.include_router(general.router)
 app.include_router(alerts.router)
+app.include_router(admin.router)
@@ -0,0 +1,222 @@
+import bisect
+import threading
+import time
+from pymongo import monitoring
+
+# Minimal Prometheus instrumentation, exposed as text on GET /metrics:
+#   http_*   per-route counts, latency and response size (MetricsMiddleware)
+#   mongo_*  per-collection, per-command duration and documents returned
+#            (MongoCommandListener, registered on the Motor client)
+# Routes are labelled by their template (/livelaw/{id}), never the raw path,
+# so label cardinality stays bounded.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DOCUMENT_BUCKETS = (0, 1, 10, 20, 50, 100, 500, 1000, 5000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        # pymongo calls listeners from driver threads
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {} # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 2)
+            # Stored per bucket; made cumulative when rendered
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {labels: list(state) for labels, state in self._values.items()}
+        for labels, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', bound)])} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', '+Inf')])} {state[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {state[-2]}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {state[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from request to last response byte.", ("method", "route")))
+HTTP_RESPONSE_SIZE = registry.register(Histogram(
+    "http_response_size_bytes", "Response body bytes as sent (after compression).", ("method", "route"),
+    buckets=SIZE_BUCKETS))
+HTTP_IN_PROGRESS = registry.register(Gauge(
+    "http_requests_in_progress", "Requests currently being handled.", ("method",)))
+
+MONGO_DURATION = registry.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command round-trip time.", ("collection", "command")))
+MONGO_DOCUMENTS = registry.register(Histogram(
+    "mongo_command_documents_returned", "Documents returned per command batch.", ("collection", "command"),
+    buckets=DOCUMENT_BUCKETS))
+MONGO_FAILURES = registry.register(Counter(
+    "mongo_command_failures_total", "MongoDB commands that returned an error.", ("collection", "command", "code")))
+
+COALESCED_REQUESTS = registry.register(Counter(
+    "coalesced_requests_total", "Coalesced route calls: leaders ran the query, collapsed requests shared it.",
+    ("route", "role")))
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _route_label(scope):
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Record count, latency and response size for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc((method,))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.dec((method,))
+            route = _route_label(scope)
+            HTTP_REQUESTS.inc((method, route, str(status)))
+            HTTP_LATENCY.observe((method, route), time.perf_counter() - started)
+            HTTP_RESPONSE_SIZE.observe((method, route), size)
+
+
+def _returned(reply):
+    cursor = reply.get("cursor") if isinstance(reply, dict) else None
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        if isinstance(batch, list):
+            return len(batch)
+    if isinstance(reply, dict) and isinstance(reply.get("values"), list): # distinct
+        return len(reply["values"])
+    return 0
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command the driver sends, keyed by collection."""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else ""
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = collection
+
+    def _collection(self, event):
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), "")
+
+    def succeeded(self, event):
+        labels = (self._collection(event), event.command_name)
+        MONGO_DURATION.observe(labels, event.duration_micros / 1e6)
+        MONGO_DOCUMENTS.observe(labels, _returned(event.reply))
+
+    def failed(self, event):
+        collection = self._collection(event)
+        MONGO_DURATION.observe((collection, event.command_name), event.duration_micros / 1e6)
+        code = event.failure.get("code", "") if isinstance(event.failure, dict) else ""
+        MONGO_FAILURES.inc((collection, event.command_name, str(code)))
+
+
+mongo_listener = MongoCommandListener()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Backfill the normalized _date / _timestamp fields used by the date filters.
+
+Only documents that don't have a _date yet are touched, so the migration can be
+stopped at any point and re-run to pick up where it left off (or to catch
+documents the scrapers inserted since the last run). Unparseable dates are
+stored as _date=None so they aren't retried forever.
+
+Usage:
+    python migrate_dates.py                     # all collections
+    python migrate_dates.py ichr gazettes       # only these
+    python migrate_dates.py --batch-size 2000 --dry-run
+"""
+import argparse
+import asyncio
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from dates import DATE_FIELD, SOURCE_DATE_FIELDS, normalized_date_fields
+from indexes import ensure_indexes
+
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://127.0.0.1:27017/dashboard")
+
+
+async def migrate_collection(db, name, batch_size, dry_run=False):
+    raw_field, _ = SOURCE_DATE_FIELDS[name]
+    pending = {DATE_FIELD: {"$exists": False}}
+
+    remaining = await db[name].count_documents(pending)
+    print(f"[{name}] {remaining} documents to migrate")
+    if dry_run or remaining == 0:
+        return 0
+
+    migrated = 0
+    unparsed = 0
+    while True:
+        docs = await db[name].find(pending, {raw_field: 1}).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+
+        ops = []
+        for doc in docs:
+            fields = normalized_date_fields(name, doc.get(raw_field))
+            if fields[DATE_FIELD] is None:
+                unparsed += 1
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+
+        await db[name].bulk_write(ops, ordered=False)
+        migrated += len(ops)
+        print(f"[{name}] {migrated}/{remaining} migrated")
+
+    if unparsed:
+        print(f"[{name}] {unparsed} documents had an unparseable '{raw_field}'")
+    return migrated
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("collections", nargs="*", help=f"any of: {', '.join(SOURCE_DATE_FIELDS)}")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="only report how many documents need migrating")
+    args = parser.parse_args()
+    unknown = set(args.collections) - set(SOURCE_DATE_FIELDS)
+    if unknown:
+        parser.error(f"unknown collection(s): {', '.join(sorted(unknown))}")
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client.get_default_database()
+    print(f"Connected to database: {db.name}")
+
+    try:
+        if not args.dry_run:
+            await ensure_indexes(db, list(SOURCE_DATE_FIELDS))
+        for name in args.collections or SOURCE_DATE_FIELDS:
+            await migrate_collection(db, name, args.batch_size, args.dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Move gazette pdf_text out of the gazettes collection into gazette_texts.
+
+Each gazette's text is split into chunks stored in gazette_texts, a
+collection created with its own block compressor (GAZETTE_TEXT_COMPRESSOR,
+zstd by default). The gazette keeps text_external=True and text_length, so
+the documents the alerts $lookup and the detail route read shrink to their
+metadata. See gazette_text.py for the chunk layout.
+
+Only gazettes that still have an inline pdf_text are touched, so the
+migration can be stopped at any point and re-run to pick up where it left
+off (or to move the text of gazettes the scrapers inserted since the last
+run). Gazettes without a gazette_id keep their text inline.
+
+Usage:
+    python migrate_gazette_text.py
+    python migrate_gazette_text.py --batch-size 50 --dry-run
+    python migrate_gazette_text.py --min-chars 4096   # leave short texts inline
+"""
+import argparse
+import asyncio
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from gazette_text import TEXT_COLLECTION, TEXT_FIELD, externalize_text
+from indexes import ensure_indexes
+
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://127.0.0.1:27017/dashboard")
+
+
+def pending_filter(min_chars):
+    query = {TEXT_FIELD: {"$type": "string"}, "gazette_id": {"$exists": True, "$ne": None}}
+    if min_chars:
+        query["$expr"] = {"$gte": [{"$strLenCP": "$" + TEXT_FIELD}, min_chars]}
+    return query
+
+
+async def migrate(db, batch_size, min_chars=0, dry_run=False):
+    pending = pending_filter(min_chars)
+    remaining = await db.gazettes.count_documents(pending)
+    print(f"[gazettes] {remaining} texts to move")
+    if dry_run or remaining == 0:
+        return 0
+
+    moved = 0
+    last_id = None
+    while True:
+        # Walk by _id: gazettes skipped by externalize_text keep matching
+        query = {**pending, "_id": {"$gt": last_id}} if last_id is not None else pending
+        docs = await db.gazettes.find(query, {"gazette_id": 1, TEXT_FIELD: 1}).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+        for doc in docs:
+            if await externalize_text(db, doc):
+                moved += 1
+        last_id = docs[-1]["_id"]
+        print(f"[gazettes] {moved}/{remaining} moved")
+    return moved
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # Texts run to megabytes; keep batches small
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--min-chars", type=int, default=0, help="only move texts at least this long")
+    parser.add_argument("--dry-run", action="store_true", help="only report how many texts need moving")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client.get_default_database()
+    print(f"Connected to database: {db.name}")
+
+    try:
+        if not args.dry_run:
+            # Creates the compressed collection, then its indexes
+            await ensure_indexes(db, [TEXT_COLLECTION])
+        await migrate(db, args.batch_size, args.min_chars, args.dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+import base64
+import os
+import time
+from bson import json_util
+from fastapi import HTTPException
+
+# Counts for filtered queries are cached briefly so that paging through one
+# result set only pays for count_documents on the first page.
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "60"))
+COUNT_CACHE_SIZE = 256
+
+_count_cache = {}
+
+
+def encode_cursor(sort_value, doc_id):
+    """Opaque cursor for the position right after (sort_value, _id)."""
+    raw = json_util.dumps({"v": sort_value, "id": doc_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+        return data["v"], data["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(sort_field, direction, sort_value, doc_id):
+    """Match everything after (sort_value, doc_id) in `sort_field`/_id order.
+
+    Documents without the sort field sort first ascending and last
+    descending, so they need their own branch.
+    """
+    op = "$gt" if direction > 0 else "$lt"
+    if sort_value is None:
+        after_nulls = {sort_field: None, "_id": {op: doc_id}}
+        if direction > 0:
+            return {"$or": [{sort_field: {"$ne": None}}, after_nulls]}
+        return after_nulls
+
+    branches = [
+        {sort_field: {op: sort_value}},
+        {sort_field: sort_value, "_id": {op: doc_id}},
+    ]
+    if direction < 0:
+        branches.append({sort_field: None})
+    return {"$or": branches}
+
+
+def keyset_sort(sort_field, direction):
+    # _id breaks ties so the order (and therefore the cursor) is total
+    return [(sort_field, direction), ("_id", direction)]
+
+
+async def fetch_page(collection, mongo_query, sort_field, direction, limit, offset=0, cursor=None,
+                     projection=None):
+    """Fetch one page, reading limit+1 rows to learn whether more exist.
+
+    With `cursor` the page starts after the encoded position (offset is
+    ignored); otherwise it falls back to skip(offset).
+    Returns (documents, has_more, next_cursor).
+    """
+    query = mongo_query
+    if cursor:
+        sort_value, doc_id = decode_cursor(cursor)
+        query = {"$and": [mongo_query, keyset_filter(sort_field, direction, sort_value, doc_id)]}
+
+    find = collection.find(query, projection).sort(keyset_sort(sort_field, direction))
+    if offset and not cursor:
+        find.skip(offset)
+    documents = await find.limit(limit + 1).to_list(length=limit + 1)
+
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    next_cursor = None
+    if has_more and documents:
+        last = documents[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+    return documents, has_more, next_cursor
+
+
+async def count_hits(collection, mongo_query, exact=None):
+    """Total hits for a list response.
+
+    exact=True always runs count_documents, exact=False skips counting
+    (returns None). By default an unfiltered query uses the collection
+    metadata count and a filtered one reuses a recently cached count.
+    """
+    if exact is False:
+        return None
+    if exact is None and not mongo_query:
+        return await collection.estimated_document_count()
+    if exact:
+        return await collection.count_documents(mongo_query)
+
+    key = (collection.name, json_util.dumps(mongo_query, sort_keys=True))
+    now = time.monotonic()
+    cached = _count_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    total = await collection.count_documents(mongo_query)
+    if len(_count_cache) >= COUNT_CACHE_SIZE:
+        _count_cache.pop(next(iter(_count_cache)))
+    _count_cache[key] = (now + COUNT_CACHE_TTL, total)
+    return total
@@ -0,0 +1,75 @@
+from dates import DATE_FIELD, TIMESTAMP_FIELD
+
+# List endpoints accept view=summary|full and fields=a,b,c.
+#   summary (default)  drops the large body fields list views never render
+#   full               returns whole documents, as before
+#   fields             returns only the named fields (dot paths allowed)
+# Detail endpoints always return full documents.
+SUMMARY = "summary"
+FULL = "full"
+
+# Characters of ICHR `content` kept in the summary view (the card shows a
+# three-line excerpt)
+EXCERPT_CHARS = 400
+
+SUMMARY_PROJECTIONS = {
+    "livelaw": {"content": 0},
+    "ichr": {
+        "title": 1,
+        "summary": 1,
+        "Date": 1,
+        "Place": 1,
+        "place": 1,
+        "site": 1,
+        "url": 1,
+        "Attachments": 1,
+        DATE_FIELD: 1,
+        TIMESTAMP_FIELD: 1,
+        "content": {"$substrCP": [{"$ifNull": ["$content", ""]}, 0, EXCERPT_CHARS]},
+    },
+    "alerts": {"gazette_details.pdf_text": 0},
+}
+
+# Fields the routers themselves need (sorting, _timestamp, renames), always
+# added to an explicit `fields` list
+REQUIRED_FIELDS = {
+    "livelaw": ["published_at", TIMESTAMP_FIELD],
+    "ichr": ["Date", "Attachments", TIMESTAMP_FIELD],
+    "alerts": ["alerted_at", "gazette_id", "gazette_details.publish_date", f"gazette_details.{TIMESTAMP_FIELD}"],
+}
+
+# Gazette fields too large to carry through a $lookup for list views
+GAZETTE_HEAVY_FIELDS = ["pdf_text"]
+
+
+def _parse_fields(fields):
+    return [f.strip() for f in fields.split(",") if f.strip()] if fields else []
+
+
+def _inclusion(paths):
+    """{path: 1} for each path, skipping paths already covered by a parent
+    (MongoDB rejects projections with colliding paths)."""
+    paths = sorted(set(paths))
+    kept = [p for p in paths if not any(p.startswith(q + ".") for q in paths)]
+    return {p: 1 for p in kept}
+
+
+def list_projection(collection, view=SUMMARY, fields=None):
+    """Projection for a list query on `collection`, or None for whole docs."""
+    names = _parse_fields(fields)
+    if names:
+        return _inclusion(names + REQUIRED_FIELDS[collection])
+    if view == FULL:
+        return None
+    return dict(SUMMARY_PROJECTIONS[collection])
+
+
+def gazette_lookup_projection(view=SUMMARY, fields=None):
+    """Projection applied to gazettes inside the alerts $lookup, so heavy
+    fields never leave the gazettes collection unless asked for."""
+    names = _parse_fields(fields)
+    if view == FULL and not names:
+        return None
+    if any(n in ("gazette_details", *(f"gazette_details.{h}" for h in GAZETTE_HEAVY_FIELDS)) for n in names):
+        return None
+    return {field: 0 for field in GAZETTE_HEAVY_FIELDS}
@@ -0,0 +1,196 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+from serialization import encode
+
+# Query-plan capture. While capture_commands() is active, every read command
+# the driver sends (find / aggregate / count / distinct) is recorded. The
+# recorded commands can then be re-run with explain("executionStats") and
+# summarized: which stages ran, how many documents and keys were examined
+# for how many returned, and whether any part fell back to a collection scan.
+#
+# explain_queries.py runs this over every router's query shapes. At runtime,
+# a request with "X-Debug-Explain: 1" gets the same summary back in an
+# X-Query-Plans header, but only when DEBUG_EXPLAIN=1 (every captured query
+# is executed a second time).
+DEBUG_EXPLAIN = os.getenv("DEBUG_EXPLAIN", "0") != "0"
+EXPLAIN_HEADER = "x-debug-explain"
+PLANS_HEADER = "X-Query-Plans"
+PLANS_HEADER_MAX_BYTES = 8192
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+# Session and routing fields the driver adds; not part of the query
+_DRIVER_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+_captured = ContextVar("captured_commands", default=None)
+
+
+class CommandCapture(monitoring.CommandListener):
+    """Records read commands for the current capture_commands() block. Motor
+    runs the driver with a copy of the caller's context, so the ContextVar
+    is visible from the driver thread."""
+
+    def started(self, event):
+        commands = _captured.get()
+        if commands is None or event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        command = {k: v for k, v in event.command.items() if not k.startswith("$") and k not in _DRIVER_FIELDS}
+        commands.append((event.database_name, command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+command_capture = CommandCapture()
+
+
+@contextmanager
+def capture_commands():
+    """Collect the read commands issued inside the block into a list of
+    (database name, command)."""
+    commands = []
+    token = _captured.set(commands)
+    try:
+        yield commands
+    finally:
+        _captured.reset(token)
+
+
+def _writes(command):
+    return any("$out" in stage or "$merge" in stage for stage in command.get("pipeline", []))
+
+
+def _stages(plan, found=None):
+    """Stage names in a winning-plan tree, outermost first."""
+    found = [] if found is None else found
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            found.append(plan["stage"])
+        for key in ("queryPlan", "inputStage", "inputStages", "innerStage", "outerStage"):
+            child = plan.get(key)
+            for item in child if isinstance(child, list) else [child]:
+                _stages(item, found)
+    return found
+
+
+def _reduces(command_name, command):
+    """Whether the command folds many documents into a few (counts, groups),
+    which makes examined/returned meaningless."""
+    if command_name in ("count", "distinct"):
+        return True
+    return any(
+        "$group" in stage or "$count" in stage or "$bucket" in stage or "$facet" in stage
+        for stage in command.get("pipeline", [])
+    )
+
+
+def summarize(command_name, collection, explain, reduces=False):
+    """Condense an executionStats explain into the numbers that matter."""
+    planner = explain.get("queryPlanner")
+    stats = explain.get("executionStats")
+    lookups = []
+    # Aggregations that can't be pushed down entirely nest the find part in
+    # a $cursor stage and report each $lookup separately
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            planner = stage["$cursor"].get("queryPlanner", planner)
+            stats = stage["$cursor"].get("executionStats", stats)
+        elif "$lookup" in stage:
+            lookups.append(stage)
+
+    stages = _stages((planner or {}).get("winningPlan", {}))
+    stats = stats or {}
+    summary = {
+        "command": command_name,
+        "collection": collection,
+        "stages": stages,
+        "docsExamined": stats.get("totalDocsExamined", 0),
+        "keysExamined": stats.get("totalKeysExamined", 0),
+        "returned": stats.get("nReturned", 0),
+        "ms": stats.get("executionTimeMillis"),
+        "collscan": "COLLSCAN" in stages,
+        "reduces": reduces,
+    }
+    for lookup in lookups:
+        summary["docsExamined"] += lookup.get("totalDocsExamined", 0)
+        summary["keysExamined"] += lookup.get("totalKeysExamined", 0)
+        if lookup.get("collectionScans"):
+            summary["collscan"] = True
+            summary["stages"].append(f"$lookup:COLLSCAN({lookup['$lookup'].get('from')})")
+    return summary
+
+
+async def explain_commands(client, commands):
+    """Re-run captured commands under explain and summarize each one."""
+    summaries = []
+    for database, command in commands:
+        name = next(iter(command))
+        collection = command.get(name) if isinstance(command.get(name), str) else ""
+        if name == "aggregate" and _writes(command):
+            continue
+        try:
+            explain = await client[database].command({"explain": command, "verbosity": "executionStats"})
+            summaries.append(summarize(name, collection, explain, _reduces(name, command)))
+        except PyMongoError as e:
+            summaries.append({"command": name, "collection": collection, "error": str(e)})
+    return summaries
+
+
+def plan_problems(summary, max_ratio, allow_ratio=False):
+    """Why a plan is unacceptable: collection scans, or examining more than
+    `max_ratio` documents per document returned. Counts and groups, and
+    shapes passed with allow_ratio, are only checked for collection scans."""
+    if "error" in summary:
+        return [f"explain failed: {summary['error']}"]
+    problems = []
+    if summary["collscan"]:
+        problems.append("collection scan")
+    examined = max(summary["docsExamined"], summary["keysExamined"])
+    if not (allow_ratio or summary["reduces"]) and examined > max_ratio * max(summary["returned"], 1):
+        problems.append(f"examined {examined} for {summary['returned']} returned")
+    return problems
+
+
+class ExplainMiddleware:
+    """Adds X-Query-Plans to responses for requests sent with
+    X-Debug-Explain: 1, when DEBUG_EXPLAIN is on.
+
+    Only queries issued before the response starts are included, so streamed
+    bodies (exports, streamed gazette text) report just their first query.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not DEBUG_EXPLAIN or scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        from database import client
+
+        with capture_commands() as commands:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    summaries = await explain_commands(client, list(commands))
+                    for summary in summaries:
+                        print(f"[explain] {scope['path']}: {summary}")
+                    value = encode(summaries)
+                    if len(value) > PLANS_HEADER_MAX_BYTES:
+                        value = encode({"truncated": True, "queries": len(summaries)})
+                    message["headers"] = [*message.get("headers", []), (PLANS_HEADER.lower().encode(), value)]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _requested(scope):
+        for name, value in scope.get("headers", []):
+            if name == EXPLAIN_HEADER.encode():
+                return value.strip() not in (b"", b"0")
+        return False
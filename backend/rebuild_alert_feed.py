@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Rebuild the denormalized alert_feed collection from alerts + gazettes.
+
+Safe to run while the API is serving traffic: the new feed is swapped in
+atomically. Run it after bulk imports, or periodically on deployments
+without change streams so gazette edits reach the feed.
+
+Usage:
+    python rebuild_alert_feed.py
+"""
+import asyncio
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from alert_feed import FEED_COLLECTION, rebuild_feed
+
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://127.0.0.1:27017/dashboard")
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client.get_default_database()
+    print(f"Connected to database: {db.name}")
+
+    try:
+        count = await rebuild_feed(db)
+        print(f"Rebuilt '{FEED_COLLECTION}' with {count} alerts")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
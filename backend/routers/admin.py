@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException
+from alert_feed import feed_status
+from cache import response_cache
+from coalesce import single_flight
+from database import db
+from fulltext import fulltext_index
+from indexes import ensure_indexes, index_report
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"]
+)
+
+@router.get("/cache")
+async def get_cache_stats():
+    return response_cache.stats()
+
+@router.get("/coalescing")
+async def get_coalescing_stats():
+    # How many requests shared another request's in-flight query
+    return single_flight.stats()
+
+@router.get("/feed")
+async def get_feed_status():
+    # Whether the alert feed is in sync, and whether it is degraded to polling
+    return feed_status()
+
+@router.post("/cache/clear")
+async def clear_cache():
+    response_cache.clear()
+    return {"status": "success"}
+
+@router.get("/indexes")
+async def get_index_report():
+    # Missing / undeclared indexes and their sizes, per collection
+    try:
+        return await index_report(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/indexes/ensure")
+async def build_missing_indexes():
+    try:
+        return {"status": "success", "created": await ensure_indexes(db)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/fulltext")
+async def get_fulltext_stats():
+    return await fulltext_index.stats()
+
+@router.post("/fulltext/rebuild")
+async def rebuild_fulltext():
+    # Picks up deletes and gazette edits now rather than at the next scheduled rebuild
+    try:
+        if not await fulltext_index.rebuild(db):
+            # Another worker owns the index file; it rebuilds on its next pass
+            return {"status": "scheduled"}
+        return {"status": "success", **(await fulltext_index.counts())}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,31 +1,71 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from database import db
 from bson import ObjectId
 from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from dates import build_date_range_filter
+from cache import cached, response_cache
+from coalesce import coalesced
+from deadlines import deadline
+from alert_stream import alert_broadcaster
+from conditional import (
+    CACHE_PRIVATE,
+    conditional,
+    content_digest,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+    validator_headers,
+)
+from serialization import json_response, serialize_doc
+from versions import collection_version
+from gazette_text import (
+    EXTERNAL_FIELD,
+    LENGTH_FIELD,
+    MAX_RANGE_CHARS,
+    TEXT_FIELD,
+    find_gazette_without_text,
+    is_external,
+    read_text_range,
+    should_stream,
+    stream_detail_response,
+)
+from projection import gazette_lookup_projection, list_projection
+from alert_feed import (
+    alert_search_condition,
+    alerts_cursor,
+    apply_alert_update,
+    apply_alert_updates,
+    find_alerts,
+    find_alerts_with_facets,
+)
+from export import EXPORT_BATCH_SIZE, check_format, export_response
+from facets import parse_facets
+from fulltext import apply_hits, fulltext_index, hits_condition
 
 router = APIRouter(
     prefix="/alerts",
     tags=["alerts"]
 )
 
-def serialize_doc(doc):
+# Upper bound on pairs accepted by POST /alerts/actions
+BULK_ACTION_LIMIT = 1000
+
+def _revision(doc):
+    """What identifies one version of a document for ETag purposes."""
     if not doc:
-        return doc
-    if "_id" in doc:
-        doc["id"] = str(doc["_id"])
-        del doc["_id"]
-    
-    for key, value in doc.items():
-        if isinstance(value, dict):
-            serialize_doc(value)
-        elif isinstance(value, list):
-            for item in value:
-                if isinstance(item, dict):
-                    serialize_doc(item)
-    return doc
+        return None
+    if doc.get("updated_at") is None:
+        # Never stamped (gazettes, alerts no one has acted on): go by content
+        return (str(doc["_id"]), content_digest(doc))
+    return (str(doc["_id"]), doc["updated_at"], doc.get("slack_sent"), doc.get("is_relevant"))
 
 @router.get("/count")
+@conditional(CACHE_PRIVATE, version=collection_version("alerts", "gazettes"))
+@cached("alerts_count", ttl=15, tags=("alerts",))
 async def get_alerts_count():
     try:
         # Assuming status "pending" or just counting available alerts
@@ -35,132 +75,221 @@ async def get_alerts_count():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/stream")
+async def stream_alerts():
+    """Server-Sent Events: `count` whenever the pending count changes and
+    `alert` for each newly pending alert."""
+    return StreamingResponse(
+        alert_broadcaster.subscribe(db),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/")
-async def get_alerts():
+@conditional(CACHE_PRIVATE, version=collection_version("alerts", "gazettes"))
+@coalesced("alerts_pending", tags=("alerts",))
+@cached("alerts_pending", ttl=15, tags=("alerts",))
+@deadline("alerts_pending")
+async def get_alerts(
+    view: str = "summary", # "summary" (no pdf_text) or "full"
+    fields: Optional[str] = None # comma-separated fields to return
+):
     try:
-        # Join alerts with gazettes on gazette_id
+        # Alerts joined with their gazette, newest first
         # Filter for slack_sent=False to show only new alerts
-        pipeline = [
-            {
-                "$match": {"slack_sent": False}
-            },
-            {
-                "$lookup": {
-                    "from": "gazettes",
-                    "localField": "gazette_id",
-                    "foreignField": "gazette_id",
-                    "as": "gazette_details"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$gazette_details",
-                    "preserveNullAndEmptyArrays": True
-                }
-            },
-            {"$sort": {"alerted_at": -1}}
-        ]
-        
-        cursor = db.alerts.aggregate(pipeline)
-        alerts = await cursor.to_list(length=100)
+        alerts = await find_alerts(
+            db, {"slack_sent": False}, limit=100,
+            projection=list_projection("alerts", view, fields),
+            gazette_projection=gazette_lookup_projection(view, fields)
+        )
         
         return [serialize_doc(a) for a in alerts]
     except Exception as e:
         print(f"Error in get_alerts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def build_processed_filter(query=None, tags=None, startDate=None, endDate=None, body=False):
+    """(alert match, joined conditions, full-text hits or None) for
+    processed alerts."""
+    # Build base match for processed alerts
+    match_stage = {"slack_sent": True}
+    
+    # Tags filter (multiple options)
+    if tags:
+        tag_list = tags.split(",")
+        for tag in tag_list:
+            if tag.strip() in ["legislative_value", "economic_impact", "political_relevance"]:
+                match_stage[tag.strip()] = True
+
+    joined_conditions = []
+    hits = None
+
+    # Search filter (across alert and gazette fields)
+    if query and fulltext_index.ready:
+        # The hits are alert _ids and gazette_ids, so the filter is indexed.
+        # Every match, whatever its status: capping them at the best ranked
+        # would drop real matches from date-sorted pages, facets and exports.
+        hits = await fulltext_index.search(query, limit=None, snippets=False)
+        match_stage.update(hits_condition(hits))
+    elif query:
+        regex_query = {"$regex": query, "$options": "i"}
+        joined_conditions.append(await alert_search_condition(db, regex_query, body))
+
+    date_filter = build_date_range_filter(
+        "gazettes", startDate, endDate, prefix="gazette_details."
+    )
+    if date_filter:
+        joined_conditions.append(date_filter)
+    return match_stage, joined_conditions, hits
+
 @router.get("/processed")
+@conditional(CACHE_PRIVATE, version=collection_version("alerts", "gazettes"))
+@coalesced("alerts_processed", tags=("alerts",))
+@cached("alerts_processed", ttl=30, tags=("alerts",))
+@deadline("alerts_processed")
 async def get_processed_alerts(
     query: Optional[str] = None,
     tags: Optional[str] = None, # legislative_value,economic_impact,political_relevance
     startDate: Optional[str] = None,
     endDate: Optional[str] = None,
-    sortBy: str = "newest"
+    sortBy: str = "newest",
+    view: str = "summary", # "summary" (no pdf_text) or "full"
+    fields: Optional[str] = None, # comma-separated fields to return
+    facets: Optional[str] = None, # e.g. "ministry,tag,month": returns {"alerts", "facets"}
+    body: bool = False # before the full-text index is ready: also $regex gazette text (slow, capped)
 ):
+    facet_names = parse_facets(facets)
     try:
-        # Build base match for processed alerts
-        match_stage = {"slack_sent": True}
-        
-        # Tags filter (multiple options)
-        if tags:
-            tag_list = tags.split(",")
-            for tag in tag_list:
-                if tag.strip() in ["legislative_value", "economic_impact", "political_relevance"]:
-                    match_stage[tag.strip()] = True
-
-        pipeline = [
-            {"$match": match_stage},
-            {
-                "$lookup": {
-                    "from": "gazettes",
-                    "localField": "gazette_id",
-                    "foreignField": "gazette_id",
-                    "as": "gazette_details"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$gazette_details",
-                    "preserveNullAndEmptyArrays": True
-                }
-            }
-        ]
-
-        # Search filter (across alert and gazette fields)
-        if query:
-            regex_query = {"$regex": query, "$options": "i"}
-            pipeline.append({
-                "$match": {
-                    "$or": [
-                        {"summary": regex_query},
-                        {"reason": regex_query},
-                        {"gazette_details.ministry": regex_query},
-                        {"gazette_details.subject": regex_query},
-                        {"gazette_details.pdf_text": regex_query}
-                    ]
-                }
-            })
-
-        if startDate or endDate:
-            gazette_expr_conds = []
-            if startDate:
-                try:
-                    start_dt = datetime.fromisoformat(startDate)
-                    gazette_expr_conds.append({
-                        "$gte": [
-                            {"$dateFromString": {"dateString": "$gazette_details.publish_date", "format": "%d/%m/%Y", "onError": datetime(1970, 1, 1), "onNull": datetime(1970, 1, 1)}},
-                            start_dt
-                        ]
-                    })
-                except: pass
-            if endDate:
-                try:
-                    end_dt = datetime.fromisoformat(endDate).replace(hour=23, minute=59, second=59)
-                    gazette_expr_conds.append({
-                        "$lte": [
-                            {"$dateFromString": {"dateString": "$gazette_details.publish_date", "format": "%d/%m/%Y", "onError": datetime(1970, 1, 1), "onNull": datetime(1970, 1, 1)}},
-                            end_dt
-                        ]
-                    })
-                except: pass
-            
-            if gazette_expr_conds:
-                pipeline.append({"$match": {"$expr": {"$and": gazette_expr_conds}}})
+        match_stage, joined_conditions, hits = await build_processed_filter(query, tags, startDate, endDate, body)
 
         # Sorting
         sort_order = -1 if sortBy == "newest" else 1
-        pipeline.append({"$sort": {"alerted_at": sort_order}})
-        
-        cursor = db.alerts.aggregate(pipeline)
-        alerts = await cursor.to_list(length=100)
+        options = {
+            "projection": list_projection("alerts", view, fields),
+            "gazette_projection": gazette_lookup_projection(view, fields),
+        }
+        if facet_names:
+            alerts, counts = await find_alerts_with_facets(
+                db, facet_names, match_stage, joined_conditions, sort_order, limit=100, **options
+            )
+            if hits:
+                apply_hits(alerts, await fulltext_index.snippets_for(query, alerts))
+            return {"alerts": [serialize_doc(a) for a in alerts], "facets": counts}
+
+        alerts = await find_alerts(db, match_stage, joined_conditions, sort_order, limit=100, **options)
+        if hits:
+            # Where the query matched, highlighted
+            apply_hits(alerts, await fulltext_index.snippets_for(query, alerts))
         
         return [serialize_doc(a) for a in alerts]
     except Exception as e:
         print(f"Error in get_processed_alerts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/processed/export")
+async def export_processed_alerts(
+    query: Optional[str] = None,
+    tags: Optional[str] = None,
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    sortBy: str = "newest",
+    format: str = "ndjson", # "ndjson" or "csv"
+    limit: Optional[int] = None, # default: every matching alert
+    view: str = "summary",
+    fields: Optional[str] = None, # also the CSV columns
+    body: bool = False
+):
+    check_format(format)
+    match_stage, joined_conditions, _ = await build_processed_filter(query, tags, startDate, endDate, body)
+    cursor = alerts_cursor(
+        db, match_stage, joined_conditions, -1 if sortBy == "newest" else 1, limit=limit,
+        projection=list_projection("alerts", view, fields),
+        gazette_projection=gazette_lookup_projection(view, fields),
+        batch_size=EXPORT_BATCH_SIZE
+    )
+    return await export_response(cursor, "alerts", format, fields)
+
+async def _detail_response(alert, gazette_oid, headers, stream, text=True):
+    """Alert + full gazette. Large pdf_text is streamed in slices unless the
+    client passes stream=false. With text=false the gazette comes without
+    pdf_text, carrying text_length instead, for GET /alerts/{id}/text."""
+    gazette, text_length = await find_gazette_without_text(db, gazette_oid)
+    if not text:
+        if gazette is not None:
+            gazette[LENGTH_FIELD] = text_length
+    elif stream and should_stream(text_length):
+        return stream_detail_response(db, alert, gazette, text_length, headers=headers)
+    elif text_length is not None:
+        gazette["pdf_text"] = await read_text_range(db, gazette, 0, text_length)
+    return await json_response({
+        "alert": serialize_doc(alert),
+        "gazette": serialize_doc(gazette) if gazette else None
+    }, headers=headers)
+
+# What GET /alerts/{id}/text needs of a gazette
+# Everything but the text, so a gazette without updated_at is revised by content
+GAZETTE_REF_PROJECTION = {TEXT_FIELD: 0}
+TEXT_REF_PROJECTION = {"_id": 1, "gazette_id": 1, "updated_at": 1, EXTERNAL_FIELD: 1, LENGTH_FIELD: 1}
+
+async def _find_text_gazette(alert_id):
+    """The gazette behind an alert (_id or legacy id), or the gazette whose
+    _id is alert_id, as for the detail route."""
+    alert = None
+    try:
+        alert = await db.alerts.find_one({"_id": ObjectId(alert_id)}, {"gazette_id": 1})
+    except Exception:
+        pass
+    if not alert:
+        alert = await db.alerts.find_one({"id": alert_id}, {"gazette_id": 1})
+    if alert:
+        return await db.gazettes.find_one({"gazette_id": alert.get("gazette_id")}, TEXT_REF_PROJECTION)
+    try:
+        return await db.gazettes.find_one({"_id": ObjectId(alert_id)}, TEXT_REF_PROJECTION)
+    except Exception:
+        return None
+
+@router.get("/{alert_id}/text")
+async def get_alert_text(
+    alert_id: str,
+    request: Request,
+    offset: int = Query(0, ge=0), # in characters
+    length: int = Query(MAX_RANGE_CHARS, ge=1, le=MAX_RANGE_CHARS)
+):
+    """A slice of the gazette's pdf_text, so the detail page can load the
+    metadata first (text=false) and page the text in on demand."""
+    try:
+        gazette = await _find_text_gazette(alert_id)
+        if not gazette:
+            raise HTTPException(status_code=404, detail="Alert or gazette not found")
+
+        if is_external(gazette):
+            total = gazette.get(LENGTH_FIELD) or 0
+        else:
+            _, total = await find_gazette_without_text(db, gazette["_id"])
+            total = total or 0
+
+        # The text's length stands in for its content, which isn't loaded yet
+        etag = make_etag(request.url.path, _revision(gazette), total, offset, length)
+        if is_not_modified(request, etag, gazette.get("updated_at")):
+            return not_modified_response(etag, gazette.get("updated_at"), CACHE_PRIVATE)
+
+        text = await read_text_range(db, gazette, offset, length) if offset < total else ""
+        return await json_response({
+            "gazette_id": gazette.get("gazette_id"),
+            "offset": offset,
+            "length": len(text),
+            "total": total,
+            "hasMore": offset + len(text) < total,
+            "text": text
+        }, headers=validator_headers(etag, gazette.get("updated_at"), CACHE_PRIVATE))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in get_alert_text: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{alert_id}")
-async def get_alert_detail(alert_id: str):
+async def get_alert_detail(alert_id: str, request: Request, stream: bool = True, text: bool = True):
     try:
         alert = None
         gazette = None
@@ -176,24 +305,40 @@ async def get_alert_detail(alert_id: str):
             alert = await db.alerts.find_one({"id": alert_id})
 
         if alert:
-            # Found an alert — fetch its linked gazette
-            gazette = await db.gazettes.find_one({"gazette_id": alert.get("gazette_id")})
-            return {
-                "alert": serialize_doc(alert),
-                "gazette": serialize_doc(gazette) if gazette else None
-            }
+            # Found an alert — check the client's copy against the alert and
+            # gazette revisions before loading the (large) gazette document
+            gazette_ref = await db.gazettes.find_one(
+                {"gazette_id": alert.get("gazette_id")}, GAZETTE_REF_PROJECTION
+            )
+            etag = make_etag(request.url.path, _revision(alert), _revision(gazette_ref), text)
+            last_modified = max(
+                (d["updated_at"] for d in (alert, gazette_ref) if d and isinstance(d.get("updated_at"), datetime)),
+                default=None
+            )
+            if is_not_modified(request, etag, last_modified):
+                return not_modified_response(etag, last_modified, CACHE_PRIVATE)
+            headers = validator_headers(etag, last_modified, CACHE_PRIVATE)
+
+            if not gazette_ref:
+                return await json_response({"alert": serialize_doc(alert), "gazette": None}, headers=headers)
+            return await _detail_response(alert, gazette_ref["_id"], headers, stream, text)
 
         # ── Fallback: treat alert_id as a gazette _id ────────────────────────
         # This handles synthetic gazette results from the unified search that
-        # don't have a corresponding alert document.
+        # don't have a corresponding alert document. pdf_text is only loaded
+        # once we know the client's copy is stale.
         try:
-            gazette = await db.gazettes.find_one({"_id": ObjectId(alert_id)})
+            gazette = await db.gazettes.find_one({"_id": ObjectId(alert_id)}, {"pdf_text": 0})
         except Exception:
             pass
 
         if not gazette:
             raise HTTPException(status_code=404, detail="Alert or gazette not found")
 
+        etag = make_etag(request.url.path, None, _revision(gazette), text)
+        if is_not_modified(request, etag, gazette.get("updated_at")):
+            return not_modified_response(etag, gazette.get("updated_at"), CACHE_PRIVATE)
+
         # Build a minimal synthetic alert so the detail page renders correctly
         synthetic_alert = {
             "_id": gazette["_id"],
@@ -210,31 +355,97 @@ async def get_alert_detail(alert_id: str):
             "updated_at": None,
         }
 
-        return {
-            "alert": serialize_doc(synthetic_alert),
-            "gazette": serialize_doc(gazette)
-        }
+        headers = validator_headers(etag, gazette.get("updated_at"), CACHE_PRIVATE)
+        return await _detail_response(synthetic_alert, gazette["_id"], headers, stream, text)
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def action_update(action, now=None):
+    """The $set applied to an alert for an "approve" / "decline" action."""
+    is_relevant = True if action == "approve" else False
+    # User requested slack_sent to be null (None) when declined
+    slack_sent_val = True if action == "approve" else None
+    return {"is_relevant": is_relevant, "slack_sent": slack_sent_val, "updated_at": now or datetime.utcnow()}
+
+@router.post("/actions")
+async def take_bulk_action(actions: List[dict] = Body(..., embed=True)):
+    """Apply many {"id", "action"} pairs in one unordered bulk_write.
+
+    Every pair gets an outcome: updated, not_found, invalid_id,
+    invalid_action, duplicate (a later pair for the same id wins) or error.
+    """
+    if len(actions) > BULK_ACTION_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_ACTION_LIMIT} actions per request")
+    try:
+        results = [{"id": str(item.get("id")), "action": item.get("action"), "status": None} for item in actions]
+        latest = {} # ObjectId -> index of the pair that applies
+        for i, result in enumerate(results):
+            if result["action"] not in ("approve", "decline"):
+                result["status"] = "invalid_action"
+                continue
+            try:
+                oid = ObjectId(result["id"])
+            except Exception:
+                result["status"] = "invalid_id"
+                continue
+            if oid in latest:
+                results[latest[oid]]["status"] = "duplicate"
+            latest[oid] = i
+
+        existing = set()
+        if latest:
+            existing = set(await db.alerts.distinct("_id", {"_id": {"$in": list(latest)}}))
+        now = datetime.utcnow()
+        updates = {}
+        for oid, i in latest.items():
+            if oid in existing:
+                updates[oid] = action_update(results[i]["action"], now)
+            else:
+                results[i]["status"] = "not_found"
+
+        if updates:
+            oids = list(updates)
+            ops = [UpdateOne({"_id": oid}, {"$set": updates[oid]}) for oid in oids]
+            failed = set()
+            try:
+                await db.alerts.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    failed.add(oids[error["index"]])
+            for oid in updates:
+                results[latest[oid]]["status"] = "error" if oid in failed else "updated"
+            applied = {oid: fields for oid, fields in updates.items() if oid not in failed}
+
+            # One feed sync, cache invalidation and recount for the whole batch
+            await apply_alert_updates(db, applied)
+            response_cache.invalidate("alerts")
+            alert_broadcaster.request_refresh()
+
+        return {
+            "status": "success",
+            "updated": sum(1 for r in results if r["status"] == "updated"),
+            "results": results
+        }
+    except Exception as e:
+        print(f"Error in take_bulk_action: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/{alert_id}/action")
 async def take_action(alert_id: str, action: str = Body(..., embed=True)):
     # action: "approve" or "decline"
     try:
-        is_relevant = True if action == "approve" else False
-        # User requested slack_sent to be null (None) when declined
-        slack_sent_val = True if action == "approve" else None
-        
-        result = await db.alerts.update_one(
-            {"_id": ObjectId(alert_id)},
-            {"$set": {"is_relevant": is_relevant, "slack_sent": slack_sent_val, "updated_at": datetime.utcnow()}}
-        )
+        update = action_update(action)
+        result = await db.alerts.update_one({"_id": ObjectId(alert_id)}, {"$set": update})
         
         if result.modified_count == 0:
              raise HTTPException(status_code=404, detail="Alert not updated")
+
+        await apply_alert_update(db, ObjectId(alert_id), update)
+        response_cache.invalidate("alerts")
+        alert_broadcaster.request_refresh()
              
         return {"status": "success", "action": action}
     except Exception as e:
@@ -1,275 +1,460 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional, List
-from database import db
+from database import read_db as db # read-only routes: MONGO_READ_PREFERENCE applies
 from datetime import datetime
+from pymongo.errors import OperationFailure
+from dates import TIMESTAMP_FIELD, build_date_range_filter, to_timestamp
+from alert_feed import alert_search_condition, find_alerts, find_alerts_with_facets
+from cache import cached
+from coalesce import coalesced
+from serialization import serialize_doc
+from conditional import CACHE_PRIVATE, CACHE_PUBLIC, conditional
+from versions import collection_version
+from dashboard import dashboard_snapshot
+from deadlines import DeadlineExceeded, search_deadline_ms, with_deadline
+from facets import facet_pipeline, merge_facets, parse_facets, read_facets, unfiltered_facets
+from fulltext import apply_hits, fulltext_index, hits_condition
+from gazette_text import TEXT_COLLECTION
+from suggest import MAX_SUGGESTIONS, SUGGEST_KINDS, suggest_index
+from projection import gazette_lookup_projection, list_projection
+from text_search import (
+    TEXT_CANDIDATE_LIMIT,
+    TEXT_SCORE_FIELD,
+    is_missing_text_index,
+    text_filter,
+    text_score_projection,
+    text_score_sort,
+)
 import asyncio
+import time
+import traceback
 
 router = APIRouter(
     tags=["general"]
 )
 
-def _strip_object_ids(obj):
-    """Recursively convert ObjectId values to strings so FastAPI can serialize them."""
-    from bson import ObjectId
-    if isinstance(obj, dict):
-        return {k: _strip_object_ids(v) for k, v in obj.items() if k != "_id" or True}
-    if isinstance(obj, list):
-        return [_strip_object_ids(i) for i in obj]
-    if isinstance(obj, ObjectId):
-        return str(obj)
-    return obj
-
-def serialize_doc(doc, doc_type):
-    doc["id"] = str(doc["_id"])
-    del doc["_id"]
+def format_result(doc, doc_type):
+    doc = serialize_doc(doc)
     doc["_type"] = doc_type
 
-    # Strip ObjectIds from nested gazette_details
-    if "gazette_details" in doc and isinstance(doc["gazette_details"], dict):
-        gd = doc["gazette_details"]
-        if "_id" in gd:
-            del gd["_id"]
-        doc["gazette_details"] = _strip_object_ids(gd)
-
-    # Add timestamp field for uniform sorting
+    # Add timestamp field for uniform sorting; migrated docs carry it already
     if doc_type == "livelaw":
-        pub_at = doc.get("published_at")
-        if isinstance(pub_at, str):
-            try:
-                # Remove Z if present for fromisoformat
-                clean_date = pub_at.replace("Z", "+00:00")
-                doc["_timestamp"] = datetime.fromisoformat(clean_date).timestamp() * 1000
-            except:
-                doc["_timestamp"] = 0
-        else:
-            doc["_timestamp"] = pub_at or 0
+        if TIMESTAMP_FIELD not in doc:
+            doc[TIMESTAMP_FIELD] = to_timestamp("livelaw", doc.get("published_at"))
     elif doc_type == "ichr":
-        date_val = doc.get("Date")
-        if isinstance(date_val, str):
-            try:
-                doc["_timestamp"] = datetime.strptime(date_val, "%d.%m.%Y").timestamp() * 1000
-            except:
-                doc["_timestamp"] = 0
-        else:
-             doc["_timestamp"] = date_val or 0
+        if TIMESTAMP_FIELD not in doc:
+            doc[TIMESTAMP_FIELD] = to_timestamp("ichr", doc.get("Date"))
              
         if "Attachments" in doc:
             doc["attachments"] = doc["Attachments"]
     elif doc_type == "gazette":
         # Processed alerts are gazettes in the UI
-        date_val = doc.get("gazette_details", {}).get("publish_date")
-        if isinstance(date_val, str):
-            try:
-                # Parse DD/MM/YYYY format
-                doc["_timestamp"] = datetime.strptime(date_val, "%d/%m/%Y").timestamp() * 1000
-            except:
-                doc["_timestamp"] = 0
+        gazette = doc.get("gazette_details") or {}
+        if TIMESTAMP_FIELD in gazette:
+            doc[TIMESTAMP_FIELD] = gazette[TIMESTAMP_FIELD]
         else:
-             doc["_timestamp"] = 0
+            doc[TIMESTAMP_FIELD] = to_timestamp("gazettes", gazette.get("publish_date"))
         
-    doc["_score"] = 1.0 # default score
+    # Relevance from the text index when the doc came from a $text query
+    doc["_score"] = doc.pop(TEXT_SCORE_FIELD, 1.0)
     return doc
 
+def _aggregate_projection(projection):
+    """A find() projection for $project, with the text score (already added
+    by $addFields) kept instead of re-read through $meta."""
+    projection = {k: v for k, v in projection.items() if k != TEXT_SCORE_FIELD}
+    if any(v != 0 for v in projection.values()):
+        projection[TEXT_SCORE_FIELD] = 1
+    return projection or None
+
+async def _run_query(collection, source, match, projection, sort, limit, facets):
+    """find() a page of `limit` documents, or with `facets` run one $facet
+    aggregation returning the page and the facet counts over every match.
+    Returns (documents, facets or None)."""
+    if not facets:
+        cursor = collection.find(match, projection)
+        if sort:
+            cursor.sort(sort)
+        return await cursor.limit(limit).to_list(length=limit), None
+
+    if not match:
+        # Nothing to filter on: counts over the whole collection, cached
+        async def count():
+            result = await collection.aggregate([facet_pipeline(None, source, facets)]).to_list(length=1)
+            return read_facets(result)[1]
+        docs, _ = await _run_query(collection, source, match, projection, sort, limit, None)
+        return docs, await unfiltered_facets(source, facets, count)
+
+    pipeline = [{"$match": match}]
+    if "$text" in match:
+        pipeline.append({"$addFields": text_score_projection()})
+    hits = []
+    if sort:
+        hits.append({"$sort": {field: -1 if isinstance(d, dict) else d for field, d in sort}})
+    hits.append({"$limit": limit})
+    if projection:
+        hits.append({"$project": _aggregate_projection(projection)})
+    pipeline.append(facet_pipeline(hits, source, facets))
+    return read_facets(await collection.aggregate(pipeline).to_list(length=1))
+
+def _date_sort(sort_field, sortBy):
+    if sortBy == "oldest":
+        return [(sort_field, 1)]
+    if sortBy == "newest":
+        return [(sort_field, -1)]
+    return None
+
+async def _find_with_text(collection, mongo_query, query, regex_or, sort_field, sortBy, limit,
+                          projection=None, facets=None):
+    """Run a $text query ranked by textScore, falling back to the regex $or
+    when the collection has no text index yet."""
+    try:
+        return await _run_query(
+            collection, collection.name,
+            {**mongo_query, **text_filter(query)},
+            {**(projection or {}), **text_score_projection()},
+            _date_sort(sort_field, sortBy) or text_score_sort(), limit, facets
+        )
+    except OperationFailure as e:
+        if not is_missing_text_index(e):
+            raise
+        print(f"[WARN] No text index on '{collection.name}', falling back to regex search")
+
+    return await _run_query(
+        collection, collection.name, {**mongo_query, "$or": regex_or}, projection,
+        _date_sort(sort_field, sortBy), limit, facets
+    )
+
+async def _gazette_body_hits(query):
+    """Text hits on the chunks in gazette_texts; none without its index."""
+    try:
+        return await db[TEXT_COLLECTION].find(
+            text_filter(query),
+            {"_id": 0, "gazette_id": 1, **text_score_projection()}
+        ).sort(text_score_sort()).limit(TEXT_CANDIDATE_LIMIT).to_list(length=TEXT_CANDIDATE_LIMIT)
+    except OperationFailure as e:
+        if not is_missing_text_index(e):
+            raise
+        return []
+
+async def _gazette_text_match(query):
+    """Resolve a text query to a $match over processed alerts plus a score per
+    alert _id / gazette_id. Returns None when no text index is available."""
+    try:
+        alert_hits = await db.alerts.find(
+            {"slack_sent": True, **text_filter(query)},
+            {"_id": 1, **text_score_projection()}
+        ).sort(text_score_sort()).limit(TEXT_CANDIDATE_LIMIT).to_list(length=TEXT_CANDIDATE_LIMIT)
+
+        gazette_hits = await db.gazettes.find(
+            text_filter(query),
+            {"gazette_id": 1, **text_score_projection()}
+        ).sort(text_score_sort()).limit(TEXT_CANDIDATE_LIMIT).to_list(length=TEXT_CANDIDATE_LIMIT)
+    except OperationFailure as e:
+        if not is_missing_text_index(e):
+            raise
+        print("[WARN] No text index on alerts/gazettes, falling back to regex search")
+        return None
+
+    alert_scores = {hit["_id"]: hit[TEXT_SCORE_FIELD] for hit in alert_hits}
+    gazette_scores = {hit["gazette_id"]: hit[TEXT_SCORE_FIELD] for hit in gazette_hits}
+    # Externally stored bodies: a gazette scores as its best chunk
+    for hit in await _gazette_body_hits(query):
+        gazette_id = hit["gazette_id"]
+        gazette_scores[gazette_id] = max(gazette_scores.get(gazette_id, 0), hit[TEXT_SCORE_FIELD])
+    match = {
+        "$or": [
+            {"_id": {"$in": list(alert_scores)}},
+            {"gazette_id": {"$in": list(gazette_scores)}}
+        ]
+    }
+    return match, alert_scores, gazette_scores
+
+def _apply_gazette_scores(docs, text_match):
+    """An alert scores as the better of its own text hit and its gazette's."""
+    _, alert_scores, gazette_scores = text_match
+    for doc in docs:
+        doc[TEXT_SCORE_FIELD] = max(
+            alert_scores.get(doc["_id"], 0),
+            gazette_scores.get(doc.get("gazette_id"), 0)
+        )
+
+def _score_gazette_results(docs, hits, text_match):
+    if hits:
+        # BM25 score and a highlighted snippet
+        apply_hits(docs, hits, TEXT_SCORE_FIELD)
+    elif text_match:
+        _apply_gazette_scores(docs, text_match)
+
 @router.get("/all")
+@conditional(CACHE_PUBLIC, version=collection_version("livelaw", "ichr"))
+@cached("all", ttl=60, tags=("livelaw", "ichr"))
 async def get_all_summary():
     try:
         # Fetch latest 3 from livelaw
-        livelaw_cursor = db.livelaw.find({}).sort("published_at", -1).limit(3)
+        livelaw_cursor = db.livelaw.find({}, list_projection("livelaw")).sort("published_at", -1).limit(3)
         livelaw_docs = await livelaw_cursor.to_list(length=3)
         
         # Fetch latest 3 from ichr
-        ichr_cursor = db.ichr.find({}).sort("Date", -1).limit(3)
+        ichr_cursor = db.ichr.find({}, list_projection("ichr")).sort("Date", -1).limit(3)
         ichr_docs = await ichr_cursor.to_list(length=3)
         
         return {
-            "livelaw": [serialize_doc(doc, "livelaw") for doc in livelaw_docs],
-            "ichr": [serialize_doc(doc, "ichr") for doc in ichr_docs],
+            "livelaw": [format_result(doc, "livelaw") for doc in livelaw_docs],
+            "ichr": [format_result(doc, "ichr") for doc in ichr_docs],
             "total": len(livelaw_docs) + len(ichr_docs)
         }
     except Exception as e:
         print(f"Error fetching summary: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch summary data")
 
+@router.get("/dashboard")
+@conditional(CACHE_PRIVATE)
+async def get_dashboard():
+    # Everything the landing page shows, from the background snapshot
+    try:
+        return await dashboard_snapshot.get(db)
+    except Exception as e:
+        print(f"Error fetching dashboard: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch dashboard data")
+
+@router.get("/suggest")
+async def suggest(
+    q: str = "", # prefix typed so far
+    kind: Optional[str] = None, # comma-separated: author, place, ministry, term (default all)
+    limit: int = 10
+):
+    # Answered from the in-memory prefix index; never touches Mongo
+    kinds = [k.strip() for k in kind.split(",") if k.strip()] if kind else None
+    unknown = [k for k in kinds or [] if k not in SUGGEST_KINDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown kind(s): {', '.join(unknown)}. Use: {', '.join(SUGGEST_KINDS)}"
+        )
+    if not q.strip():
+        return {"suggestions": [], "ready": suggest_index.ready}
+    return {
+        "suggestions": suggest_index.suggest(q.strip(), kinds, max(1, min(limit, MAX_SUGGESTIONS))),
+        "ready": suggest_index.ready,
+    }
+
+async def _search_livelaw(query, regex_query, use_text, startDate, endDate, sortBy, limit, view, fields, facets):
+    projection = list_projection("livelaw", view, fields)
+    mongo_query = {}
+    livelaw_or = []
+    if regex_query:
+        livelaw_or = [
+            {"title": regex_query},
+            {"summary": regex_query},
+            {"relevance_reason": regex_query},
+            {"author": regex_query},
+            {"source": regex_query}
+        ]
+        if not use_text:
+            mongo_query["$or"] = livelaw_or
+    
+    date_filter = build_date_range_filter("livelaw", startDate, endDate)
+    if date_filter:
+        mongo_query.setdefault("$and", []).append(date_filter)
+    
+    if use_text:
+        return await _find_with_text(
+            db.livelaw, mongo_query, query, livelaw_or, "published_at", sortBy, limit, projection, facets
+        )
+
+    return await _run_query(
+        db.livelaw, "livelaw", mongo_query, projection, _date_sort("published_at", sortBy), limit, facets
+    )
+
+async def _search_ichr(query, regex_query, use_text, startDate, endDate, sortBy, limit, view, fields, facets):
+    projection = list_projection("ichr", view, fields)
+    mongo_query = {}
+    ichr_or = []
+    if regex_query:
+        ichr_or = [
+            {"title": regex_query},
+            {"summary": regex_query},
+            {"content": regex_query},
+            {"Place": regex_query},
+            {"place": regex_query},
+            {"site": regex_query}
+        ]
+        if not use_text:
+            mongo_query["$or"] = ichr_or
+    
+    date_filter = build_date_range_filter("ichr", startDate, endDate)
+    if date_filter:
+        mongo_query.setdefault("$and", []).append(date_filter)
+
+    if use_text:
+        return await _find_with_text(
+            db.ichr, mongo_query, query, ichr_or, "Date", sortBy, limit, projection, facets
+        )
+
+    return await _run_query(
+        db.ichr, "ichr", mongo_query, projection, _date_sort("Date", sortBy), limit, facets
+    )
+
+async def _find_gazette_alerts(facets, *args, **kwargs):
+    if facets:
+        return await find_alerts_with_facets(db, facets, *args, **kwargs)
+    return await find_alerts(db, *args, **kwargs), None
+
+async def _search_gazettes(query, regex_query, use_text, startDate, endDate, sortBy, limit, view, fields, facets,
+                           body=False):
+    projections = {
+        "projection": list_projection("alerts", view, fields),
+        "gazette_projection": gazette_lookup_projection(view, fields),
+    }
+    # Only search processed alerts (slack_sent=True) joined with gazette details.
+    # Ranked search uses the full-text index once it is ready, else the
+    # Mongo text indexes; mode=regex stays a literal substring match.
+    hits = await fulltext_index.search(query) if use_text and fulltext_index.ready else None
+    text_match = await _gazette_text_match(query) if use_text and hits is None else None
+    base_match = {"slack_sent": True}
+    if hits is not None:
+        base_match.update(hits_condition(hits))
+    elif text_match:
+        base_match.update(text_match[0])
+
+    joined_conditions = []
+    if regex_query and hits is None and not text_match:
+        joined_conditions.append(await alert_search_condition(db, regex_query, body))
+
+    date_filter = build_date_range_filter(
+        "gazettes", startDate, endDate, prefix="gazette_details."
+    )
+    if date_filter:
+        joined_conditions.append(date_filter)
+
+    if (hits is not None or text_match) and not sortBy:
+        # Rank the bounded candidate set by score in memory; facets then
+        # count the candidates (at most TEXT_CANDIDATE_LIMIT per collection,
+        # FULLTEXT_CANDIDATE_LIMIT hits)
+        gazette_results, counts = await _find_gazette_alerts(
+            facets, base_match, joined_conditions, limit=None, require_gazette=True, **projections
+        )
+        _score_gazette_results(gazette_results, hits, text_match)
+        gazette_results.sort(key=lambda d: d.get(TEXT_SCORE_FIELD, 0), reverse=True)
+        return gazette_results[:limit], counts
+
+    sort_order = 1 if sortBy == "oldest" else -1
+    if facets and not regex_query and not joined_conditions:
+        # Every processed alert: counts cached rather than recomputed per request
+        async def count():
+            _, counts = await _find_gazette_alerts(
+                facets, base_match, [], sort_order, 1, require_gazette=True, **projections
+            )
+            return counts
+        gazette_results = await find_alerts(
+            db, base_match, [], sort_order, limit, require_gazette=True, **projections
+        )
+        counts = await unfiltered_facets("alerts", facets, count)
+        _score_gazette_results(gazette_results, hits, text_match)
+        return gazette_results, counts
+
+    gazette_results, counts = await _find_gazette_alerts(
+        facets, base_match, joined_conditions, sort_order, limit, require_gazette=True, **projections
+    )
+    _score_gazette_results(gazette_results, hits, text_match)
+    return gazette_results, counts
+
+def _rank_results(results):
+    """Number one source's results by score, best first, in _rank. Mongo
+    textScore, the full-text index's -bm25 and the regex fallback's constant
+    1.0 aren't comparable, so the merged /search results interleave the
+    sources by _rank; _score keeps the source's own score."""
+    results.sort(key=lambda x: x.get("_score", 0) or 0, reverse=True)
+    for rank, result in enumerate(results, 1):
+        result["_rank"] = rank
+
+async def _run_source(name, search):
+    """Await one source's search within its deadline, timing it and
+    containing a failure or timeout so the other sources still return."""
+    started = time.perf_counter()
+    error = None
+    timed_out = False
+    try:
+        results, counts = await with_deadline(search, search_deadline_ms(name), name)
+    except DeadlineExceeded as e:
+        print(f"[WARN] {e}")
+        results, counts, error, timed_out = [], None, str(e), True
+    except Exception as e:
+        print(f"[ERROR] {name} search failed: {e}")
+        traceback.print_exc()
+        results, counts, error = [], None, str(e)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    return results, counts, elapsed_ms, error, timed_out
+
 @router.get("/search")
+@conditional(CACHE_PUBLIC, version=collection_version("livelaw", "ichr", "alerts", "gazettes"))
+@coalesced("search", tags=("livelaw", "ichr", "alerts"))
 async def global_search(
     query: Optional[str] = None,
     site: Optional[str] = None, # "livelaw", "ichr", "gazette", or ""
     startDate: Optional[str] = None,
     endDate: Optional[str] = None,
     sortBy: str = "", # "newest", "oldest", or "" (relevance)
-    limit: int = 20
+    limit: int = 20,
+    mode: str = "regex", # "regex" (case-insensitive substring) or "text" (ranked whole words, uses text indexes)
+    view: str = "summary", # "summary" (no body text) or "full"
+    fields: Optional[str] = None, # comma-separated fields to return
+    facets: Optional[str] = None, # e.g. "source,ministry,tag,month": adds a "facets" block
+    body: bool = False # mode=regex: also match gazette text (slow, capped at GAZETTE_BODY_MATCH_LIMIT)
 ):
+    facet_names = parse_facets(facets)
     try:
-        search_livelaw = not site or site == "livelaw"
-        search_ichr = not site or site == "ichr"
-        search_gazette = not site or site == "gazette"
-        
-        livelaw_results = []
-        ichr_results = []
-        gazette_results = []
-        
         regex_query = {"$regex": query, "$options": "i"} if query else None
-        
-        if search_livelaw:
-            mongo_query = {}
-            if regex_query:
-                mongo_query["$or"] = [
-                    {"title": regex_query},
-                    {"summary": regex_query},
-                    {"relevance_reason": regex_query},
-                    {"author": regex_query},
-                    {"source": regex_query}
-                ]
-            
-            # Livelaw ISO Date Filter
-            if startDate or endDate:
-                livelaw_date_filter = {}
-                if startDate:
-                     livelaw_date_filter["$gte"] = f"{startDate}T00:00:00"
-                if endDate:
-                     livelaw_date_filter["$lte"] = f"{endDate}T23:59:59"
-                if livelaw_date_filter:
-                    mongo_query["published_at"] = livelaw_date_filter
-            
-            cursor = db.livelaw.find(mongo_query)
-            if sortBy == "oldest":
-                cursor.sort("published_at", 1)
-            elif sortBy == "newest":
-                cursor.sort("published_at", -1)
-            
-            livelaw_results = await cursor.limit(limit).to_list(length=limit)
-            
-        if search_ichr:
-            mongo_query = {}
-            if regex_query:
-                mongo_query["$or"] = [
-                    {"title": regex_query},
-                    {"summary": regex_query},
-                    {"content": regex_query},
-                    {"Place": regex_query},
-                    {"place": regex_query},
-                    {"site": regex_query}
-                ]
-            
-            # ICHR DD.MM.YYYY Date Filter using $expr
-            if startDate or endDate:
-                ichr_expr_conds = []
-                if startDate:
-                    try:
-                        start_dt = datetime.fromisoformat(startDate)
-                        ichr_expr_conds.append({
-                            "$gte": [
-                                {"$dateFromString": {"dateString": "$Date", "format": "%d.%m.%Y", "onError": datetime(1970, 1, 1), "onNull": datetime(1970, 1, 1)}},
-                                start_dt
-                            ]
-                        })
-                    except: pass
-                if endDate:
-                    try:
-                        end_dt = datetime.fromisoformat(endDate).replace(hour=23, minute=59, second=59)
-                        ichr_expr_conds.append({
-                            "$lte": [
-                                {"$dateFromString": {"dateString": "$Date", "format": "%d.%m.%Y", "onError": datetime(1970, 1, 1), "onNull": datetime(1970, 1, 1)}},
-                                end_dt
-                            ]
-                        })
-                    except: pass
-                if ichr_expr_conds:
-                    mongo_query["$expr"] = {"$and": ichr_expr_conds}
-
-            cursor = db.ichr.find(mongo_query)
-            if sortBy == "oldest":
-                cursor.sort("Date", 1)
-            elif sortBy == "newest":
-                cursor.sort("Date", -1)
-            ichr_results = await cursor.limit(limit).to_list(length=limit)
-
-        if search_gazette:
-            # Only search processed alerts (slack_sent=True) joined with gazette details
-            try:
-                pipeline = [
-                    {"$match": {"slack_sent": True}},
-                    {
-                        "$lookup": {
-                            "from": "gazettes",
-                            "localField": "gazette_id",
-                            "foreignField": "gazette_id",
-                            "as": "gazette_details"
-                        }
-                    },
-                    {"$unwind": "$gazette_details"}
-                ]
-
-                if regex_query:
-                    pipeline.append({
-                        "$match": {
-                            "$or": [
-                                {"summary": regex_query},
-                                {"reason": regex_query},
-                                {"gazette_details.ministry": regex_query},
-                                {"gazette_details.subject": regex_query},
-                                {"gazette_details.pdf_text": regex_query}
-                            ]
-                        }
-                    })
-
-                if startDate or endDate:
-                    gazette_expr_conds = []
-                    # Gazette dates are stored as DD/MM/YYYY string
-                    if startDate:
-                        try:
-                            start_dt = datetime.fromisoformat(startDate)
-                            gazette_expr_conds.append({
-                                "$gte": [
-                                    {"$dateFromString": {"dateString": "$gazette_details.publish_date", "format": "%d/%m/%Y", "onError": datetime(1970, 1, 1), "onNull": datetime(1970, 1, 1)}},
-                                    start_dt
-                                ]
-                            })
-                        except: pass
-                    if endDate:
-                        try:
-                            # Set end date to end of day
-                            end_dt = datetime.fromisoformat(endDate).replace(hour=23, minute=59, second=59)
-                            gazette_expr_conds.append({
-                                "$lte": [
-                                    {"$dateFromString": {"dateString": "$gazette_details.publish_date", "format": "%d/%m/%Y", "onError": datetime(1970, 1, 1), "onNull": datetime(1970, 1, 1)}},
-                                    end_dt
-                                ]
-                            })
-                        except: pass
-                    
-                    if gazette_expr_conds:
-                        pipeline.append({"$match": {"$expr": {"$and": gazette_expr_conds}}})
-
-                sort_order = 1 if sortBy == "oldest" else -1
-                pipeline.append({"$sort": {"alerted_at": sort_order}})
-                pipeline.append({"$limit": limit})
-
-                cursor = db.alerts.aggregate(pipeline)
-                gazette_results = await cursor.to_list(length=limit)
-                print(f"[DEBUG] Found {len(gazette_results)} gazette results")
+        use_text = bool(query) and mode == "text"
+        args = (query, regex_query, use_text, startDate, endDate, sortBy, limit, view, fields, facet_names)
 
-            except Exception as e:
-                print(f"[ERROR] Gazette search failed: {e}")
-                import traceback
-                traceback.print_exc()
-                gazette_results = []
+        # Query the selected sources concurrently; each fails independently
+        searches = {}
+        if not site or site == "livelaw":
+            searches["livelaw"] = _search_livelaw(*args)
+        if not site or site == "ichr":
+            searches["ichr"] = _search_ichr(*args)
+        if not site or site == "gazette":
+            searches["gazette"] = _search_gazettes(*args, body=body)
+
+        outcomes = await asyncio.gather(
+            *(_run_source(name, search) for name, search in searches.items())
+        )
+        results = {}
+        source_facets = {}
+        timings = {}
+        errors = {}
+        timed_out = {}
+        for name, (docs, counts, elapsed_ms, error, source_timed_out) in zip(searches, outcomes):
+            results[name] = docs
+            source_facets[name] = counts
+            timings[name] = elapsed_ms
+            timed_out[name] = source_timed_out
+            if error:
+                errors[name] = error
 
+        livelaw_results = results.get("livelaw", [])
+        ichr_results = results.get("ichr", [])
+        gazette_results = results.get("gazette", [])
+        print(f"[DEBUG] Found {len(gazette_results)} gazette results")
 
-        formatted_livelaw = [serialize_doc(doc, "livelaw") for doc in livelaw_results]
-        formatted_ichr = [serialize_doc(doc, "ichr") for doc in ichr_results]
+        formatted_livelaw = [format_result(doc, "livelaw") for doc in livelaw_results]
+        formatted_ichr = [format_result(doc, "ichr") for doc in ichr_results]
         
         # Debug gazette serialization
         formatted_gazette = []
         for doc in gazette_results:
             try:
-                formatted_gazette.append(serialize_doc(doc, "gazette"))
+                formatted_gazette.append(format_result(doc, "gazette"))
             except Exception as e:
                 print(f"Error serializing gazette doc: {e}")
                 print(f"Doc keys: {doc.keys() if hasattr(doc, 'keys') else 'Not a dict'}")
-                import traceback
                 traceback.print_exc()
         
+        if use_text and sortBy not in ("newest", "oldest"):
+            for formatted in (formatted_livelaw, formatted_ichr, formatted_gazette):
+                _rank_results(formatted)
+
         all_results = formatted_livelaw + formatted_ichr + formatted_gazette
         
         # Combined sorting in memory using the unified numeric _timestamp
@@ -277,22 +462,32 @@ async def global_search(
             all_results.sort(key=lambda x: x.get("_timestamp", 0) or 0, reverse=True)
         elif sortBy == "oldest":
              all_results.sort(key=lambda x: x.get("_timestamp", 0) or 0)
+        elif use_text:
+            # Relevance: interleave the sources by their rank within each
+            all_results.sort(key=lambda x: x["_rank"])
 
         # Apply limit after combining
         all_results = all_results[:limit]
 
-        return {
+        response = {
             "results": all_results,
             "counts": {
                 "livelaw": len(livelaw_results),
                 "ichr": len(ichr_results),
-                "gazette": len(gazette_results)
-            }
+                "gazette": len(gazette_results),
+                "timings_ms": timings,
+                "errors": errors,
+                "timedOut": timed_out
+            },
+            # Some source timed out or failed: the results are missing its hits
+            "partial": bool(errors)
         }
+        if facet_names:
+            # True totals over every match, unlike the page lengths in counts
+            response["facets"] = merge_facets(source_facets, facet_names)
+        return response
 
     except Exception as e:
-        import traceback
         print(f"Global search error: {e}")
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
-
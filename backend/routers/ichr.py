@@ -1,31 +1,30 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional, List
-from database import db
+from database import read_db as db # read-only routes: MONGO_READ_PREFERENCE applies
 from bson import ObjectId
 from datetime import datetime
+from dates import build_date_range_filter
+from pagination import count_hits, fetch_page, keyset_sort
+from export import EXPORT_BATCH_SIZE, check_format, export_response
+from projection import list_projection
+from serialization import serialize_doc
+from conditional import CACHE_DETAIL, CACHE_PUBLIC, conditional
+from coalesce import coalesced
+from versions import collection_version
+from deadlines import deadline
 
 router = APIRouter(
     prefix="/ichr",
     tags=["ichr"]
 )
 
-def serialize_doc(doc):
-    doc["id"] = str(doc["_id"])
-    del doc["_id"]
+def format_ichr(doc):
+    doc = serialize_doc(doc)
     if "Attachments" in doc:
         doc["attachments"] = doc["Attachments"]
     return doc
 
-@router.get("/")
-async def get_ichr(
-    query: Optional[str] = None,
-    place: Optional[str] = None,
-    startDate: Optional[str] = None,
-    endDate: Optional[str] = None,
-    sortBy: str = "newest",
-    limit: int = 20,
-    offset: int = 0
-):
+def build_ichr_query(query=None, place=None, startDate=None, endDate=None, exact=False):
     mongo_query = {}
     
     conditions = []
@@ -40,72 +39,95 @@ async def get_ichr(
         })
     
     if place:
+        # exact: a value picked from /suggest, matched with the place indexes
+        place_match = place if exact else {"$regex": place, "$options": "i"}
         conditions.append({
             "$or": [
-                {"Place": {"$regex": place, "$options": "i"}},
-                {"place": {"$regex": place, "$options": "i"}}
+                {"Place": place_match},
+                {"place": place_match}
             ]
         })
 
     if conditions:
         mongo_query["$and"] = conditions
 
-    # Date filtering for DD.MM.YYYY format
-    if startDate or endDate:
-        conditions = []
-        if startDate:
-            try:
-                start_dt = datetime.fromisoformat(startDate)
-                conditions.append({
-                    "$gte": [
-                        {"$dateFromString": {"dateString": "$Date", "format": "%d.%m.%Y", "onError": datetime(1970, 1, 1), "onNull": datetime(1970, 1, 1)}},
-                        start_dt
-                    ]
-                })
-            except ValueError:
-                pass
-            
-        if endDate:
-            try:
-                # Inclusive end date
-                end_dt = datetime.fromisoformat(endDate).replace(hour=23, minute=59, second=59)
-                conditions.append({
-                    "$lte": [
-                        {"$dateFromString": {"dateString": "$Date", "format": "%d.%m.%Y", "onError": datetime(1970, 1, 1), "onNull": datetime(1970, 1, 1)}},
-                        end_dt
-                    ]
-                })
-            except ValueError:
-                pass
-            
-        if conditions:
-            mongo_query["$expr"] = {"$and": conditions}
+    date_filter = build_date_range_filter("ichr", startDate, endDate)
+    if date_filter:
+        mongo_query.setdefault("$and", []).append(date_filter)
+    return mongo_query
 
-    sort_criteria = [("Date", -1)] # Default newest
+@router.get("/")
+@conditional(CACHE_PUBLIC, version=collection_version("ichr"))
+@coalesced("ichr", tags=("ichr",))
+@deadline("ichr")
+async def get_ichr(
+    query: Optional[str] = None,
+    place: Optional[str] = None,
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    sortBy: str = "newest",
+    limit: int = 20,
+    offset: int = 0,
+    cursor: Optional[str] = None, # opaque nextCursor from the previous page
+    count: Optional[bool] = None, # true: exact totalHits, false: skip counting
+    view: str = "summary", # "summary" (no body text) or "full"
+    fields: Optional[str] = None, # comma-separated fields to return
+    exact: bool = False # match place exactly (a value from /suggest)
+):
+    mongo_query = build_ichr_query(query, place, startDate, endDate, exact)
+
+    sort_direction = -1 # Default newest
     if sortBy == "oldest":
-        sort_criteria = [("Date", 1)]
+        sort_direction = 1
 
-    # execute query
-    cursor = db.ichr.find(mongo_query)
-    cursor.sort(sort_criteria).skip(offset).limit(limit)
-    
     try:
-        documents = await cursor.to_list(length=limit)
-        total_hits = await db.ichr.count_documents(mongo_query)
+        # execute query
+        documents, has_more, next_cursor = await fetch_page(
+            db.ichr, mongo_query, "Date", sort_direction, limit, offset, cursor,
+            projection=list_projection("ichr", view, fields)
+        )
+        total_hits = await count_hits(db.ichr, mongo_query, exact=count)
         
-        serialized_docs = [serialize_doc(doc) for doc in documents]
+        serialized_docs = [format_ichr(doc) for doc in documents]
         
         return {
             "documents": serialized_docs,
             "totalHits": total_hits,
             "offset": offset,
             "limit": limit,
-            "hasMore": (offset + limit) < total_hits
+            "hasMore": has_more,
+            "nextCursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/export")
+async def export_ichr(
+    query: Optional[str] = None,
+    place: Optional[str] = None,
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    sortBy: str = "newest",
+    format: str = "ndjson", # "ndjson" or "csv"
+    limit: Optional[int] = None, # default: every matching document
+    view: str = "summary",
+    fields: Optional[str] = None, # also the CSV columns
+    exact: bool = False
+):
+    check_format(format)
+    sort_direction = 1 if sortBy == "oldest" else -1
+    cursor = db.ichr.find(
+        build_ichr_query(query, place, startDate, endDate, exact),
+        list_projection("ichr", view, fields)
+    ).sort(keyset_sort("Date", sort_direction)).batch_size(EXPORT_BATCH_SIZE)
+    if limit:
+        cursor.limit(limit)
+    return await export_response(cursor, "ichr", format, fields, transform=format_ichr)
+
 @router.get("/{id}")
+@conditional(CACHE_DETAIL, version=collection_version("ichr"))
 async def get_ichr_by_id(id: str):
     try:
         try:
@@ -122,7 +144,7 @@ async def get_ichr_by_id(id: str):
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
 
-        return serialize_doc(doc)
+        return format_ichr(doc)
     except Exception as e:
         print(f"Error fetching ICHR document: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
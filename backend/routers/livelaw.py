@@ -1,29 +1,24 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional, List
-from database import db
+from database import read_db as db # read-only routes: MONGO_READ_PREFERENCE applies
 from bson import ObjectId
 from datetime import datetime
+from dates import build_date_range_filter
+from pagination import count_hits, fetch_page, keyset_sort
+from export import EXPORT_BATCH_SIZE, check_format, export_response
+from projection import list_projection
+from serialization import serialize_doc
+from conditional import CACHE_DETAIL, CACHE_PUBLIC, conditional
+from coalesce import coalesced
+from versions import collection_version
+from deadlines import deadline
 
 router = APIRouter(
     prefix="/livelaw",
     tags=["livelaw"]
 )
 
-def serialize_doc(doc):
-    doc["id"] = str(doc["_id"])
-    del doc["_id"]
-    return doc
-
-@router.get("/")
-async def get_livelaw(
-    query: Optional[str] = None,
-    author: Optional[str] = None,
-    startDate: Optional[str] = None,
-    endDate: Optional[str] = None,
-    sortBy: str = "newest",
-    limit: int = 20,
-    offset: int = 0
-):
+def build_livelaw_query(query=None, author=None, startDate=None, endDate=None, exact=False):
     mongo_query = {}
 
     if query:
@@ -34,34 +29,46 @@ async def get_livelaw(
         ]
     
     if author:
-        mongo_query["author"] = {"$regex": author, "$options": "i"}
+        # exact: a value picked from /suggest, matched with the author index
+        mongo_query["author"] = author if exact else {"$regex": author, "$options": "i"}
     
-    if startDate or endDate:
-        date_filter = {}
-        if startDate:
-            # startDate is YYYY-MM-DD from frontend
-            # Lexicographical comparison works for ISO strings
-            date_filter["$gte"] = f"{startDate}T00:00:00"
-        
-        if endDate:
-            # Inclusive: up to the end of the day
-            date_filter["$lte"] = f"{endDate}T23:59:59"
-        
-        if date_filter:
-            mongo_query["published_at"] = date_filter
+    date_filter = build_date_range_filter("livelaw", startDate, endDate)
+    if date_filter:
+        mongo_query.setdefault("$and", []).append(date_filter)
+    return mongo_query
+
+@router.get("/")
+@conditional(CACHE_PUBLIC, version=collection_version("livelaw"))
+@coalesced("livelaw", tags=("livelaw",))
+@deadline("livelaw")
+async def get_livelaw(
+    query: Optional[str] = None,
+    author: Optional[str] = None,
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    sortBy: str = "newest",
+    limit: int = 20,
+    offset: int = 0,
+    cursor: Optional[str] = None, # opaque nextCursor from the previous page
+    count: Optional[bool] = None, # true: exact totalHits, false: skip counting
+    view: str = "summary", # "summary" (no body text) or "full"
+    fields: Optional[str] = None, # comma-separated fields to return
+    exact: bool = False # match author exactly (a value from /suggest)
+):
+    mongo_query = build_livelaw_query(query, author, startDate, endDate, exact)
 
-    sort_criteria = [("published_at", -1)] # Default newest
+    sort_direction = -1 # Default newest
     if sortBy == "oldest":
-        sort_criteria = [("published_at", 1)]
+        sort_direction = 1
     
     # Execute query
-    cursor = db.livelaw.find(mongo_query)
-    cursor.sort(sort_criteria).skip(offset).limit(limit)
-    
-    documents = await cursor.to_list(length=limit)
+    documents, has_more, next_cursor = await fetch_page(
+        db.livelaw, mongo_query, "published_at", sort_direction, limit, offset, cursor,
+        projection=list_projection("livelaw", view, fields)
+    )
     
     # Get total count (for pagination)
-    total_hits = await db.livelaw.count_documents(mongo_query)
+    total_hits = await count_hits(db.livelaw, mongo_query, exact=count)
     
     serialized_docs = [serialize_doc(doc) for doc in documents]
 
@@ -70,10 +77,35 @@ async def get_livelaw(
         "totalHits": total_hits,
         "offset": offset,
         "limit": limit,
-        "hasMore": (offset + limit) < total_hits
+        "hasMore": has_more,
+        "nextCursor": next_cursor
     }
 
+@router.get("/export")
+async def export_livelaw(
+    query: Optional[str] = None,
+    author: Optional[str] = None,
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    sortBy: str = "newest",
+    format: str = "ndjson", # "ndjson" or "csv"
+    limit: Optional[int] = None, # default: every matching document
+    view: str = "summary",
+    fields: Optional[str] = None, # also the CSV columns
+    exact: bool = False
+):
+    check_format(format)
+    sort_direction = 1 if sortBy == "oldest" else -1
+    cursor = db.livelaw.find(
+        build_livelaw_query(query, author, startDate, endDate, exact),
+        list_projection("livelaw", view, fields)
+    ).sort(keyset_sort("published_at", sort_direction)).batch_size(EXPORT_BATCH_SIZE)
+    if limit:
+        cursor.limit(limit)
+    return await export_response(cursor, "livelaw", format, fields)
+
 @router.get("/{id}")
+@conditional(CACHE_DETAIL, version=collection_version("livelaw"))
 async def get_livelaw_by_id(id: str):
     try:
         # Try both ObjectId and string ID just in case
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Fill a benchmark database with synthetic livelaw / ichr / gazettes / alerts.
+
+The data is deterministic for a given --seed and --scale, so two runs of
+load_test.py against it are comparable. Documents use the same string date
+formats the scrapers write (ISO for livelaw, dd.mm.yyyy for ichr, dd/mm/yyyy
+for gazettes). They also carry the normalized _date / _timestamp fields unless
+--legacy-dates is given. Gazette pdf_text sizes follow a log-normal
+distribution around --pdf-kb.
+
+By default it writes to BENCH_MONGODB_URI (mongodb://127.0.0.1:27017/
+dashboard_bench), never to MONGODB_URI, so it can't clobber real data.
+
+Usage:
+    python seed_benchmark_data.py --scale 10000 --drop
+    python seed_benchmark_data.py --scale 1000000 --pdf-kb 60 --seed 7 --drop
+    python seed_benchmark_data.py --livelaw 50000 --gazettes 2000 --alerts 1500
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+from alert_feed import FEED_COLLECTION, STATE_COLLECTION, rebuild_feed
+from dates import normalized_date_fields
+from indexes import ensure_indexes
+
+load_dotenv()
+
+BENCH_MONGODB_URI = os.getenv("BENCH_MONGODB_URI", "mongodb://127.0.0.1:27017/dashboard_bench")
+
+# Vocabulary shared with load_test.py so its search terms actually match
+WORDS = (
+    "court tribunal order petition judgment appeal bench counsel statute tax "
+    "customs excise finance ministry notification amendment regulation rules "
+    "commission rights human labour environment forest water energy power "
+    "railway transport education health welfare pension insurance banking "
+    "securities company insolvency arbitration contract property land "
+    "revenue election police prison custody bail compensation inquiry "
+    "scheme subsidy tariff import export trade digital data privacy telecom"
+).split()
+MINISTRIES = [
+    "Finance", "Home Affairs", "Law and Justice", "Commerce and Industry",
+    "Environment, Forest and Climate Change", "Health and Family Welfare",
+    "Railways", "Education", "Labour and Employment", "Power",
+]
+AUTHORS = ["A. Sharma", "R. Iyer", "S. Khan", "P. Menon", "N. Gupta", "K. Rao", "M. Das", "T. Singh"]
+PLACES = ["New Delhi", "Mumbai", "Chennai", "Kolkata", "Bengaluru", "Lucknow", "Guwahati", "Srinagar"]
+PRIORITIES = ["high", "medium", "low"]
+
+START_DATE = datetime(2019, 1, 1)
+DATE_SPAN_DAYS = 6 * 365
+CORPUS_CHARS = 4 * 1024 * 1024
+MAX_PDF_CHARS = 4 * 1024 * 1024
+
+
+class Generator:
+    def __init__(self, seed, pdf_kb, legacy_dates):
+        self.rng = random.Random(seed)
+        self.pdf_chars = pdf_kb * 1024
+        self.legacy_dates = legacy_dates
+        # Slicing one large random corpus is much faster than building each
+        # pdf_text word by word
+        words = self.rng.choices(WORDS, k=CORPUS_CHARS // 7)
+        self.corpus = " ".join(words)
+
+    def sentence(self, min_words, max_words):
+        n = self.rng.randint(min_words, max_words)
+        return " ".join(self.rng.choices(WORDS, k=n)).capitalize()
+
+    def text(self, chars):
+        chars = min(chars, len(self.corpus))
+        start = self.rng.randrange(0, len(self.corpus) - chars + 1)
+        return self.corpus[start:start + chars]
+
+    def pdf_text(self):
+        # Log-normal around the median, like real gazettes (a few pages to
+        # hundreds)
+        chars = int(self.pdf_chars * math.exp(self.rng.gauss(0, 0.9)))
+        return self.text(max(500, min(chars, MAX_PDF_CHARS)))
+
+    def when(self):
+        return START_DATE + timedelta(seconds=self.rng.randrange(DATE_SPAN_DAYS * 86400))
+
+    def _dates(self, collection, raw):
+        return {} if self.legacy_dates else normalized_date_fields(collection, raw)
+
+    def livelaw(self, i):
+        published = self.when().replace(microsecond=0).isoformat()
+        return {
+            "title": self.sentence(6, 14),
+            "summary": self.sentence(25, 60),
+            "content": self.text(self.rng.randint(3000, 15000)),
+            "author": self.rng.choice(AUTHORS),
+            "published_at": published,
+            "url": f"https://www.livelaw.in/bench/{i}",
+            "source": "livelaw",
+            "relevance_reason": self.sentence(8, 20),
+            "confidence_score": round(self.rng.random(), 2),
+            **self._dates("livelaw", published),
+        }
+
+    def ichr(self, i):
+        date = self.when().strftime("%d.%m.%Y")
+        attachments = [f"https://nhrc.nic.in/bench/{i}/{n}.pdf" for n in range(self.rng.randint(0, 3))]
+        return {
+            "title": self.sentence(6, 14),
+            "summary": self.sentence(20, 50),
+            "content": self.text(self.rng.randint(2000, 12000)),
+            "Date": date,
+            "Place": self.rng.choice(PLACES),
+            "site": "nhrc",
+            "url": f"https://nhrc.nic.in/bench/{i}",
+            "Attachments": attachments,
+            **self._dates("ichr", date),
+        }
+
+    def gazette(self, i):
+        date = self.when().strftime("%d/%m/%Y")
+        return {
+            "gazette_id": f"BENCH-{i:07d}",
+            "ministry": self.rng.choice(MINISTRIES),
+            "subject": self.sentence(8, 20),
+            "publish_date": date,
+            "pdf_url": f"https://egazette.gov.in/bench/{i}.pdf",
+            "pdf_text": self.pdf_text(),
+            **self._dates("gazettes", date),
+        }
+
+    def alert(self, gazette_id):
+        sent = self.rng.random()
+        # Most alerts have been triaged; a small tail is pending
+        slack_sent = True if sent < 0.7 else (None if sent < 0.9 else False)
+        return {
+            "gazette_id": gazette_id,
+            "summary": self.sentence(20, 45),
+            "reason": self.sentence(10, 25),
+            "priority": self.rng.choice(PRIORITIES),
+            "confidence": round(self.rng.random(), 2),
+            "important_ministry": self.rng.random() < 0.3,
+            "legislative_value": self.rng.random() < 0.4,
+            "economic_impact": self.rng.random() < 0.3,
+            "political_relevance": self.rng.random() < 0.2,
+            "slack_sent": slack_sent,
+            "is_relevant": True if slack_sent else (False if slack_sent is None else None),
+            "alerted_at": self.when(),
+        }
+
+
+async def insert_many(collection, make, count, batch_size):
+    inserted = 0
+    while inserted < count:
+        n = min(batch_size, count - inserted)
+        await collection.insert_many([make(inserted + i) for i in range(n)], ordered=False)
+        inserted += n
+        print(f"[{collection.name}] {inserted}/{count}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--uri", default=BENCH_MONGODB_URI, help="target database URI")
+    parser.add_argument("--scale", type=int, default=10000, help="livelaw and ichr documents (default 10000)")
+    parser.add_argument("--livelaw", type=int, help="override livelaw count")
+    parser.add_argument("--ichr", type=int, help="override ichr count")
+    parser.add_argument("--gazettes", type=int, help="gazettes (default scale/10)")
+    parser.add_argument("--alerts", type=int, help="alerts (default 80%% of gazettes)")
+    parser.add_argument("--pdf-kb", type=int, default=40, help="median pdf_text size in KiB")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--legacy-dates", action="store_true", help="omit _date/_timestamp (pre-migration data)")
+    parser.add_argument("--drop", action="store_true", help="drop the collections first")
+    args = parser.parse_args()
+
+    counts = {
+        "livelaw": args.livelaw if args.livelaw is not None else args.scale,
+        "ichr": args.ichr if args.ichr is not None else args.scale,
+        "gazettes": args.gazettes if args.gazettes is not None else max(1, args.scale // 10),
+    }
+    counts["alerts"] = args.alerts if args.alerts is not None else int(counts["gazettes"] * 0.8)
+    if counts["alerts"] > counts["gazettes"]:
+        parser.error("--alerts can't exceed --gazettes (one alert per gazette)")
+
+    client = AsyncIOMotorClient(args.uri)
+    db = client.get_default_database()
+    print(f"Seeding {db.name}: {counts} (seed={args.seed})")
+    gen = Generator(args.seed, args.pdf_kb, args.legacy_dates)
+
+    try:
+        if args.drop:
+            for name in [*counts, FEED_COLLECTION, STATE_COLLECTION]:
+                await db.drop_collection(name)
+
+        await insert_many(db.livelaw, gen.livelaw, counts["livelaw"], args.batch_size)
+        await insert_many(db.ichr, gen.ichr, counts["ichr"], args.batch_size)
+        # Gazettes are large; keep their batches small
+        await insert_many(db.gazettes, gen.gazette, counts["gazettes"], max(1, args.batch_size // 10))
+        alerted = gen.rng.sample(range(counts["gazettes"]), counts["alerts"])
+        await insert_many(
+            db.alerts, lambda i: gen.alert(f"BENCH-{alerted[i]:07d}"), counts["alerts"], args.batch_size
+        )
+
+        await ensure_indexes(db)
+        print(f"Alert feed: {await rebuild_feed(db)} alerts")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
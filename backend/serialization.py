@@ -0,0 +1,84 @@
+import asyncio
+import os
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse, Response
+
+# One BSON -> JSON path for every router. serialize_doc makes a single pass
+# that renames _id and stringifies ObjectIds; datetimes are left as-is (the
+# ETag/Last-Modified code reads them) and orjson encodes them natively, so
+# there is no second jsonable_encoder walk over the payload.
+
+# Bodies estimated above this are encoded in a worker thread so one large
+# gazette cannot stall the event loop
+LARGE_RESPONSE_BYTES = int(os.getenv("LARGE_RESPONSE_BYTES", str(256 * 1024)))
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _convert(value):
+    if isinstance(value, dict):
+        return {("id" if k == "_id" else k): _convert(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_convert(v) for v in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+def serialize_doc(doc):
+    """A Mongo document ready for a JSON response: `_id` becomes a string
+    `id` at every level. Returns a new dict; `doc` is left untouched."""
+    if not doc:
+        return doc
+    return _convert(doc)
+
+
+def _default(value):
+    # Remaining BSON types (Decimal128, Int64 subclasses, ...) and anything
+    # serialize_doc didn't see
+    return str(value)
+
+
+def encode(content):
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content):
+        return encode(content)
+
+
+def _exceeds(value, budget):
+    """Roughly whether `value` encodes to more than `budget` bytes. Only
+    strings are counted and the walk stops as soon as the budget is spent."""
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            budget -= len(item)
+        elif isinstance(item, dict):
+            budget -= 8 * len(item)
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+        else:
+            budget -= 8
+        if budget < 0:
+            return True
+    return False
+
+
+async def encode_body(content):
+    """encode(), off the event loop when `content` is large."""
+    if not _exceeds(content, LARGE_RESPONSE_BYTES):
+        return encode(content)
+    return await asyncio.to_thread(encode, content)
+
+
+async def json_response(content, status_code=200, headers=None):
+    """Encode `content` with orjson, off the event loop when it is large."""
+    if not _exceeds(content, LARGE_RESPONSE_BYTES):
+        return ORJSONResponse(content, status_code=status_code, headers=headers)
+    body = await asyncio.to_thread(encode, content)
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,148 @@
+import asyncio
+import bisect
+import heapq
+import os
+import re
+from pymongo.errors import PyMongoError
+
+# Typeahead for the free-text filters, answered from memory. For each kind
+# of value (author, place, ministry, title term) the index keeps every
+# distinct value with how many documents carry it, in a list sorted by its
+# lowercased form; a prefix query is a bisect to the start of the matching
+# range followed by a top-k by count.
+#
+# The index is built by a startup task. After that it is kept up to date
+# incrementally: every SUGGEST_REFRESH_SECONDS, documents whose _id is newer
+# than the last one seen are added. Edits and deletes are picked up by a full
+# rebuild every SUGGEST_REBUILD_SECONDS.
+SUGGEST_REFRESH_SECONDS = float(os.getenv("SUGGEST_REFRESH_SECONDS", "60"))
+SUGGEST_REBUILD_SECONDS = float(os.getenv("SUGGEST_REBUILD_SECONDS", str(6 * 3600)))
+SUGGEST_BATCH_SIZE = 2000
+MAX_SUGGESTIONS = 50
+
+# kind -> [(collection, field)]; "term" values are words from these fields
+SUGGEST_SOURCES = {
+    "author": [("livelaw", "author")],
+    "place": [("ichr", "Place"), ("ichr", "place")],
+    "ministry": [("gazettes", "ministry")],
+    "term": [("livelaw", "title"), ("ichr", "title"), ("gazettes", "subject")],
+}
+SUGGEST_KINDS = list(SUGGEST_SOURCES)
+
+TERM_PATTERN = re.compile(r"[^\W\d_]{3,}")
+STOPWORDS = set(
+    "the and for with from that this are was were has have had not but its into under over "
+    "upon their there which who whom whose what when where shall will may can all any".split()
+)
+
+
+def _terms(text):
+    return {word.lower() for word in TERM_PATTERN.findall(text)} - STOPWORDS
+
+
+class PrefixIndex:
+    """Distinct values of one kind with document counts, searchable by
+    case-insensitive prefix."""
+
+    def __init__(self):
+        self.counts = {}
+        self._keys = [] # sorted (lowercased value, value)
+        self._pending = [] # added since the last sort
+
+    def add(self, value, count=1):
+        if value not in self.counts:
+            self._pending.append((value.lower(), value))
+            self.counts[value] = 0
+        self.counts[value] += count
+
+    def _merge_pending(self):
+        if self._pending:
+            self._keys = sorted(self._keys + self._pending)
+            self._pending = []
+
+    def search(self, prefix, limit):
+        """Up to `limit` (value, count) starting with `prefix`, most
+        frequent first."""
+        self._merge_pending()
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._keys, (prefix,))
+        end = bisect.bisect_left(self._keys, (prefix + "\U0010ffff",), lo=start)
+        matches = ((value, self.counts[value]) for _, value in self._keys[start:end])
+        return heapq.nlargest(limit, matches, key=lambda m: (m[1], m[0]))
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class SuggestIndex:
+    def __init__(self):
+        self.indexes = {kind: PrefixIndex() for kind in SUGGEST_KINDS}
+        self.ready = False
+        self._last_ids = {} # collection -> newest _id indexed
+
+    def _add_document(self, collection, doc):
+        for kind, sources in SUGGEST_SOURCES.items():
+            for source, field in sources:
+                value = doc.get(field) if source == collection else None
+                if not isinstance(value, str) or not value.strip():
+                    continue
+                if kind == "term":
+                    for term in _terms(value):
+                        self.indexes[kind].add(term)
+                else:
+                    self.indexes[kind].add(value.strip())
+
+    async def _scan(self, db, collection, after=None):
+        """Add every document of `collection` (newer than `after`), reading
+        only the indexed fields."""
+        fields = {field: 1 for sources in SUGGEST_SOURCES.values() for source, field in sources if source == collection}
+        query = {"_id": {"$gt": after}} if after is not None else {}
+        last_id = after
+        cursor = db[collection].find(query, fields).sort("_id", 1).batch_size(SUGGEST_BATCH_SIZE)
+        async for doc in cursor:
+            self._add_document(collection, doc)
+            last_id = doc["_id"]
+        return last_id
+
+    async def build(self, db):
+        """Build a fresh index and swap it in."""
+        fresh = SuggestIndex()
+        for collection in {source for sources in SUGGEST_SOURCES.values() for source, _ in sources}:
+            fresh._last_ids[collection] = await fresh._scan(db, collection)
+        self.indexes, self._last_ids = fresh.indexes, fresh._last_ids
+        self.ready = True
+        print(f"Suggest: indexed {', '.join(f'{kind}={len(index)}' for kind, index in self.indexes.items())}")
+
+    async def update(self, db):
+        """Add documents inserted since the last build or update."""
+        for collection, last_id in self._last_ids.items():
+            self._last_ids[collection] = await self._scan(db, collection, last_id)
+
+    def suggest(self, prefix, kinds=None, limit=10):
+        results = []
+        for kind in kinds or SUGGEST_KINDS:
+            for value, count in self.indexes[kind].search(prefix, limit):
+                results.append({"value": value, "kind": kind, "count": count})
+        results.sort(key=lambda r: r["count"], reverse=True)
+        return results[:limit]
+
+    def stats(self):
+        return {"ready": self.ready, **{kind: len(index) for kind, index in self.indexes.items()}}
+
+    async def run(self, db):
+        """Startup task: build, then keep the index current."""
+        loop = asyncio.get_running_loop()
+        rebuilt_at = None
+        while True:
+            try:
+                if rebuilt_at is None or loop.time() - rebuilt_at >= SUGGEST_REBUILD_SECONDS:
+                    await self.build(db)
+                    rebuilt_at = loop.time()
+                else:
+                    await self.update(db)
+            except PyMongoError as e:
+                print(f"Suggest: refresh failed: {e}")
+            await asyncio.sleep(SUGGEST_REFRESH_SECONDS)
+
+
+suggest_index = SuggestIndex()
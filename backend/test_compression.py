@@ -0,0 +1,40 @@
+import compression
+from compression import negotiate_encoding
+
+def with_brotli(check):
+    # negotiate_encoding only offers br when the module is importable
+    saved = compression.brotli
+    compression.brotli = saved or object()
+    try:
+        check()
+    finally:
+        compression.brotli = saved
+
+def test_wildcard():
+    with_brotli(lambda: assert_encoding("*", "br"))
+    with_brotli(lambda: assert_encoding("gzip, *", "br"))
+
+def test_explicit_q0_beats_wildcard():
+    with_brotli(lambda: assert_encoding("br;q=0, *", "gzip"))
+    with_brotli(lambda: assert_encoding("br;q=0, gzip;q=0, *", None))
+    with_brotli(lambda: assert_encoding("*, br;q=0", "gzip"))
+    with_brotli(lambda: assert_encoding("gzip;q=0, *", "br"))
+
+def test_wildcard_q0():
+    with_brotli(lambda: assert_encoding("*;q=0", None))
+    with_brotli(lambda: assert_encoding("gzip, *;q=0", "gzip"))
+
+def test_no_header():
+    assert_encoding(None, None)
+    assert_encoding("identity", None)
+
+def assert_encoding(header, expected):
+    chosen = negotiate_encoding(header)
+    assert chosen == expected, f"{header!r}: expected {expected}, got {chosen}"
+
+if __name__ == "__main__":
+    test_wildcard()
+    test_explicit_q0_beats_wildcard()
+    test_wildcard_q0()
+    test_no_header()
+    print("Compression negotiation: OK")
@@ -0,0 +1,65 @@
+from pymongo.errors import OperationFailure
+
+# Weighted text indexes used by the relevance-ranked search mode.
+# Title-like fields outrank summaries, which outrank body text.
+# MongoDB allows a single text index per collection, so each entry fully
+# describes that collection's text index.
+TEXT_INDEX_NAME = "text_search"
+
+TEXT_INDEXES = {
+    "livelaw": {
+        "title": 10,
+        "summary": 5,
+        "relevance_reason": 2,
+        "author": 1,
+        "source": 1,
+    },
+    "ichr": {
+        "title": 10,
+        "summary": 5,
+        "Place": 2,
+        "place": 2,
+        "content": 1,
+        "site": 1,
+    },
+    "alerts": {
+        "summary": 5,
+        "reason": 2,
+    },
+    "gazettes": {
+        "subject": 10,
+        "ministry": 5,
+        "pdf_text": 1,
+    },
+    # Bodies moved out of gazettes by migrate_gazette_text.py
+    "gazette_texts": {
+        "text": 1,
+    },
+}
+
+# Name of the projected field carrying the textScore metadata
+TEXT_SCORE_FIELD = "_text_score"
+
+# Upper bound on candidates pulled per collection when ranking by score
+TEXT_CANDIDATE_LIMIT = 500
+
+# MongoDB error code raised when $text is used without a text index
+INDEX_NOT_FOUND = 27
+
+
+def text_filter(query):
+    return {"$text": {"$search": query}}
+
+
+def text_score_projection():
+    return {TEXT_SCORE_FIELD: {"$meta": "textScore"}}
+
+
+def text_score_sort():
+    return [(TEXT_SCORE_FIELD, {"$meta": "textScore"})]
+
+
+def is_missing_text_index(error):
+    return isinstance(error, OperationFailure) and (
+        error.code == INDEX_NOT_FOUND or "text index required" in str(error)
+    )
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import time
+from cache import response_cache
+from database import read_db
+
+# Cheap per-collection versions, read before a route runs its query so that
+# conditional() can answer If-None-Match with 304 without doing the work.
+#
+# A collection's version is its estimated document count, its newest _id and,
+# where an index makes it cheap, its newest updated_at. That catches inserts,
+# deletes and any edit that stamps updated_at (alert status changes do). It
+# does not catch an in-place edit that leaves updated_at alone (scraped
+# livelaw/ichr records, gazettes): those show up when the time bucket below
+# rolls over, so a validator is never trusted for longer than
+# VALIDATOR_MAX_AGE_SECONDS.
+#
+# Reading the version also invalidates the response cache when it moves, so
+# a worker never serves a cached body older than the version in its ETag.
+VALIDATOR_MAX_AGE_SECONDS = int(os.getenv("VALIDATOR_MAX_AGE_SECONDS", "300"))
+# Sort keys with an index to read the newest value from (indexes.py)
+VERSION_FIELDS = {
+    "alerts": ("_id", "updated_at"),
+}
+# Response cache tags holding data from each collection; alert responses
+# embed gazette details
+VERSION_TAGS = {
+    "gazettes": ("alerts",),
+}
+
+_seen = {} # collection -> last version read by this worker
+
+
+async def _newest(collection, field):
+    doc = await collection.find_one({}, {field: 1}, sort=[(field, -1)])
+    return doc.get(field) if doc else None
+
+
+async def _collection_version(name):
+    collection = read_db[name]
+    fields = VERSION_FIELDS.get(name, ("_id",))
+    count, *newest = await asyncio.gather(
+        collection.estimated_document_count(),
+        *(_newest(collection, field) for field in fields)
+    )
+    version = (name, count, *newest)
+    previous = _seen.get(name)
+    _seen[name] = version
+    if previous is not None and previous != version:
+        response_cache.invalidate(*VERSION_TAGS.get(name, (name,)))
+    return version
+
+
+def collection_version(*names):
+    """A `version` for conditional(): the named collections' versions plus
+    the current time bucket."""
+    async def version():
+        versions = await asyncio.gather(*(_collection_version(name) for name in names))
+        return (*versions, int(time.time() // VALIDATOR_MAX_AGE_SECONDS))
+    return version
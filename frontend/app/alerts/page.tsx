@@ -46,6 +46,25 @@ export default function AlertsPage() {
         }
     };
 
+    const handleBulkAction = async (action: "approve" | "decline") => {
+        if (alerts.length === 0) return;
+        try {
+            const res = await fetch(`${API_URL}/alerts/actions`, {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ actions: alerts.map(a => ({ id: a.id, action })) })
+            });
+            const data = await res.json();
+            // Drop the alerts that were actually updated
+            const done = new Set((data.results || []).filter((r: any) => r.status === "updated").map((r: any) => r.id));
+            setAlerts(prev => prev.filter(a => !done.has(a.id)));
+            // Notify Navbar to update count
+            window.dispatchEvent(new Event('alert-updated'));
+        } catch (err) {
+            console.error("Bulk action failed:", err);
+        }
+    };
+
     const getPriorityColor = (priority: string) => {
         switch (priority?.toLowerCase()) {
             case 'high': return 'bg-red-100 text-red-700 dark:bg-red-900/30 dark:text-red-300 border-red-200 dark:border-red-800';
@@ -66,9 +85,21 @@ export default function AlertsPage() {
                         Review and manage important legislative and economic updates.
                     </p>
                 </div>
-                <Badge variant="secondary" className="px-4 py-2 bg-gray-100 dark:bg-zinc-800 rounded-xl font-bold">
-                    {alerts.length} Pending Actions
-                </Badge>
+                <div className="flex items-center gap-3">
+                    <Badge variant="secondary" className="px-4 py-2 bg-gray-100 dark:bg-zinc-800 rounded-xl font-bold">
+                        {alerts.length} Pending Actions
+                    </Badge>
+                    {alerts.length > 1 && (
+                        <>
+                            <Button variant="outline" size="sm" className="rounded-xl" onClick={() => handleBulkAction("approve")}>
+                                <Check className="w-4 h-4 mr-1" /> Approve All
+                            </Button>
+                            <Button variant="outline" size="sm" className="rounded-xl" onClick={() => handleBulkAction("decline")}>
+                                <X className="w-4 h-4 mr-1" /> Decline All
+                            </Button>
+                        </>
+                    )}
+                </div>
             </div>
 
             {loading ? (
@@ -12,13 +12,36 @@ export default function GazetteDetailPage({ params: paramsPromise }: { params: P
     const params = use(paramsPromise);
     const [data, setData] = useState<any>(null);
     const [loading, setLoading] = useState(true);
+    const [text, setText] = useState("");
+    const [textOffset, setTextOffset] = useState(0); // characters loaded, as the server counts them
+    const [textTotal, setTextTotal] = useState(0);
+    const [textLoading, setTextLoading] = useState(false);
     const router = useRouter();
 
+    // The gazette text is paged in separately from the metadata
+    const fetchText = async (offset: number) => {
+        setTextLoading(true);
+        try {
+            const res = await fetch(`${API_URL}/alerts/${params.id}/text?offset=${offset}`);
+            const json = await res.json();
+            setText(prev => (offset === 0 ? json.text : prev + json.text));
+            setTextOffset(json.offset + json.length);
+            setTextTotal(json.total);
+        } catch (err) {
+            console.error("Failed to fetch text:", err);
+        } finally {
+            setTextLoading(false);
+        }
+    };
+
     const fetchDetail = async () => {
         try {
-            const res = await fetch(`${API_URL}/alerts/${params.id}`);
+            const res = await fetch(`${API_URL}/alerts/${params.id}?text=false`);
             const json = await res.json();
             setData(json);
+            if (json.gazette?.text_length) {
+                fetchText(0);
+            }
         } catch (err) {
             console.error("Failed to fetch detail:", err);
         } finally {
@@ -27,6 +50,9 @@ export default function GazetteDetailPage({ params: paramsPromise }: { params: P
     };
 
     useEffect(() => {
+        setText("");
+        setTextOffset(0);
+        setTextTotal(0);
         fetchDetail();
     }, [params.id]);
 
@@ -109,7 +135,7 @@ export default function GazetteDetailPage({ params: paramsPromise }: { params: P
                         </section>
 
                         {/* Full Text Section */}
-                        {gazette?.pdf_text && (
+                        {gazette?.text_length > 0 && (
                             <section>
                                 <div className="flex items-center gap-3 mb-6">
                                     <div className="p-2 bg-gray-100 dark:bg-zinc-800 rounded-lg">
@@ -119,8 +145,18 @@ export default function GazetteDetailPage({ params: paramsPromise }: { params: P
                                 </div>
                                 <div className="p-8 bg-zinc-50 dark:bg-zinc-950 rounded-[2rem] border border-zinc-200 dark:border-zinc-800 max-h-[500px] overflow-y-auto custom-scrollbar">
                                     <pre className="text-sm text-zinc-600 dark:text-zinc-400 whitespace-pre-wrap font-mono leading-relaxed">
-                                        {gazette.pdf_text}
+                                        {text}
                                     </pre>
+                                    {textLoading && <Skeleton className="h-24 w-full mt-4" />}
+                                    {!textLoading && textOffset < textTotal && (
+                                        <Button
+                                            onClick={() => fetchText(textOffset)}
+                                            variant="ghost"
+                                            className="mt-4 text-emerald-700 dark:text-emerald-400 font-bold"
+                                        >
+                                            Load more ({Math.round((textOffset / textTotal) * 100)}% shown)
+                                        </Button>
+                                    )}
                                 </div>
                             </section>
                         )}
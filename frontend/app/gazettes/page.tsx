@@ -33,6 +33,7 @@ export default function GazettesPage() {
     const [endDate, setEndDate] = useState("");
     const [sortBy, setSortBy] = useState("newest");
     const [selectedTags, setSelectedTags] = useState<string[]>([]);
+    const [facets, setFacets] = useState<any>(null);
     const router = useRouter();
 
     const fetchGazettes = async () => {
@@ -44,10 +45,13 @@ export default function GazettesPage() {
             if (endDate) params.append("endDate", endDate);
             if (sortBy) params.append("sortBy", sortBy);
             if (selectedTags.length > 0) params.append("tags", selectedTags.join(","));
+            // Totals over every match, not just the returned page
+            params.append("facets", "tag");
 
             const res = await fetch(`${API_URL}/alerts/processed?${params.toString()}`);
             const data = await res.json();
-            setGazettes(data);
+            setGazettes(data.alerts);
+            setFacets(data.facets);
         } catch (err) {
             console.error("Failed to fetch gazettes:", err);
         } finally {
@@ -93,7 +97,7 @@ export default function GazettesPage() {
                 </div>
                 <Badge variant="secondary" className="px-5 py-2.5 bg-emerald-100 dark:bg-emerald-900/30 rounded-2xl border border-emerald-200 dark:border-emerald-800 shadow-sm text-sm font-bold text-emerald-700 dark:text-emerald-300">
                     <CheckCircle className="w-4 h-4 mr-2" />
-                    {loading ? "Searching..." : `${gazettes.length} Documents Archived`}
+                    {loading ? "Searching..." : `${facets?.total ?? gazettes.length} Documents Archived`}
                 </Badge>
             </div>
 
@@ -140,6 +144,9 @@ export default function GazettesPage() {
                                     className="rounded-lg"
                                 >
                                     {marker.label}
+                                    {facets?.tag && (
+                                        <span className="ml-auto text-xs text-gray-400">{facets.tag[marker.id]}</span>
+                                    )}
                                 </DropdownMenuCheckboxItem>
                             ))}
                         </DropdownMenuContent>
@@ -23,6 +23,7 @@ export default function ICHRPage() {
     const [loading, setLoading] = useState(true);
     const [loadingMore, setLoadingMore] = useState(false);
     const [offset, setOffset] = useState(0);
+    const [cursor, setCursor] = useState<string | null>(null);
     const [totalHits, setTotalHits] = useState(0);
     const [hasMore, setHasMore] = useState(true);
 
@@ -68,6 +69,8 @@ export default function ICHRPage() {
                 limit: "20",
                 offset: currentOffset.toString()
             });
+            // Keyset pagination: continue after the last row we received
+            if (!isInitial && cursor) params.set("cursor", cursor);
 
             const res = await fetch(`${API_URL}/ichr?${params.toString()}`);
             const data = await res.json();
@@ -77,6 +80,7 @@ export default function ICHRPage() {
                 setTotalHits(data.totalHits || 0);
                 setHasMore(data.hasMore || false);
                 setOffset(currentOffset + data.documents.length);
+                setCursor(data.nextCursor || null);
             }
         } catch (err) {
             console.error("Fetch error:", err);
@@ -90,6 +94,7 @@ export default function ICHRPage() {
         setActiveFilters({ query, startDate, endDate, place, sortBy });
         setDocuments([]);
         setOffset(0);
+        setCursor(null);
         setTotalHits(0);
         setHasMore(true);
     };
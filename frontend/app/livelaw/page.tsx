@@ -24,6 +24,7 @@ export default function LivelawPage() {
     const [loading, setLoading] = useState(true);
     const [loadingMore, setLoadingMore] = useState(false);
     const [offset, setOffset] = useState(0);
+    const [cursor, setCursor] = useState<string | null>(null);
     const [totalHits, setTotalHits] = useState(0);
     const [hasMore, setHasMore] = useState(true);
 
@@ -69,6 +70,8 @@ export default function LivelawPage() {
                 limit: "20",
                 offset: currentOffset.toString()
             });
+            // Keyset pagination: continue after the last row we received
+            if (!isInitial && cursor) params.set("cursor", cursor);
 
             const res = await fetch(`${API_URL}/livelaw?${params.toString()}`);
             const data = await res.json();
@@ -78,6 +81,7 @@ export default function LivelawPage() {
                 setTotalHits(data.totalHits || 0);
                 setHasMore(data.hasMore || false);
                 setOffset(currentOffset + data.documents.length);
+                setCursor(data.nextCursor || null);
             }
         } catch (err) {
             console.error("Fetch error:", err);
@@ -92,6 +96,7 @@ export default function LivelawPage() {
         setActiveFilters({ query, author, sortBy, startDate, endDate });
         setDocuments([]);
         setOffset(0);
+        setCursor(null);
         setTotalHits(0);
         setHasMore(true);
     };
@@ -35,18 +35,9 @@ export default function Home() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [allRes, gazettesRes] = await Promise.all([
-          fetch(`${API_URL}/all`),
-          fetch(`${API_URL}/alerts/processed`)
-        ]);
-
-        const allJson = await allRes.json();
-        const gazettesJson = await gazettesRes.json();
-
-        setData({
-          ...allJson,
-          gazettes: gazettesJson
-        });
+        // Latest items and gazette highlights in one precomputed response
+        const res = await fetch(`${API_URL}/dashboard`);
+        setData(await res.json());
       } catch (err) {
         console.error(err);
       } finally {
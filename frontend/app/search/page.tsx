@@ -35,6 +35,8 @@ function SearchPageContent() {
     const [results, setResults] = useState<any[]>([]);
     const [loading, setLoading] = useState(false);
     const [counts, setCounts] = useState({ livelaw: 0, ichr: 0, gazette: 0 });
+    // Sources that ran out of time; the results shown are missing their hits
+    const [timedOut, setTimedOut] = useState<string[]>([]);
     const [hasSearched, setHasSearched] = useState(false);
 
     const performSearch = async (sQuery: string, sSite: string, sSort: string, sStart: string, sEnd: string) => {
@@ -48,6 +50,9 @@ function SearchPageContent() {
             if (sSort) params.set("sortBy", sSort);
             if (sStart) params.set("startDate", sStart);
             if (sEnd) params.set("endDate", sEnd);
+            // Substring matching by default; ?mode=text opts in to ranked whole-word search
+            const mode = searchParams.get("mode");
+            if (mode) params.set("mode", mode);
 
             const res = await fetch(`${API_URL}/search?${params.toString()}`);
             const data = await res.json();
@@ -55,6 +60,7 @@ function SearchPageContent() {
             if (data.results) {
                 setResults(data.results);
                 setCounts(data.counts || { livelaw: 0, ichr: 0, gazette: 0 });
+                setTimedOut(Object.keys(data.counts?.timedOut || {}).filter(name => data.counts.timedOut[name]));
             }
         } catch (error) {
             console.error("Search error:", error);
@@ -72,6 +78,7 @@ function SearchPageContent() {
         if (sortBy) params.set("sortBy", sortBy);
         if (startDate) params.set("startDate", startDate);
         if (endDate) params.set("endDate", endDate);
+        if (searchParams.get("mode")) params.set("mode", searchParams.get("mode")!);
         router.push(`/search?${params.toString()}`);
 
         performSearch(query, site, sortBy, startDate, endDate);
@@ -228,6 +235,11 @@ function SearchPageContent() {
                                 {counts.gazette || 0} Gazettes
                             </span>
                         </div>
+                        {timedOut.length > 0 && (
+                            <div className="w-full text-center text-xs font-medium text-amber-700 dark:text-amber-400">
+                                {timedOut.join(", ")} took too long and {timedOut.length === 1 ? "is" : "are"} missing from these results. Try narrowing the search.
+                            </div>
+                        )}
                     </div>
                 )}
             </div>
@@ -16,6 +16,7 @@ import { useRouter } from "next/navigation";
 interface GazetteDocument {
     id: string;
     summary?: string;
+    snippet?: string; // escaped HTML from the full-text search, matches in <mark>
     priority?: string;
     alerted_at?: string;
     gazette_id?: string;
@@ -73,6 +74,12 @@ export default function GazetteCard({ doc }: { doc: GazetteDocument }) {
                 <p className="text-sm text-gray-600 dark:text-gray-300 line-clamp-3 leading-relaxed italic mb-4">
                     "{doc.summary}"
                 </p>
+                {doc.snippet && (
+                    <p
+                        className="text-xs text-gray-500 dark:text-gray-400 line-clamp-3 leading-relaxed mb-4 [&_mark]:bg-emerald-100 [&_mark]:text-emerald-900 dark:[&_mark]:bg-emerald-900/50 dark:[&_mark]:text-emerald-100"
+                        dangerouslySetInnerHTML={{ __html: doc.snippet }}
+                    />
+                )}
 
                 <div className="flex items-center justify-between mt-auto">
                     <Badge className={`text-[9px] font-black px-2 py-0.5 rounded-md border ${getPriorityColor(doc.priority || 'low')}`}>
@@ -48,12 +48,24 @@ export default function Navbar() {
             const handleUpdate = () => fetchAlertCount();
             window.addEventListener('alert-updated', handleUpdate);
 
-            // Optional: Refresh every 2 minutes
-            const interval = setInterval(fetchAlertCount, 120000);
+            // Live count pushed by the backend; fall back to polling every
+            // 2 minutes where EventSource isn't available
+            let source: EventSource | null = null;
+            let interval: ReturnType<typeof setInterval> | null = null;
+            if (typeof EventSource !== "undefined") {
+                source = new EventSource(`${API_URL}/alerts/stream`);
+                source.addEventListener("count", (e) => {
+                    const data = JSON.parse((e as MessageEvent).data);
+                    setAlertCount(data.count || 0);
+                });
+            } else {
+                interval = setInterval(fetchAlertCount, 120000);
+            }
 
             return () => {
                 window.removeEventListener('alert-updated', handleUpdate);
-                clearInterval(interval);
+                source?.close();
+                if (interval) clearInterval(interval);
             };
         }
     }, [user]);